@@ -1,5 +1,7 @@
 """Streamlit interface for Multimodal Agentic RAG chatbot."""
 
+import time
+
 import streamlit as st
 from loguru import logger
 
@@ -69,11 +71,11 @@ def load_vectorstore():
         return None
 
 
-def display_message(role: str, content: str):
+def display_message(role: str, content: str, container=st):
     css_class = "user-message" if role == "user" else "assistant-message"
     icon = "👤" if role == "user" else "🤖"
 
-    st.markdown(f"""
+    container.markdown(f"""
     <div class="chat-message {css_class}">
         <strong>{icon} {role.capitalize()}</strong><br>
         {content}
@@ -137,19 +139,29 @@ def main():
         )
         display_message("user", query)
 
-        # Generate response
-        with st.spinner("Thinking..."):
-            try:
-                answer = st.session_state.agent_graph.run(query)
-
-                st.session_state.messages.append(
-                    {"role": "assistant", "content": answer}
-                )
-                display_message("assistant", answer)
-
-            except Exception as e:
-                logger.error(f"Chat error: {e}")
-                st.error("Something went wrong while generating the answer.")
+        # Stream the response into a placeholder as tokens arrive
+        placeholder = st.empty()
+        try:
+            start = time.perf_counter()
+            with st.spinner("Thinking..."):
+                tokens = st.session_state.agent_graph.stream(query)
+                # Retrieval runs before the first token: keep the spinner until then
+                answer = next(tokens, "")
+            first_token = time.perf_counter() - start
+            display_message("assistant", answer, placeholder)
+
+            for token in tokens:
+                answer += token
+                display_message("assistant", answer, placeholder)
+
+            st.session_state.messages.append(
+                {"role": "assistant", "content": answer}
+            )
+            st.caption(f"First token after {first_token:.2f}s")
+
+        except Exception as e:
+            logger.error(f"Chat error: {e}")
+            st.error("Something went wrong while generating the answer.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+"""
+Throughput of MultiAgentGraph.arun at increasing concurrency.
+- OpenAI clients are replaced by fakes with fixed latencies (benchmarks/fakes.py)
+- Reports queries/sec and p50 / p95 latency per concurrency level, plus the
+  sequential synchronous run() as a baseline
+
+Usage (from multimodal-medical-rag/):
+    python -m benchmarks.concurrency --levels 1 10 50 --queries 200
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.fakes import (
+    FakeChatModel, FakeEmbeddings, synthetic_queries, synthetic_summaries, use_scratch_dirs
+)
+
+
+def percentile_ms(latencies, q: float) -> float:
+    return float(np.percentile(latencies, q)) * 1000 if latencies else 0.0
+
+
+async def run_level(graph, queries, concurrency: int, timeout: float):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(query: str):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await graph.arun(query, timeout=timeout)
+            except Exception:
+                failures += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    return time.perf_counter() - start, latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async graph throughput with stubbed LLM / embeddings")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--queries", type=int, default=200, help="queries per level")
+    parser.add_argument("--docs", type=int, default=2000, help="synthetic documents in the index")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="seconds per embedding call")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per LLM call")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout")
+    parser.add_argument("--sync-queries", type=int, default=10, help="queries for the sync baseline (0 skips)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        use_scratch_dirs(Path(scratch))
+
+        # Imported after the data paths are redirected
+        from src.embeddings import VectorStoreManager
+        from src.graph.agent_graph import MultiAgentGraph
+
+        embeddings = FakeEmbeddings()
+        manager = VectorStoreManager(embeddings=embeddings)
+        manager.build_vectorstore(manager.create_documents(synthetic_summaries(args.docs)))
+        embeddings.latency = args.embed_latency
+
+        graph = MultiAgentGraph(manager, llm=FakeChatModel(latency=args.llm_latency))
+        print(
+            f"{args.docs} docs, embedding {args.embed_latency * 1000:.0f} ms, "
+            f"LLM {args.llm_latency * 1000:.0f} ms per call"
+        )
+
+        if args.sync_queries:
+            queries = synthetic_queries(args.sync_queries, seed=0)
+            start = time.perf_counter()
+            for query in queries:
+                graph.run(query)
+            elapsed = time.perf_counter() - start
+            print(f"sync run()      {len(queries) / elapsed:8.2f} q/s")
+
+        for level, concurrency in enumerate(args.levels, start=1):
+            # Fresh queries per level so cached results don't skew later levels
+            queries = synthetic_queries(args.queries, seed=level)
+            elapsed, latencies, failures = asyncio.run(run_level(graph, queries, concurrency, args.timeout))
+            print(
+                f"arun() x{concurrency:<4}   {len(latencies) / elapsed:8.2f} q/s  "
+                f"p50 {percentile_ms(latencies, 50):7.1f} ms  p95 {percentile_ms(latencies, 95):7.1f} ms  "
+                f"failures {failures}"
+            )
+
+        manager.doc_store.close()
+
+
+if __name__ == "__main__":
+    main()
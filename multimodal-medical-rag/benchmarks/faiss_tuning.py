@@ -0,0 +1,146 @@
+"""
+Offline FAISS tuning benchmark.
+- Builds every configured index type over the same vectors
+- Reports recall@k against the exact flat index, single-query QPS / p50 latency,
+  build time and memory for each nprobe / efSearch setting
+
+Usage (from multimodal-medical-rag/):
+    python -m benchmarks.faiss_tuning --num-vectors 200000 --dim 1536
+    python -m benchmarks.faiss_tuning --index-dir data/faiss_index
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+# Settings require an API key even though nothing here calls the API
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+from src.faiss_index import INDEX_TYPES, build_index, index_bytes, set_search_params  # noqa: E402
+
+
+# --------------------------------------------------
+# DATA
+# --------------------------------------------------
+
+def synthetic_vectors(num: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Unit vectors around random centers, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, num)] + 0.5 * rng.normal(size=(num, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_index_vectors(index_dir: Path) -> np.ndarray:
+    """Vectors of a saved (flat) index, e.g. the production one."""
+    index = faiss.read_index(str(index_dir / "index.faiss"))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def make_queries(vectors: np.ndarray, num: int, seed: int = 1) -> np.ndarray:
+    """Perturbed copies of stored vectors, like queries that paraphrase a chunk."""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(len(vectors), num, replace=len(vectors) < num)]
+    queries = queries + 0.1 * rng.normal(size=queries.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+# --------------------------------------------------
+# MEASUREMENT
+# --------------------------------------------------
+
+def recall_at_k(found: np.ndarray, exact: np.ndarray) -> float:
+    k = exact.shape[1]
+    return float(np.mean([len(set(f) & set(e)) / k for f, e in zip(found, exact)]))
+
+
+def time_queries(index: faiss.Index, queries: np.ndarray, k: int):
+    """One search call per query, as the serving path does."""
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    return np.vstack(found), np.asarray(latencies)
+
+
+def run(args) -> List[Dict]:
+    if args.index_dir:
+        vectors = load_index_vectors(Path(args.index_dir))
+    else:
+        vectors = synthetic_vectors(args.num_vectors, args.dim)
+    queries = make_queries(vectors, args.num_queries)
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    sweeps = {"flat": [{}]}
+    sweeps["ivf_flat"] = sweeps["ivf_pq"] = [{"nprobe": n} for n in args.nprobe]
+    sweeps["hnsw"] = [{"ef_search": ef} for ef in args.ef_search]
+
+    rows = []
+    for index_type in args.types:
+        start = time.perf_counter()
+        index = build_index(
+            vectors, index_type,
+            nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m, train_sample=args.train_sample,
+        )
+        index.add(vectors)
+        build_seconds = time.perf_counter() - start
+        memory = index_bytes(index)
+
+        for params in sweeps[index_type]:
+            set_search_params(index, **params)
+            found, latencies = time_queries(index, queries, args.k)
+            rows.append({
+                "index_type": index_type,
+                **params,
+                "recall_at_k": round(recall_at_k(found, truth), 4),
+                "qps": round(len(queries) / latencies.sum(), 1),
+                "p50_ms": round(float(np.median(latencies)) * 1000, 3),
+                "build_s": round(build_seconds, 2),
+                "memory_mb": round(memory / 2**20, 1),
+            })
+            print(
+                f"{index_type:<9} {json.dumps(params):<20} recall@{args.k} {rows[-1]['recall_at_k']:.3f}  "
+                f"{rows[-1]['qps']:>9.1f} qps  p50 {rows[-1]['p50_ms']:.3f} ms  "
+                f"build {build_seconds:.1f}s  {rows[-1]['memory_mb']} MB"
+            )
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall / QPS / memory of FAISS index configurations")
+    parser.add_argument("--index-dir", help="benchmark the vectors of a saved flat index instead of synthetic data")
+    parser.add_argument("--num-vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--train-sample", type=int, default=100_000)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--json", help="also write the result rows to this file")
+    args = parser.parse_args()
+
+    rows = run(args)
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Offline stand-ins for the OpenAI clients, for benchmarks and `server.py --fake`.
+- FakeEmbeddings: deterministic unit vectors per text, fixed latency per call
+- FakeChatModel: canned answer after a fixed latency, streamed word by word
+- use_scratch_dirs: point every data path at a temporary directory
+- synthetic_summaries: processed_chunks.json-style records for building an index
+
+use_scratch_dirs() must run before config.settings is imported.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def use_scratch_dirs(root: Path):
+    """Keep benchmark indexes, caches and manifests out of the real data directory."""
+    root = Path(root)
+    os.environ.setdefault("OPENAI_API_KEY", "unused")
+    paths = {
+        "DATA_DIR": root,
+        "PDF_DIR": root / "pdfs",
+        "IMAGE_DIR": root / "images",
+        "TEXT_DIR": root / "texts",
+        "TABLE_DIR": root / "tables",
+        "FAISS_INDEX_DIR": root / "faiss_index",
+        "MANIFEST_PATH": root / "manifest.json",
+        "EMBEDDING_CACHE_DIR": root / "cache" / "embeddings",
+        "EMBEDDING_CHECKPOINT_DIR": root / "cache" / "build_checkpoints",
+        "SUMMARY_CACHE_PATH": root / "cache" / "summaries.sqlite",
+        "TRACE_FILE": root / "traces.jsonl",
+    }
+    for name, path in paths.items():
+        os.environ[name] = str(path)
+
+
+TERMS = (
+    "melanoma basal squamous carcinoma lesion biopsy dermatitis psoriasis eczema "
+    "rash margin excision imiquimod isotretinoin nevus keratosis pigment ulcer "
+    "patient treatment diagnosis dermoscopy histology recurrence prognosis"
+).split()
+
+
+def synthetic_summaries(num: int, seed: int = 0) -> List[dict]:
+    """Text / image records shaped like the summarizer's output."""
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(num):
+        chunk_type = "image" if i % 5 == 0 else "text"
+        text = " ".join(rng.choice(TERMS, size=int(rng.integers(40, 120))))
+        records.append({
+            "chunk_id": f"synthetic_{i}",
+            "chunk_type": chunk_type,
+            "original_content": text,
+            "summary": text,
+            "page_number": i % 50 + 1,
+            "metadata": {"source": f"synthetic_{i // 200}.pdf"},
+        })
+    return records
+
+
+def synthetic_queries(num: int, seed: int = 1) -> List[str]:
+    """Distinct short questions, so the query caches do not hide the work."""
+    rng = np.random.default_rng(seed)
+    return [f"what is {' '.join(rng.choice(TERMS, size=3))} {i}" for i in range(num)]
+
+
+class FakeEmbeddings(Embeddings):
+    """Same text -> same unit vector; every call costs `latency` seconds."""
+
+    def __init__(self, size: int = 256, latency: float = 0.0):
+        self.size = size
+        self.latency = latency
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).normal(size=self.size)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """Answers every prompt with `answer` after `latency` seconds."""
+
+    answer: str = "- What causes it?\n- How is it diagnosed?\n- How is it treated?"
+    latency: float = 0.0
+    # Extra delay between streamed words
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for word in self.answer.split(" "):
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for word in self.answer.split(" "):
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
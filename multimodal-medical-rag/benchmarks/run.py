@@ -0,0 +1,281 @@
+"""
+Offline benchmark suite for the medical pipeline (no network).
+- Preprocessing: pages/sec of FastPDFProcessor over synthetic PDFs made with PyMuPDF
+- Indexing: docs/sec of VectorStoreManager.build_vectorstore and load time of the
+  saved index, at several corpus sizes
+- Queries: p50 / p95 / p99 latency of search_with_scores and MultiAgentGraph.run
+- Fake embedding / LLM backends (benchmarks/fakes.py) with zero latency, so the
+  numbers measure our code rather than the APIs
+- Every measurement gets its own image store and embedding cache, so later
+  sizes / pool sizes never start from caches warmed by earlier ones
+- Results go to JSON tagged with the commit, and can be compared to a baseline
+
+Usage (from multimodal-medical-rag/):
+    python -m benchmarks.run --sizes 1000 10000 50000
+    python -m benchmarks.run --baseline benchmarks/results/<commit>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from benchmarks.fakes import (
+    TERMS, FakeChatModel, FakeEmbeddings, synthetic_queries, synthetic_summaries, use_scratch_dirs
+)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+# --------------------------------------------------
+# ENVIRONMENT
+# --------------------------------------------------
+
+def git_commit() -> Dict[str, object]:
+    def git(*args) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", "."))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+@contextmanager
+def cold_caches(settings):
+    """
+    Point the image store, text / table output and embedding cache at a new
+    empty directory for one measurement. Settings are patched for this
+    process and the environment for spawned preprocessing workers.
+    """
+    with tempfile.TemporaryDirectory(dir=settings.DATA_DIR) as scratch:
+        scratch = Path(scratch)
+        overrides = {
+            "IMAGE_DIR": scratch / "images",
+            "TEXT_DIR": scratch / "texts",
+            "TABLE_DIR": scratch / "tables",
+            "EMBEDDING_CACHE_DIR": scratch / "cache" / "embeddings",
+            "EMBEDDING_CHECKPOINT_DIR": scratch / "cache" / "build_checkpoints",
+        }
+        previous = {name: (getattr(settings, name), os.environ.get(name)) for name in overrides}
+        for name, path in overrides.items():
+            setattr(settings, name, path)
+            os.environ[name] = str(path)
+        try:
+            yield
+        finally:
+            for name, (value, env) in previous.items():
+                setattr(settings, name, value)
+                if env is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = env
+
+
+def percentiles_ms(latencies: List[float]) -> Dict[str, float]:
+    values = np.asarray(latencies) * 1000
+    return {f"p{q}": round(float(np.percentile(values, q)), 3) for q in (50, 95, 99)}
+
+
+def directory_mb(path: Path) -> float:
+    return round(sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 1024 ** 2, 2)
+
+
+# --------------------------------------------------
+# SYNTHETIC PDFS
+# --------------------------------------------------
+
+def write_synthetic_pdfs(directory: Path, num_pdfs: int, pages: int, seed: int = 0) -> int:
+    """Text-heavy pages, a small image on every third page; returns pages written."""
+    rng = np.random.default_rng(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    for i in range(num_pdfs):
+        doc = fitz.open()
+        for page_number in range(pages):
+            page = doc.new_page()
+            paragraphs = [
+                " ".join(rng.choice(TERMS, size=int(rng.integers(60, 120)))).capitalize() + "."
+                for _ in range(4)
+            ]
+            page.insert_textbox(fitz.Rect(50, 50, 545, 560), "\n\n".join(paragraphs), fontsize=9)
+
+            if page_number % 3 == 0:
+                pixels = rng.integers(0, 256, size=64 * 64 * 3, dtype=np.uint8).tobytes()
+                image = fitz.Pixmap(fitz.csRGB, 64, 64, pixels, False)
+                page.insert_image(fitz.Rect(50, 600, 178, 728), pixmap=image)
+
+        doc.save(str(directory / f"synthetic_{i:03d}.pdf"))
+        doc.close()
+
+    return num_pdfs * pages
+
+
+# --------------------------------------------------
+# STAGES
+# --------------------------------------------------
+
+def bench_preprocessing(settings, num_pdfs: int, pages: int, workers: List[int]) -> List[Dict]:
+    from src.preprocessing import FastPDFProcessor
+
+    write_synthetic_pdfs(settings.PDF_DIR, num_pdfs, pages)
+    rows = []
+    for count in workers:
+        with cold_caches(settings):
+            processor = FastPDFProcessor()
+            processor.process_directory(settings.PDF_DIR, workers=count)
+        stats = processor.stats
+        rows.append({
+            "workers": stats.workers,
+            "pdfs": stats.pdfs,
+            "pages": stats.pages,
+            "chunks": stats.chunks,
+            "seconds": round(stats.elapsed, 3),
+            "pages_per_sec": round(stats.pages_per_sec, 1),
+        })
+        print(f"preprocess  workers={stats.workers:<3} {stats.pages_per_sec:9.1f} pages/sec  ({stats.chunks} chunks)")
+    return rows
+
+
+def bench_size(settings, num_docs: int, num_queries: int, dim: int) -> Dict:
+    with cold_caches(settings):
+        return _bench_size(settings, num_docs, num_queries, dim)
+
+
+def _bench_size(settings, num_docs: int, num_queries: int, dim: int) -> Dict:
+    from src.embeddings import VectorStoreManager
+    from src.graph.agent_graph import MultiAgentGraph
+
+    index_dir = settings.DATA_DIR / f"index_{num_docs}"
+
+    builder = VectorStoreManager(embeddings=FakeEmbeddings(size=dim))
+    documents = builder.create_documents(synthetic_summaries(num_docs))
+    start = time.perf_counter()
+    builder.build_vectorstore(documents)
+    build_seconds = time.perf_counter() - start
+    builder.save_vectorstore(index_dir)
+    builder.doc_store.close()
+
+    manager = VectorStoreManager(embeddings=FakeEmbeddings(size=dim))
+    start = time.perf_counter()
+    manager.load_vectorstore(index_dir)
+    load_seconds = time.perf_counter() - start
+
+    # Distinct queries, so neither the embedding nor the result cache hides work
+    search_latencies = []
+    for query in synthetic_queries(num_queries, seed=1):
+        start = time.perf_counter()
+        manager.search_with_scores(query, k=5)
+        search_latencies.append(time.perf_counter() - start)
+
+    graph = MultiAgentGraph(manager, llm=FakeChatModel())
+    graph_latencies = []
+    for query in synthetic_queries(num_queries, seed=2):
+        start = time.perf_counter()
+        graph.run(query)
+        graph_latencies.append(time.perf_counter() - start)
+    manager.doc_store.close()
+
+    row = {
+        "docs": num_docs,
+        "build_seconds": round(build_seconds, 3),
+        "docs_per_sec": round(num_docs / build_seconds, 1),
+        "load_seconds": round(load_seconds, 4),
+        "index_mb": directory_mb(index_dir),
+        "search_ms": percentiles_ms(search_latencies),
+        "query_ms": percentiles_ms(graph_latencies),
+    }
+    print(
+        f"docs={num_docs:<8} build {row['docs_per_sec']:9.1f} docs/sec  load {load_seconds * 1000:8.1f} ms  "
+        f"search p50/p95/p99 {'/'.join(str(v) for v in row['search_ms'].values())} ms  "
+        f"query p50/p95/p99 {'/'.join(str(v) for v in row['query_ms'].values())} ms"
+    )
+    return row
+
+
+# --------------------------------------------------
+# COMPARISON
+# --------------------------------------------------
+
+def compare(current: Dict, baseline: Dict):
+    """Print relative change per size; positive means slower / lower throughput."""
+    base_sizes = {row["docs"]: row for row in baseline.get("sizes", [])}
+    print(f"\nvs. {baseline.get('commit') or 'baseline'}:")
+    for row in current["sizes"]:
+        base = base_sizes.get(row["docs"])
+        if base is None:
+            continue
+
+        def change(now: float, before: float, lower_is_better: bool = True) -> str:
+            if not before:
+                return "n/a"
+            delta = (now - before) / before if lower_is_better else (before - now) / before
+            return f"{delta:+.1%}"
+
+        print(
+            f"docs={row['docs']:<8} build {change(row['docs_per_sec'], base['docs_per_sec'], False)}  "
+            f"load {change(row['load_seconds'], base['load_seconds'])}  "
+            f"search p95 {change(row['search_ms']['p95'], base['search_ms']['p95'])}  "
+            f"query p95 {change(row['query_ms']['p95'], base['query_ms']['p95'])}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingestion / indexing / query benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="corpus sizes (documents)")
+    parser.add_argument("--queries", type=int, default=200, help="queries timed per size")
+    parser.add_argument("--dim", type=int, default=256, help="fake embedding size")
+    parser.add_argument("--pdfs", type=int, default=8, help="synthetic PDFs for preprocessing (0 skips)")
+    parser.add_argument("--pages", type=int, default=25, help="pages per synthetic PDF")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="preprocessing pool sizes")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    revision = git_commit()
+    with tempfile.TemporaryDirectory() as scratch:
+        use_scratch_dirs(Path(scratch))
+
+        # Imported after the data paths are redirected
+        from config.settings import settings
+
+        results = {
+            **revision,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "index_type": settings.FAISS_INDEX_TYPE,
+                "hybrid_search": settings.HYBRID_SEARCH,
+                "embedding_dim": args.dim,
+                "queries": args.queries,
+            },
+            "preprocess": bench_preprocessing(settings, args.pdfs, args.pages, args.workers) if args.pdfs else [],
+            "sizes": [bench_size(settings, size, args.queries, args.dim) for size in args.sizes],
+        }
+
+    output: Optional[Path] = Path(args.output) if args.output else None
+    if output is None:
+        output = RESULTS_DIR / f"{(revision['commit'] or 'unknown')[:12]}{'-dirty' if revision['dirty'] else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
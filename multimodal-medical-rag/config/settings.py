@@ -24,6 +24,11 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4-turbo-preview"
     OPENAI_VISION_MODEL: str = "gpt-4-vision-preview"
     EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_CACHE_DIR: Path = DATA_DIR / "cache" / "embeddings"
+    EMBEDDING_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    EMBEDDING_BATCH_SIZE: int = 256  # texts per embedding request
+    EMBEDDING_CONCURRENCY: int = 4  # embedding requests in flight during builds
+    EMBEDDING_CHECKPOINT_DIR: Path = DATA_DIR / "cache" / "build_checkpoints"
     VISION_MODEL: str = "llava-hf/llava-1.5-7b-hf"
     
     # Chunking Configuration
@@ -32,14 +37,67 @@ class Settings(BaseSettings):
     MAX_CHARS: int = 4000
     NEW_AFTER_N_CHARS: int = 3800
     COMBINE_UNDER_N_CHARS: int = 2000
+
+    # Preprocessing Configuration
+    PREPROCESS_WORKERS: int = 1  # >1 spreads PDFs across a process pool
+    PREPROCESS_STREAMING: bool = False  # stream chunks to data/chunks.jsonl
+    INCREMENTAL_INGEST: bool = True  # only redo PDFs changed since the last run
+    MANIFEST_PATH: Path = DATA_DIR / "manifest.json"
     
+    # Summarization Configuration
+    SUMMARY_CONCURRENCY: int = 8  # vision requests in flight
+    SUMMARY_REQUESTS_PER_MINUTE: Optional[float] = 500
+    SUMMARY_TOKENS_PER_MINUTE: Optional[float] = 200_000
+    SUMMARY_TOKENS_PER_REQUEST: int = 3000  # rough estimate for one image request
+    SUMMARY_MAX_RETRIES: int = 5
+    SUMMARY_CACHE_PATH: Path = DATA_DIR / "cache" / "summaries.sqlite"
+    SUMMARY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
     # Retrieval Configuration
     TOP_K_RETRIEVAL: int = 4
-    SIMILARITY_THRESHOLD: float = 0.7
+    # Cosine similarity; text-embedding-3-small puts relevant chunks around 0.35-0.7
+    SIMILARITY_THRESHOLD: float = 0.35
+    QUERY_CACHE_SIZE: int = 1024  # entries per query path cache (0 disables)
+    QUERY_CACHE_TTL: Optional[float] = 3600  # seconds
+    HYBRID_SEARCH: bool = True  # fuse BM25 with dense hits (reciprocal rank fusion)
+    HYBRID_FETCH_K: int = 20  # hits taken from each retriever before fusion
+    LEXICAL_K1: float = 1.2  # BM25 term-frequency saturation
+    LEXICAL_B: float = 0.75  # BM25 length normalization
+    QUERY_EMBEDDING_TIMEOUT: Optional[float] = 2.0  # seconds, then lexical-only
+
+    # Context Configuration (QA prompt)
+    CONTEXT_MAX_TOKENS: int = 3000
+    CONTEXT_REDUNDANCY_THRESHOLD: float = 0.8  # word-set Jaccard above which a chunk is a duplicate
+    CONTEXT_MIN_OVERLAP_WORDS: int = 8  # shortest shared edge trimmed between chunks
+
+    # Vector Index Configuration
+    FAISS_INDEX_TYPE: str = "flat"  # "flat" | "ivf_flat" | "ivf_pq" | "hnsw"
+    FAISS_NLIST: int = 1024  # IVF cells (capped by corpus size)
+    FAISS_PQ_M: int = 16  # PQ sub-quantizers; must divide the embedding size
+    FAISS_HNSW_M: int = 32  # HNSW graph degree
+    FAISS_NPROBE: int = 16  # IVF cells visited per query
+    FAISS_EF_SEARCH: int = 64  # HNSW candidate list size per query
+    FAISS_TRAIN_SAMPLE: int = 100_000  # vectors sampled to train IVF / PQ
     
     # Agent Configuration
+    DEEP_RESEARCH_K: int = 4  # hits per sub-query
+    DEEP_RESEARCH_MAX_DOCS: int = 6  # merged documents passed to the QA agent
+    DEEP_RESEARCH_MERGE: str = "rrf"  # "rrf" | "mmr"
+    DEEP_RESEARCH_MMR_LAMBDA: float = 0.5
     AGENT_TEMPERATURE: float = 0.7
+    REQUEST_TIMEOUT: Optional[float] = 60.0  # seconds per async (arun) query
+    ROUTER_MODE: str = "adaptive"  # "adaptive" (quick first, escalate on low confidence) | "length"
+    ROUTER_MIN_SCORE: float = 0.45  # best quick-hit similarity below which deep mode runs
+    ROUTER_MIN_MARGIN: float = 0.02  # best minus weakest quick-hit similarity below which deep mode runs
+    ROUTER_CONFIDENT_SCORE: float = 0.8  # best quick-hit similarity above which the margin is not checked
+    ROUTER_LOG_FILE: Optional[Path] = None  # JSONL of decisions (with raw queries) for tuning; None disables
     MAX_ITERATIONS: int = 5
+
+    # HTTP Service (server.py)
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 8000
+    BATCH_MAX_SIZE: int = 32  # quick-mode queries embedded / searched together
+    BATCH_MAX_WAIT_MS: float = 5.0  # how long the first query waits for others
     
     # Memory Configuration
     MEMORY_WINDOW: int = 10  # Number of previous messages to keep
@@ -55,6 +113,11 @@ class Settings(BaseSettings):
     
     # Logging
     LOG_LEVEL: str = "INFO"
+
+    # Tracing / Metrics (src/tracing.py); both off = near-zero overhead
+    TRACING_ENABLED: bool = False  # per-stage JSON traces
+    TRACE_FILE: Optional[Path] = DATA_DIR / "traces.jsonl"  # None keeps traces in memory only
+    METRICS_ENABLED: bool = False  # counters / histograms (server.py always collects)
     
     class Config:
         env_file = ".env"
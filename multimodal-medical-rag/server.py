@@ -0,0 +1,191 @@
+"""
+Headless HTTP API in front of MultiAgentGraph.
+- POST /query          {"query": "..."} -> {"answer", "mode", "latency_ms"}
+- POST /query/stream   same body; the answer is streamed as plain text
+- GET  /health         index size and batching statistics
+- GET  /metrics        Prometheus counters / histograms (src/tracing.py)
+- GET  /traces         most recent JSON traces (with TRACING_ENABLED)
+- Quick-mode retrieval from concurrent requests is micro-batched (QueryBatcher)
+- --fake serves a synthetic index with stubbed OpenAI backends, for local testing
+
+Usage (from multimodal-medical-rag/):
+    python server.py [--fake] [--host HOST] [--port PORT]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from loguru import logger
+from pydantic import BaseModel, Field
+
+
+class QueryRequest(BaseModel):
+    query: str = Field(..., min_length=1, max_length=4000)
+
+
+class QueryResponse(BaseModel):
+    answer: str
+    mode: str
+    latency_ms: float
+
+
+def create_app(fake: bool = False, fake_docs: int = 2000) -> FastAPI:
+    """
+    Build the service. Project modules are imported here rather than at the
+    top so that --fake can redirect the data paths before settings load.
+    """
+    if fake:
+        from benchmarks.fakes import use_scratch_dirs
+        use_scratch_dirs(Path(tempfile.mkdtemp(prefix="medical-rag-fake-")))
+
+    from langchain_core.documents import Document
+    from langchain_core.language_models import BaseChatModel
+
+    from config.settings import settings
+    from src.context_builder import distance_to_similarity, with_score
+    from src.embeddings import VectorStoreManager
+    from src.graph.agent_graph import MultiAgentGraph
+    from src.query_batcher import QueryBatcher
+    from src import tracing
+
+    # /metrics is the consumer of the registry, so the service always collects
+    tracing.configure(metrics=True)
+
+    def load_manager() -> Tuple[VectorStoreManager, Optional[BaseChatModel]]:
+        if not fake:
+            manager = VectorStoreManager()
+            manager.load_vectorstore()
+            return manager, None
+
+        from benchmarks.fakes import FakeChatModel, FakeEmbeddings, synthetic_summaries
+
+        embeddings = FakeEmbeddings()
+        manager = VectorStoreManager(embeddings=embeddings)
+        manager.build_vectorstore(manager.create_documents(synthetic_summaries(fake_docs)))
+        # Latencies in the range of the real APIs, applied once the index exists
+        embeddings.latency = 0.05
+        return manager, FakeChatModel(latency=0.5, token_latency=0.01)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        manager, llm = await asyncio.to_thread(load_manager)
+        app.state.manager = manager
+        app.state.graph = MultiAgentGraph(manager, llm=llm)
+        app.state.batcher = QueryBatcher(manager)
+        logger.info(f"Serving {len(manager.doc_store)} documents{' (fake backends)' if fake else ''}")
+        try:
+            yield
+        finally:
+            await app.state.batcher.close()
+            manager.doc_store.close()
+
+    app = FastAPI(title="Medical RAG", lifespan=lifespan)
+
+    async def quick_retrieve(query: str) -> List[Document]:
+        """RetrievalAgent.aretrieve, sharing batches with concurrent requests."""
+        try:
+            hits = await app.state.batcher.search(query, k=5)
+        except Exception as e:
+            # Same contract as RetrievalAgent: answer without context rather than fail
+            logger.error(f"Error during retrieval: {e}")
+            return []
+        return [with_score(doc, distance_to_similarity(distance)) for doc, distance in hits]
+
+    async def retrieve(query: str) -> Tuple[str, List[Document]]:
+        """Route the query the way the graph would, with batched quick retrieval."""
+        graph: MultiAgentGraph = app.state.graph
+        if graph.adaptive:
+            return await graph.aresolve(query, await quick_retrieve(query))
+
+        mode = graph.route(query)
+        tracing.count("queries_total", mode=mode)
+        if mode == "deep":
+            return mode, await graph.deep_agent.aresearch(query)
+        return mode, await quick_retrieve(query)
+
+    @app.post("/query", response_model=QueryResponse)
+    async def query(request: QueryRequest) -> QueryResponse:
+        start = time.perf_counter()
+
+        async def run() -> Tuple[str, str]:
+            with tracing.span("http.query") as s:
+                mode, docs = await retrieve(request.query)
+                s.set(mode=mode, docs=len(docs))
+                return mode, await app.state.graph.arun(request.query, timeout=None, docs=docs)
+
+        try:
+            mode, answer = await asyncio.wait_for(run(), settings.REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            tracing.count("request_timeouts_total", endpoint="query")
+            raise HTTPException(status_code=504, detail="Query timed out")
+
+        return QueryResponse(answer=answer, mode=mode, latency_ms=(time.perf_counter() - start) * 1000)
+
+    @app.post("/query/stream")
+    async def query_stream(request: QueryRequest) -> StreamingResponse:
+        # Retrieval happens before the response starts, so a timeout is still a 504
+        try:
+            mode, docs = await asyncio.wait_for(retrieve(request.query), settings.REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            tracing.count("request_timeouts_total", endpoint="query_stream")
+            raise HTTPException(status_code=504, detail="Retrieval timed out")
+
+        async def tokens():
+            try:
+                async for token in app.state.graph.astream(request.query, docs=docs):
+                    yield token
+            except asyncio.TimeoutError:
+                # Headers are already sent; end the body early
+                tracing.count("request_timeouts_total", endpoint="query_stream")
+                logger.warning(f"Answer stream timed out: {request.query!r}")
+
+        return StreamingResponse(
+            tokens(), media_type="text/plain; charset=utf-8", headers={"X-Route-Mode": mode}
+        )
+
+    @app.get("/health")
+    async def health() -> dict:
+        batcher: QueryBatcher = app.state.batcher
+        return {
+            "status": "ok",
+            "documents": len(app.state.manager.doc_store),
+            "batches": batcher.batches,
+            "batched_queries": batcher.queries,
+            "average_batch_size": round(batcher.average_batch_size, 2),
+        }
+
+    @app.get("/metrics")
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(tracing.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/traces")
+    async def traces(limit: int = Query(20, ge=1)) -> list:
+        return list(tracing.recent_traces)[-limit:]
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP query service for the medical RAG graph")
+    parser.add_argument("--host", default=None, help="default: SERVER_HOST")
+    parser.add_argument("--port", type=int, default=None, help="default: SERVER_PORT")
+    parser.add_argument("--fake", action="store_true", help="synthetic index, stubbed OpenAI backends")
+    parser.add_argument("--fake-docs", type=int, default=2000, help="synthetic documents with --fake")
+    args = parser.parse_args()
+
+    app = create_app(fake=args.fake, fake_docs=args.fake_docs)
+
+    from config.settings import settings
+    uvicorn.run(app, host=args.host or settings.SERVER_HOST, port=args.port or settings.SERVER_PORT)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,33 @@
+import asyncio
+
 from loguru import logger
-from typing import List
+from typing import List, Optional, Tuple
 
+import numpy as np
 from langchain_openai import ChatOpenAI
 from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
 
+from config.settings import settings
 from src.embeddings import VectorStoreManager
+from src.context_builder import distance_to_similarity, with_score
+from src.fusion import dedupe, mmr_select, reciprocal_rank_fusion
+from src.tracing import annotate, span
 
 
 class DeepResearchAgent:
     """
     Breaks a complex query into sub-queries
-    and retrieves evidence for each.
+    and retrieves evidence for all of them in one batch.
     """
 
-    def __init__(self, vectorstore_manager: VectorStoreManager):
+    def __init__(self, vectorstore_manager: VectorStoreManager, llm: Optional[BaseChatModel] = None):
         self.vs = vectorstore_manager
-        self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
+        self.llm = llm or ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
 
-    def _generate_subqueries(self, query: str) -> List[str]:
-        prompt = f"""
+    @staticmethod
+    def _subquery_prompt(query: str) -> str:
+        return f"""
 Break the following medical research question into 3 focused sub-questions:
 
 Question:
@@ -26,24 +35,109 @@ Question:
 
 Return only the sub-questions as bullet points.
 """
-        response = self.llm.invoke(prompt)
-        lines = response.content.split("\n")
+
+    @staticmethod
+    def _parse_subqueries(content: str) -> List[str]:
+        lines = content.split("\n")
         return [l.strip("- ").strip() for l in lines if l.strip()]
 
-    def research(self, query: str) -> List[Document]:
+    def _generate_subqueries(self, query: str) -> List[str]:
+        with span("deep.subqueries") as s:
+            response = self.llm.invoke(self._subquery_prompt(query))
+            subqueries = self._parse_subqueries(response.content)
+            s.set(subqueries=len(subqueries))
+        return subqueries
+
+    async def _agenerate_subqueries(self, query: str) -> List[str]:
+        with span("deep.subqueries") as s:
+            response = await self.llm.ainvoke(self._subquery_prompt(query))
+            subqueries = self._parse_subqueries(response.content)
+            s.set(subqueries=len(subqueries))
+        return subqueries
+
+    def _merge(self, ranked: List[List[Document]], query_vectors: Optional[np.ndarray]) -> List[Document]:
+        """Dedup the per-sub-query hits and keep the best DEEP_RESEARCH_MAX_DOCS."""
+        limit = settings.DEEP_RESEARCH_MAX_DOCS
+
+        # No query vectors when search_many fell back to lexical search
+        if settings.DEEP_RESEARCH_MERGE == "mmr" and query_vectors is not None:
+            candidates = dedupe([doc for docs in ranked for doc in docs])
+            vectors = self.vs.get_document_vectors(candidates)
+            if vectors is not None:
+                # The sub-query vectors search_many embedded: no extra request
+                selected = mmr_select(query_vectors, vectors, limit, settings.DEEP_RESEARCH_MMR_LAMBDA)
+                return [candidates[i] for i in selected]
+            logger.warning("Stored vectors unavailable, falling back to reciprocal rank fusion")
+
+        return reciprocal_rank_fusion(ranked, limit=limit)
+
+    def _combine(
+        self,
+        subqueries: List[str],
+        results: List[List[Tuple[Document, Optional[float]]]],
+        query_vectors: Optional[np.ndarray],
+        seed_docs: Optional[List[Document]] = None
+    ) -> List[Document]:
+        ranked = [[doc for doc, _ in hits] for hits in results]
+        # Lexical fallback: the results already are the BM25 hits
+        if settings.HYBRID_SEARCH and query_vectors is not None:
+            # Exact-term matches per sub-query; local, no extra API call
+            ranked += [self.vs.lexical_search(q, k=settings.DEEP_RESEARCH_K) for q in subqueries]
+        if seed_docs:
+            # Quick-retrieval hits for the full question compete as one more list
+            ranked.append(list(seed_docs))
+
+        all_docs = self._merge(ranked, query_vectors)
+
+        # Score = best similarity to any sub-query or, for seed hits, to the
+        # question itself (None for lexical-only hits)
+        best = {}
+        for doc in seed_docs or []:
+            if doc.metadata.get("score") is not None:
+                best[doc.metadata.get("id")] = doc.metadata["score"]
+        for hits in results:
+            for doc, distance in hits:
+                if distance is None:
+                    continue
+                doc_id = doc.metadata.get("id")
+                best[doc_id] = max(best.get(doc_id, -1.0), distance_to_similarity(distance))
+        all_docs = [with_score(doc, best.get(doc.metadata.get("id"))) for doc in all_docs]
+
+        logger.info(
+            f"Deep research merged {sum(len(r) for r in ranked)} hits "
+            f"into {len(all_docs)} documents"
+        )
+        return all_docs
+
+    def research(self, query: str, seed_docs: Optional[List[Document]] = None) -> List[Document]:
+        """Merged evidence for `query`; `seed_docs` (scored quick hits) join the merge."""
         try:
-            logger.info(f"Starting deep research: {query}")
-            subqueries = self._generate_subqueries(query)
+            with span("deep.research"):
+                logger.info(f"Starting deep research: {query}")
+                subqueries = self._generate_subqueries(query)
 
-            all_docs: List[Document] = []
+                logger.info(f"Researching {len(subqueries)} sub-queries in one batch: {subqueries}")
+                results, query_vectors = self.vs.search_many(subqueries, k=settings.DEEP_RESEARCH_K)
+                docs = self._combine(subqueries, results, query_vectors, seed_docs)
+                annotate(docs=len(docs))
+                return docs
 
-            for sq in subqueries:
-                logger.info(f"Researching sub-query: {sq}")
-                docs = self.vs.search(sq, k=4)
-                all_docs.extend(docs)
+        except Exception as e:
+            logger.error(f"Error in deep research: {e}")
+            return []
+
+    async def aresearch(self, query: str, seed_docs: Optional[List[Document]] = None) -> List[Document]:
+        try:
+            with span("deep.research"):
+                logger.info(f"Starting deep research: {query}")
+                subqueries = await self._agenerate_subqueries(query)
 
-            logger.info(f"Deep research collected {len(all_docs)} documents")
-            return all_docs
+                logger.info(f"Researching {len(subqueries)} sub-queries in one batch: {subqueries}")
+                results, query_vectors = await self.vs.asearch_many(subqueries, k=settings.DEEP_RESEARCH_K)
+                # BM25 and the merge are CPU work: keep them off the event loop
+                docs = await asyncio.to_thread(self._combine, subqueries, results, query_vectors, seed_docs)
+                annotate(docs=len(docs))
+                return docs
 
         except Exception as e:
             logger.error(f"Error in deep research: {e}")
@@ -1,8 +1,14 @@
+import time
+from collections import deque
 from loguru import logger
-from typing import List
+from typing import AsyncIterator, Iterator, List, Optional
 
 from langchain_openai import ChatOpenAI
 from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+
+from src.context_builder import ContextBuilder
+from src.tracing import annotate, count, observe, span, traced_stream
 
 
 class QAAgent:
@@ -10,17 +16,22 @@ class QAAgent:
     Generates final answer using retrieved context.
     """
 
-    def __init__(self):
-        self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        self.llm = llm or ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+        self.context_builder = ContextBuilder()
+        # Recent time-to-first-token samples (seconds) of streamed answers
+        self.time_to_first_token: deque = deque(maxlen=1000)
 
-    def answer(self, query: str, documents: List[Document]) -> str:
-        logger.info(f"Answering question: {query}")
+    def _prompt(self, query: str, documents: List[Document]) -> str:
+        # Best non-redundant chunks above the score threshold, within budget
+        with span("qa.context") as s:
+            built = self.context_builder.build(query, documents)
+            s.set(docs_in=len(documents), docs_used=len(built.documents), tokens=built.tokens)
+        count("context_tokens_total", built.tokens)
+        count("context_tokens_saved_total", max(built.tokens_saved, 0))
+        context = built.text
 
-        context = "\n\n".join(
-            doc.page_content for doc in documents[:6]
-        )
-
-        prompt = f"""
+        return f"""
 You are a medical AI assistant.
 
 Context:
@@ -32,5 +43,74 @@ Question:
 Answer clearly, accurately, and safely.
 """
 
-        response = self.llm.invoke(prompt)
+    def answer(self, query: str, documents: List[Document]) -> str:
+        logger.info(f"Answering question: {query}")
+
+        prompt = self._prompt(query, documents)
+        with span("qa.llm"):
+            response = self.llm.invoke(prompt)
+            self._record_usage(response)
         return response.content
+
+    async def aanswer(self, query: str, documents: List[Document]) -> str:
+        logger.info(f"Answering question: {query}")
+
+        prompt = self._prompt(query, documents)
+        with span("qa.llm"):
+            response = await self.llm.ainvoke(prompt)
+            self._record_usage(response)
+        return response.content
+
+    @staticmethod
+    def _record_usage(response):
+        """Token counts reported by the provider, when it reports them."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            annotate(input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+            count("llm_tokens_total", usage.get("input_tokens", 0), stage="qa", kind="input")
+            count("llm_tokens_total", usage.get("output_tokens", 0), stage="qa", kind="output")
+
+    def stream_answer(self, query: str, documents: List[Document]) -> Iterator[str]:
+        """Yield the answer as the LLM produces it; records time to first token."""
+        logger.info(f"Streaming answer: {query}")
+
+        start = time.perf_counter()
+        prompt = self._prompt(query, documents)
+        yield from self._llm_stream(prompt, start)
+
+    async def astream_answer(self, query: str, documents: List[Document]) -> AsyncIterator[str]:
+        logger.info(f"Streaming answer: {query}")
+
+        start = time.perf_counter()
+        prompt = self._prompt(query, documents)
+        async for token in self._allm_stream(prompt, start):
+            yield token
+
+    @traced_stream("qa.llm_stream")
+    def _llm_stream(self, prompt: str, start: float) -> Iterator[str]:
+        first_token_at: Optional[float] = None
+        for chunk in self.llm.stream(prompt):
+            if not chunk.content:
+                continue
+            if first_token_at is None:
+                first_token_at = self._first_token(start)
+            yield chunk.content
+
+    @traced_stream("qa.llm_stream")
+    async def _allm_stream(self, prompt: str, start: float) -> AsyncIterator[str]:
+        first_token_at: Optional[float] = None
+        async for chunk in self.llm.astream(prompt):
+            if not chunk.content:
+                continue
+            if first_token_at is None:
+                first_token_at = self._first_token(start)
+            yield chunk.content
+
+    def _first_token(self, start: float) -> float:
+        first_token_at = time.perf_counter() - start
+        self.time_to_first_token.append(first_token_at)
+        # Called from inside qa.llm_stream, which is the current span then
+        annotate(time_to_first_token_ms=round(first_token_at * 1000, 3))
+        observe("time_to_first_token_seconds", first_token_at)
+        logger.info(f"Time to first token: {first_token_at:.2f}s")
+        return first_token_at
@@ -3,6 +3,8 @@ from typing import List
 
 from langchain_core.documents import Document
 from src.embeddings import VectorStoreManager
+from src.context_builder import distance_to_similarity, with_score
+from src.tracing import annotate, traced
 
 
 class RetrievalAgent:
@@ -14,12 +16,30 @@ class RetrievalAgent:
     def __init__(self, vectorstore_manager: VectorStoreManager):
         self.vs = vectorstore_manager
 
+    @traced("retrieval.quick")
     def retrieve(self, query: str, k: int = 5) -> List[Document]:
+        """Top-k documents, each with its similarity in metadata["score"]."""
         try:
             logger.info("Running FAISS similarity search...")
-            docs = self.vs.search(query=query, k=k)
+            docs = self._scored(self.vs.search_with_scores(query=query, k=k))
             logger.info(f"Retrieved {len(docs)} documents")
+            annotate(docs=len(docs))
             return docs
         except Exception as e:
             logger.error(f"Error during retrieval: {e}")
             return []
+
+    @traced("retrieval.quick")
+    async def aretrieve(self, query: str, k: int = 5) -> List[Document]:
+        try:
+            docs = self._scored(await self.vs.asearch_with_scores(query=query, k=k))
+            logger.info(f"Retrieved {len(docs)} documents")
+            annotate(docs=len(docs))
+            return docs
+        except Exception as e:
+            logger.error(f"Error during retrieval: {e}")
+            return []
+
+    @staticmethod
+    def _scored(hits) -> List[Document]:
+        return [with_score(doc, distance_to_similarity(distance)) for doc, distance in hits]
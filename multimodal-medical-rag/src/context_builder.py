@@ -0,0 +1,143 @@
+"""
+Prompt context assembly for the QA agent.
+- Drops hits scoring below SIMILARITY_THRESHOLD (always keeps the best one)
+- Skips near-duplicate chunks and trims the words a chunk shares with a
+  neighbouring chunk's overlap window
+- Packs the remaining chunks, best first, into CONTEXT_MAX_TOKENS
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from loguru import logger
+from langchain_core.documents import Document
+
+from config.settings import settings
+from src.tokens import count_tokens
+
+# How many leading documents the QA prompt used to take unconditionally;
+# the baseline for the "tokens saved" log line
+LEGACY_CONTEXT_DOCS = 6
+
+
+def distance_to_similarity(distance: Optional[float]) -> Optional[float]:
+    """Cosine similarity from a FAISS squared-L2 distance (unit-length embeddings)."""
+    return None if distance is None else 1.0 - distance / 2.0
+
+
+def with_score(doc: Document, score: Optional[float]) -> Document:
+    """Copy of `doc` carrying its score; stored documents are shared and never mutated."""
+    return Document(page_content=doc.page_content, metadata={**doc.metadata, "score": score})
+
+
+@dataclass
+class Context:
+    text: str
+    documents: List[Document] = field(default_factory=list)
+    tokens: int = 0
+    baseline_tokens: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.baseline_tokens - self.tokens
+
+
+class ContextBuilder:
+    """Turns ranked, scored documents into a token-bounded context string."""
+
+    def __init__(
+        self,
+        max_tokens: int = settings.CONTEXT_MAX_TOKENS,
+        min_score: Optional[float] = settings.SIMILARITY_THRESHOLD,
+        redundancy_threshold: float = settings.CONTEXT_REDUNDANCY_THRESHOLD,
+        min_overlap_words: int = settings.CONTEXT_MIN_OVERLAP_WORDS,
+    ):
+        self.max_tokens = max_tokens
+        self.min_score = min_score
+        self.redundancy_threshold = redundancy_threshold
+        self.min_overlap_words = min_overlap_words
+
+    # --------------------------------------------------
+    # FILTERING
+    # --------------------------------------------------
+
+    def _above_threshold(self, documents: List[Document]) -> List[Document]:
+        """Unscored documents (e.g. lexical-only hits) are kept."""
+        if self.min_score is None or not documents:
+            return documents
+
+        kept = [
+            doc for doc in documents
+            if doc.metadata.get("score") is None or doc.metadata["score"] >= self.min_score
+        ]
+        if not kept:
+            # Nothing clears the bar: answering from the best hit beats no context
+            kept = documents[:1]
+        return kept
+
+    @staticmethod
+    def _similarity(a: set, b: set) -> float:
+        return len(a & b) / len(a | b) if a and b else 0.0
+
+    def _trim_overlap(self, words: List[str], selected: List[List[str]]) -> List[str]:
+        """Drop a leading / trailing run of words already present at a selected chunk's edge."""
+        for other in selected:
+            limit = min(len(words), len(other)) - 1
+            for size in range(limit, self.min_overlap_words - 1, -1):
+                if other[-size:] == words[:size]:
+                    words = words[size:]
+                    break
+                if words[-size:] == other[:size]:
+                    words = words[:-size]
+                    break
+        return words
+
+    # --------------------------------------------------
+    # BUILD
+    # --------------------------------------------------
+
+    def build(self, query: str, documents: List[Document]) -> Context:
+        baseline = "\n\n".join(doc.page_content for doc in documents[:LEGACY_CONTEXT_DOCS])
+        context = Context(text="", baseline_tokens=count_tokens(baseline) if baseline else 0)
+
+        parts: List[str] = []
+        selected_words: List[List[str]] = []
+        selected_sets: List[set] = []
+        budget = self.max_tokens
+
+        for doc in self._above_threshold(documents):
+            words = doc.page_content.split()
+            token_set = {w.lower() for w in words}
+            if any(self._similarity(token_set, s) >= self.redundancy_threshold for s in selected_sets):
+                continue
+
+            words = self._trim_overlap(words, selected_words)
+            if not words:
+                continue
+
+            text = " ".join(words)
+            tokens = count_tokens(text)
+            if tokens > budget:
+                if parts:
+                    # A smaller chunk further down may still fit
+                    continue
+                # Even the best chunk is too long: keep its beginning
+                text = text[: budget * 4]
+                while count_tokens(text) > budget:
+                    text = text[: int(len(text) * 0.9)]
+                tokens = count_tokens(text)
+
+            parts.append(text)
+            selected_words.append(words)
+            selected_sets.append(token_set)
+            context.documents.append(doc)
+            budget -= tokens + 1  # separator
+
+        context.text = "\n\n".join(parts)
+        context.tokens = count_tokens(context.text) if parts else 0
+
+        logger.info(
+            f"Context: {len(context.documents)}/{len(documents)} chunks, "
+            f"{context.tokens} tokens ({context.tokens_saved} saved vs. first {LEGACY_CONTEXT_DOCS})"
+        )
+        return context
@@ -0,0 +1,215 @@
+"""
+Disk-backed store of the full content behind every indexed document.
+- SQLite file next to the FAISS index; records are read one at a time on demand
+- Text fields are content-addressed, so identical strings (e.g. a text chunk's
+  original_content and summary) are stored once
+- Dict-like interface: store[doc_id] = record, get, pop, in, len
+- Builds write to a staging copy (staged_copy) that replaces the live file
+  only when the index is saved (promote)
+- Only the original content lives here: the summaries are also the
+  page_content of LangChain's pickled docstore (index.pkl), which is loaded
+  into memory whole
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from loguru import logger
+
+
+class DocStore:
+    """doc_id -> {original_content, summary, type, page_number, metadata}."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        # Agents may read from several threads
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened on first use so creating a manager touches no disk
+        with self._lock:
+            if self._conn is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+                self._conn.executescript(
+                    "CREATE TABLE IF NOT EXISTS blobs ("
+                    " hash TEXT PRIMARY KEY,"
+                    " content TEXT NOT NULL);"
+                    "CREATE TABLE IF NOT EXISTS docs ("
+                    " doc_id TEXT PRIMARY KEY,"
+                    " original_hash TEXT NOT NULL,"
+                    " summary_hash TEXT NOT NULL,"
+                    " type TEXT,"
+                    " page_number INTEGER,"
+                    " metadata TEXT NOT NULL);"
+                )
+            return self._conn
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _put_blob(self, text: str) -> str:
+        digest = self._hash(text)
+        self.conn.execute("INSERT OR IGNORE INTO blobs (hash, content) VALUES (?, ?)", (digest, text))
+        return digest
+
+    # --------------------------------------------------
+    # DICT INTERFACE
+    # --------------------------------------------------
+
+    def __setitem__(self, doc_id: str, record: Dict):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO docs"
+                " (doc_id, original_hash, summary_hash, type, page_number, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    doc_id,
+                    self._put_blob(record.get("original_content") or ""),
+                    self._put_blob(record.get("summary") or ""),
+                    record.get("type"),
+                    record.get("page_number"),
+                    json.dumps(record.get("metadata", {})),
+                ),
+            )
+
+    def get(self, doc_id: str, default: Optional[Dict] = None) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT o.content, s.content, d.type, d.page_number, d.metadata"
+                " FROM docs d"
+                " JOIN blobs o ON o.hash = d.original_hash"
+                " JOIN blobs s ON s.hash = d.summary_hash"
+                " WHERE d.doc_id = ?",
+                (doc_id,),
+            ).fetchone()
+
+        if row is None:
+            return default
+
+        return {
+            "original_content": row[0],
+            "summary": row[1],
+            "type": row[2],
+            "page_number": row[3],
+            "metadata": json.loads(row[4]),
+        }
+
+    def pop(self, doc_id: str, default: Optional[Dict] = None) -> Optional[Dict]:
+        with self._lock:
+            record = self.get(doc_id)
+            if record is None:
+                return default
+            # Unreferenced blobs are collected on commit()
+            self.conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+            return record
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM docs WHERE doc_id = ?", (doc_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    # --------------------------------------------------
+    # MAINTENANCE
+    # --------------------------------------------------
+
+    def retain(self, doc_ids: Iterable[str]):
+        """Delete every record whose id is not in `doc_ids` (used by full rebuilds)."""
+        with self._lock:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep (doc_id TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM keep")
+            self.conn.executemany("INSERT OR IGNORE INTO keep VALUES (?)", ((i,) for i in doc_ids))
+            self.conn.execute("DELETE FROM docs WHERE doc_id NOT IN (SELECT doc_id FROM keep)")
+            self.conn.execute("DROP TABLE keep")
+
+    def commit(self):
+        """Drop unreferenced blobs and make all pending writes durable."""
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM blobs WHERE hash NOT IN"
+                " (SELECT original_hash FROM docs UNION SELECT summary_hash FROM docs)"
+            )
+            self.conn.commit()
+
+    def staged_copy(self, copy: bool = True) -> "DocStore":
+        """
+        Writable store next to this one, starting as a copy of it (or empty);
+        this store is left untouched until the copy is promote()d over it.
+        """
+        staging = self.path.with_name(self.path.name + ".staging")
+        staging.unlink(missing_ok=True)
+        if copy and self.path.exists():
+            self.save_as(staging)
+        return DocStore(staging)
+
+    def promote(self, path: Path):
+        """Commit, then atomically replace the store at `path` with this one."""
+        path = Path(path)
+        with self._lock:
+            self.commit()
+            self.close()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.replace(self.path, path)
+            except OSError:
+                # Different filesystem: copy under a temporary name, then swap
+                tmp_path = path.with_name(path.name + ".tmp")
+                tmp_path.unlink(missing_ok=True)
+                self.save_as(tmp_path)
+                self.close()
+                os.replace(tmp_path, path)
+                self.path.unlink()
+            self.path = path
+
+    def discard(self):
+        """Close and delete this store (an abandoned staging copy)."""
+        with self._lock:
+            self.close()
+            self.path.unlink(missing_ok=True)
+
+    def save_as(self, path: Path):
+        """Commit, then copy the whole store to `path` (used when saving elsewhere)."""
+        path = Path(path)
+        if path.resolve() == self.path.resolve():
+            self.commit()
+            return
+
+        with self._lock:
+            self.commit()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            target = sqlite3.connect(str(path))
+            try:
+                self.conn.backup(target)
+            finally:
+                target.close()
+
+    def migrate_pickle(self, pickle_path: Path) -> int:
+        """One-time import of a legacy doc_store.pkl dict; returns records imported."""
+        with open(pickle_path, "rb") as f:
+            legacy: Dict[str, Dict] = pickle.load(f)
+
+        with self._lock:
+            for doc_id, record in legacy.items():
+                self[doc_id] = record
+            self.commit()
+
+        logger.info(f"Migrated {len(legacy)} records from {pickle_path} to {self.path}")
+        return len(legacy)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,215 @@
+"""
+Persistent embedding cache keyed by (model id, text hash).
+- One directory per model: vectors.npy (float32 matrix) + keys.json (row index)
+- Least-recently-used rows are evicted once the matrix exceeds a byte budget
+- CachedEmbeddings wraps any LangChain Embeddings so index builds only embed new text
+
+Kept dependency-free beyond numpy / langchain_core so both pipelines can use it.
+The two pipelines are installed and run separately, so each ships its own
+copy (multimodal-medical-rag/src/ and multimodal-rag-groq/). Edit both
+together: multimodal-medical-rag/tests/test_shared_copies.py fails when they differ.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingCache:
+    """Float32 matrix of cached vectors plus a text-hash -> row index."""
+
+    def __init__(self, cache_dir: Path, model_id: str, max_bytes: int = 512 * 1024 * 1024):
+        self.dir = Path(cache_dir) / re.sub(r"[^A-Za-z0-9._-]+", "_", model_id)
+        self.model_id = model_id
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._loaded = False
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: List[str] = []
+        self._last_used: List[float] = []
+        self._rows: Dict[str, int] = {}
+        # Index builds embed batches from several threads
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._keys)
+
+    def _load(self):
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                self._read()
+
+    def _read(self):
+        meta_path = self.dir / "keys.json"
+        if not meta_path.exists():
+            return
+
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        self._vectors = np.load(self.dir / "vectors.npy")
+        self._keys = meta["keys"]
+        self._last_used = meta["last_used"]
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        self._load()
+        now = time.time()
+        found: List[Optional[np.ndarray]] = []
+
+        with self._lock:
+            for text in texts:
+                row = self._rows.get(self.text_key(text))
+                if row is None:
+                    self.misses += 1
+                    found.append(None)
+                else:
+                    self.hits += 1
+                    self._last_used[row] = now
+                    found.append(self._vectors[row])
+
+        return found
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        self._load()
+        now = time.time()
+        new_keys, new_rows = [], []
+
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self.text_key(text)
+                if key in self._rows or key in new_keys:
+                    continue
+                new_keys.append(key)
+                new_rows.append(vector)
+
+            if not new_keys:
+                return
+
+            block = np.asarray(new_rows, dtype=np.float32)
+            self._vectors = block if self._vectors is None else np.vstack([self._vectors, block])
+            for key in new_keys:
+                self._rows[key] = len(self._keys)
+                self._keys.append(key)
+                self._last_used.append(now)
+
+    def _evict(self):
+        if self._vectors is None or self._vectors.nbytes <= self.max_bytes:
+            return
+
+        max_rows = max(1, self.max_bytes // (self._vectors.shape[1] * 4))
+        keep = sorted(np.argsort(self._last_used)[-max_rows:])
+
+        self._vectors = self._vectors[keep]
+        self._keys = [self._keys[i] for i in keep]
+        self._last_used = [self._last_used[i] for i in keep]
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+
+    def save(self):
+        with self._lock:
+            if self._loaded and self._vectors is not None:
+                self._write()
+
+    def _write(self):
+        self._evict()
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+        # Write both files under temporary names, then swap them in
+        tmp_vectors = self.dir / "vectors.tmp.npy"
+        tmp_meta = self.dir / "keys.tmp.json"
+        np.save(tmp_vectors, self._vectors)
+        tmp_meta.write_text(
+            json.dumps({"model": self.model_id, "keys": self._keys, "last_used": self._last_used}),
+            encoding="utf-8",
+        )
+        os.replace(tmp_vectors, self.dir / "vectors.npy")
+        os.replace(tmp_meta, self.dir / "keys.json")
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends cache misses to the wrapped model."""
+
+    def __init__(self, underlying: Embeddings, cache: EmbeddingCache):
+        self.underlying = underlying
+        self.cache = cache
+        self.embedded = 0
+        self.embed_seconds = 0.0
+        self._stats_lock = threading.Lock()
+
+    def _split(self, texts: List[str]):
+        cached = self.cache.get_many(texts)
+        # Deduplicate misses so repeated texts are embedded once
+        missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        return cached, missing
+
+    def _merge(self, texts, cached, missing, new_vectors) -> List[List[float]]:
+        self.cache.put_many(missing, new_vectors)
+        fresh = dict(zip(missing, new_vectors))
+        return [
+            list(map(float, vector)) if vector is not None else list(fresh[text])
+            for text, vector in zip(texts, cached)
+        ]
+
+    def _count(self, embedded: int, seconds: float):
+        with self._stats_lock:
+            self.embedded += embedded
+            self.embed_seconds += seconds
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        cached, missing = self._split(texts)
+        new_vectors: List[List[float]] = []
+
+        if missing:
+            start = time.perf_counter()
+            new_vectors = self.underlying.embed_documents(missing)
+            self._count(len(missing), time.perf_counter() - start)
+
+        return self._merge(texts, cached, missing, new_vectors)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        cached, missing = self._split(texts)
+        new_vectors: List[List[float]] = []
+
+        if missing:
+            start = time.perf_counter()
+            new_vectors = await self.underlying.aembed_documents(missing)
+            self._count(len(missing), time.perf_counter() - start)
+
+        return self._merge(texts, cached, missing, new_vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.underlying.aembed_query(text)
+
+    @property
+    def seconds_saved(self) -> float:
+        """Estimated from the average cost of the texts that were embedded."""
+        if not self.embedded:
+            return 0.0
+        return self.cache.hits * self.embed_seconds / self.embedded
+
+    def report(self) -> str:
+        return (
+            f"embedding cache [{self.cache.model_id}]: {self.cache.hits} hits / "
+            f"{self.cache.misses} misses, {self.embedded} texts embedded in "
+            f"{self.embed_seconds:.2f}s, ~{self.seconds_saved:.2f}s saved"
+        )
+
+    def save(self):
+        self.cache.save()
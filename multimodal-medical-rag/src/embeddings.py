@@ -3,32 +3,148 @@ Vector embeddings and FAISS vector store management.
 Creates embeddings ONLY from stored processed_chunks.json
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Set, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import contextvars
+import hashlib
+import os
+import shutil
+import time
 import uuid
 import json
-import pickle
 from pathlib import Path
 
+import numpy as np
 from loguru import logger
 from langchain_openai import OpenAIEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 
 from config.settings import settings
+from src.manifest import DocumentManifest
+from src.doc_store import DocStore
+from src.faiss_index import (
+    build_index, enable_reconstruction, selector_params, set_search_params, supports_removal
+)
+from src.embedding_cache import EmbeddingCache, CachedEmbeddings
+from src.fusion import reciprocal_rank_fusion
+from src.lexical_index import LexicalIndex
+from src.tokens import count_tokens
+from src.query_cache import TTLCache, normalize_query
+from src.tracing import annotate, cache_lookups, count, traced
+
+# Namespace for deterministic doc ids derived from chunk ids
+DOC_ID_NAMESPACE = uuid.UUID("6f1d3c52-8a4e-4f7b-9b1e-2d6c0a9e5f31")
+
+DOC_STORE_FILE = "doc_store.sqlite"
+LEXICAL_INDEX_FILE = "lexical_index.npz"
+# Pre-SQLite format, migrated on first load
+LEGACY_DOC_STORE_FILE = "doc_store.pkl"
+
+
+def stable_doc_id(chunk_id: str) -> str:
+    """Same chunk id -> same doc id, so re-indexing never duplicates vectors."""
+    return str(uuid.uuid5(DOC_ID_NAMESPACE, chunk_id))
+
+
+# A chunk type ("text" | "image" | "table") or several of them
+TypeFilter = Union[str, Sequence[str], None]
+
+
+def normalize_type_filter(filter_type: TypeFilter) -> Optional[Tuple[str, ...]]:
+    """Hashable, order-independent form of a type filter; None means no filter."""
+    if not filter_type:
+        return None
+    if isinstance(filter_type, str):
+        return (filter_type,)
+    return tuple(sorted(set(filter_type)))
+
+
+def cache_model_id(embeddings: Embeddings) -> str:
+    """
+    EmbeddingCache key of an injected Embeddings object: its class plus the
+    model / dimension it is configured with, so vectors of one backend are
+    never served as another's (e.g. benchmark fakes as OpenAI vectors).
+    """
+    cls = type(embeddings)
+    parts = [f"{cls.__module__}.{cls.__qualname__}"]
+    for attr in ("model", "model_name", "dimensions", "size"):
+        value = getattr(embeddings, attr, None)
+        if value is not None:
+            parts.append(f"{attr}={value}")
+    return "-".join(parts)
 
 
 class VectorStoreManager:
     """Manages vector embeddings, FAISS storage, and document retrieval."""
 
-    def __init__(self, api_key: str = settings.OPENAI_API_KEY):
-        self.embeddings = OpenAIEmbeddings(
-            model=settings.EMBEDDING_MODEL,
-            openai_api_key=api_key
+    def __init__(
+        self,
+        api_key: str = settings.OPENAI_API_KEY,
+        embeddings: Optional[Embeddings] = None
+    ):
+        # Any LangChain Embeddings can be injected (e.g. benchmark fakes);
+        # index builds only send texts missing from the on-disk cache, which
+        # is kept per model so injected backends never share the real one's
+        self.embeddings = CachedEmbeddings(
+            embeddings or OpenAIEmbeddings(
+                model=settings.EMBEDDING_MODEL,
+                openai_api_key=api_key
+            ),
+            EmbeddingCache(
+                settings.EMBEDDING_CACHE_DIR,
+                cache_model_id(embeddings) if embeddings is not None else settings.EMBEDDING_MODEL,
+                settings.EMBEDDING_CACHE_MAX_BYTES
+            )
         )
         self.vectorstore: Optional[FAISS] = None
-
-        # Stores full content keyed by doc_id
-        self.doc_store: Dict[str, Dict] = {}
+        # BM25 over the same documents, rebuilt whenever the index changes
+        self.lexical_index: Optional[LexicalIndex] = None
+
+        # Stores full content keyed by doc_id, read from disk on demand (the
+        # summaries also stay in memory, as page_content of the FAISS docstore).
+        # Builds write to a staging copy, swapped in by save_vectorstore, so
+        # a failed build never changes the store the app is reading.
+        self.doc_store = DocStore(settings.FAISS_INDEX_DIR / DOC_STORE_FILE)
+        self._doc_store_staged = False
+
+        # Query path caches: normalized query -> embedding, and
+        # (index version, normalized query, k, filter) -> results
+        self.index_version = 0
+        self.query_embedding_cache = TTLCache(settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL)
+        self.search_result_cache = TTLCache(settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL)
+
+        self._positions: Optional[Dict[str, int]] = None
+        # chunk type -> sorted FAISS positions, for filtered searches
+        self._type_positions: Optional[Dict[str, np.ndarray]] = None
+        # Query embeddings run here so a slow API can be timed out
+        self._query_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-embed")
+
+    def _index_changed(self):
+        """Cached results refer to the old index; drop them."""
+        self.index_version += 1
+        self.search_result_cache.clear()
+        self._positions = None
+        self._type_positions = None
+
+    def _writable_doc_store(self) -> DocStore:
+        if not self._doc_store_staged:
+            live = self.doc_store
+            # Updates start from the loaded records; full builds from nothing
+            self.doc_store = live.staged_copy(copy=self.vectorstore is not None)
+            live.close()
+            self._doc_store_staged = True
+        return self.doc_store
+
+    def _rebuild_lexical_index(self):
+        faiss_ids = list(self.vectorstore.index_to_docstore_id.values())
+        self.lexical_index = LexicalIndex.build(
+            [self.vectorstore.docstore.search(faiss_id) for faiss_id in faiss_ids],
+            doc_ids=faiss_ids,
+        )
 
     # --------------------------------------------------
     # DOCUMENT CREATION
@@ -37,9 +153,15 @@ class VectorStoreManager:
     def create_documents(self, summaries: List[Dict]) -> List[Document]:
         """Convert stored summaries into LangChain Documents."""
         documents: List[Document] = []
+        doc_store = self._writable_doc_store()
 
         for item in summaries:
-            doc_id = str(uuid.uuid4())
+            # Failed summaries are retried by the summarizer, never embedded
+            if item.get("error") or not item.get("summary"):
+                logger.warning(f"Skipping {item['chunk_id']}: no summary")
+                continue
+
+            doc_id = stable_doc_id(item["chunk_id"])
 
             doc = Document(
                 page_content=item["summary"],  # embeddings ONLY from summary
@@ -55,7 +177,7 @@ class VectorStoreManager:
             documents.append(doc)
 
             # Persist full content separately
-            self.doc_store[doc_id] = {
+            doc_store[doc_id] = {
                 "original_content": item["original_content"],
                 "summary": item["summary"],
                 "type": item["chunk_type"],
@@ -70,17 +192,180 @@ class VectorStoreManager:
     # VECTORSTORE BUILD / LOAD
     # --------------------------------------------------
 
+    @traced("embeddings.embed_documents")
+    def embed_documents_batched(
+        self,
+        documents: List[Document],
+        batch_size: int = settings.EMBEDDING_BATCH_SIZE,
+        concurrency: int = settings.EMBEDDING_CONCURRENCY,
+        checkpoint_dir: Path = settings.EMBEDDING_CHECKPOINT_DIR,
+    ) -> np.ndarray:
+        """
+        Embed documents in batches, `concurrency` requests at a time.
+
+        Each finished batch is checkpointed under a name derived from its
+        texts, so an interrupted build resumes with only the missing batches.
+        Checkpoints are removed once every batch has succeeded.
+        """
+        texts = [doc.page_content for doc in documents]
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+        def checkpoint_path(index: int) -> Path:
+            digest = hashlib.sha256("\0".join(batches[index]).encode("utf-8")).hexdigest()[:16]
+            return checkpoint_dir / f"batch_{index:05d}_{digest}.npy"
+
+        vectors: List[Optional[np.ndarray]] = [None] * len(batches)
+        for index in range(len(batches)):
+            if checkpoint_path(index).exists():
+                vectors[index] = np.load(checkpoint_path(index))
+
+        todo = [index for index, batch_vectors in enumerate(vectors) if batch_vectors is None]
+        annotate(texts=len(texts), batches=len(batches), checkpointed_batches=len(batches) - len(todo))
+        if len(todo) < len(batches):
+            logger.info(f"Resuming build: {len(batches) - len(todo)}/{len(batches)} batches checkpointed")
+
+        def embed_batch(index: int) -> int:
+            batch_vectors = np.asarray(self.embeddings.embed_documents(batches[index]), dtype=np.float32)
+            tmp_path = checkpoint_path(index).with_suffix(".tmp.npy")
+            np.save(tmp_path, batch_vectors)
+            os.replace(tmp_path, checkpoint_path(index))
+            vectors[index] = batch_vectors
+            return index
+
+        start = time.perf_counter()
+        done_docs = 0
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = [pool.submit(embed_batch, index) for index in todo]
+            for future in as_completed(futures):
+                # A failed batch raises here; finished batches stay checkpointed
+                done_docs += len(batches[future.result()])
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"Embedded {done_docs}/{sum(len(batches[i]) for i in todo)} docs "
+                    f"({done_docs / elapsed:.1f} docs/sec)"
+                )
+
+        elapsed = time.perf_counter() - start
+        embedded_texts = [text for index in todo for text in batches[index]]
+        if embedded_texts and elapsed:
+            tokens = sum(count_tokens(text) for text in embedded_texts)
+            annotate(embedded_texts=len(embedded_texts), tokens=tokens)
+            count("embedded_texts_total", len(embedded_texts))
+            count("embedding_tokens_total", tokens)
+            logger.info(
+                f"Embedding throughput: {len(embedded_texts) / elapsed:.1f} docs/sec, "
+                f"{tokens / elapsed:.0f} tokens/sec ({len(todo)} batches in {elapsed:.2f}s)"
+            )
+
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(vectors)
+
+    @traced("index.build")
     def build_vectorstore(self, documents: List[Document]) -> FAISS:
         logger.info("Building FAISS vectorstore...")
+        annotate(docs=len(documents))
+
+        return self._build_from_vectors(documents, self.embed_documents_batched(documents))
 
-        self.vectorstore = FAISS.from_documents(
-            documents=documents,
-            embedding=self.embeddings
+    def _build_from_vectors(self, documents: List[Document], vectors: np.ndarray) -> FAISS:
+        # IVF / PQ indexes are trained on these vectors before they are added
+        self.vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=build_index(vectors),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={}
+        )
+        self.vectorstore.add_embeddings(
+            text_embeddings=[(doc.page_content, vector) for doc, vector in zip(documents, vectors.tolist())],
+            metadatas=[doc.metadata for doc in documents],
+            ids=[doc.metadata["id"] for doc in documents]
         )
+        # A full build replaces the index, so records of documents no
+        # longer in it go too
+        self._writable_doc_store().retain(doc.metadata["id"] for doc in documents)
+        self._rebuild_lexical_index()
 
+        self._index_changed()
         logger.info(f"Vectorstore built with {len(documents)} documents")
+        logger.info(self.embeddings.report())
+        self.embeddings.save()
         return self.vectorstore
 
+    @traced("index.update")
+    def update_vectorstore(self, summaries: List[Dict], sources: Set[str]) -> FAISS:
+        """
+        Apply a corpus delta to the loaded index in place.
+
+        Every vector and doc_store entry of `sources` is deleted, then the
+        current summaries of those sources (none for removed PDFs) are added.
+        """
+        if not self.vectorstore:
+            raise RuntimeError("Vectorstore not loaded")
+
+        documents = self.create_documents(
+            [item for item in summaries if item.get("metadata", {}).get("source") in sources]
+        )
+
+        if settings.FAISS_INDEX_TYPE != "flat" or not supports_removal(self.vectorstore.index):
+            # IVF / HNSW cannot drop vectors the way FAISS.delete expects:
+            # rebuild, reading unchanged documents' vectors back from the
+            # index (PQ codes decode to approximations) instead of re-embedding
+            kept, positions = [], []
+            for position, faiss_id in self.vectorstore.index_to_docstore_id.items():
+                doc = self.vectorstore.docstore.search(faiss_id)
+                if doc.metadata.get("source") not in sources:
+                    kept.append(doc)
+                    positions.append(position)
+            removed = len(self.vectorstore.index_to_docstore_id) - len(kept)
+
+            kept_vectors = self.vectorstore.index.reconstruct_batch(np.asarray(positions, dtype=np.int64))
+            vectors = np.vstack([kept_vectors, self.embed_documents_batched(documents)]) if documents else kept_vectors
+            self._build_from_vectors(kept + documents, vectors)
+            logger.info(
+                f"Vectorstore rebuilt for {len(sources)} sources: "
+                f"-{removed} / +{len(documents)} documents"
+            )
+            return self.vectorstore
+
+        # Match on the stored documents rather than doc_store keys: indexes
+        # built before stable ids used unrelated FAISS ids
+        new_ids = {doc.metadata["id"] for doc in documents}
+        stale_ids = [
+            faiss_id
+            for faiss_id in self.vectorstore.index_to_docstore_id.values()
+            if self.vectorstore.docstore.search(faiss_id).metadata.get("source") in sources
+        ]
+        if stale_ids:
+            for faiss_id in stale_ids:
+                doc_id = self.vectorstore.docstore.search(faiss_id).metadata.get("id")
+                # Records just rewritten by create_documents stay
+                if doc_id not in new_ids:
+                    self._writable_doc_store().pop(doc_id, None)
+            self.vectorstore.delete(stale_ids)
+
+        if documents:
+            vectors = self.embed_documents_batched(documents)
+            self.vectorstore.add_embeddings(
+                text_embeddings=[(doc.page_content, vector) for doc, vector in zip(documents, vectors.tolist())],
+                metadatas=[doc.metadata for doc in documents],
+                ids=[doc.metadata["id"] for doc in documents]
+            )
+        self._rebuild_lexical_index()
+
+        self._index_changed()
+        logger.info(
+            f"Vectorstore updated for {len(sources)} sources: "
+            f"-{len(stale_ids)} / +{len(documents)} documents"
+        )
+        logger.info(self.embeddings.report())
+        self.embeddings.save()
+        return self.vectorstore
+
+    @traced("index.save")
     def save_vectorstore(self, path: Path = settings.FAISS_INDEX_DIR):
         if not self.vectorstore:
             raise RuntimeError("Vectorstore not initialized")
@@ -89,23 +374,51 @@ class VectorStoreManager:
 
         self.vectorstore.save_local(str(path))
 
-        with open(path / "doc_store.pkl", "wb") as f:
-            pickle.dump(self.doc_store, f)
+        if self._doc_store_staged:
+            self.doc_store.promote(path / DOC_STORE_FILE)
+            self._doc_store_staged = False
+        else:
+            self.doc_store.save_as(path / DOC_STORE_FILE)
+        if self.lexical_index is not None:
+            self.lexical_index.save(path / LEXICAL_INDEX_FILE)
 
         logger.info(f"Vectorstore saved to {path}")
 
+    @traced("index.load")
     def load_vectorstore(self, path: Path = settings.FAISS_INDEX_DIR):
         self.vectorstore = FAISS.load_local(
             str(path),
             self.embeddings,
             allow_dangerous_deserialization=True
         )
-
-        doc_store_path = path / "doc_store.pkl"
-        if doc_store_path.exists():
-            with open(doc_store_path, "rb") as f:
-                self.doc_store = pickle.load(f)
-
+        enable_reconstruction(self.vectorstore.index)
+        set_search_params(self.vectorstore.index)
+
+        # Records stay on disk; only the connection is opened here
+        if self._doc_store_staged:
+            # Unsaved build: its records belong to the index being replaced
+            self.doc_store.discard()
+            self._doc_store_staged = False
+        else:
+            self.doc_store.close()
+        self.doc_store = DocStore(path / DOC_STORE_FILE)
+        legacy_path = path / LEGACY_DOC_STORE_FILE
+        if legacy_path.exists() and not self.doc_store.path.exists():
+            self.doc_store.migrate_pickle(legacy_path)
+
+        lexical_path = path / LEXICAL_INDEX_FILE
+        if lexical_path.exists():
+            self.lexical_index = LexicalIndex.load(lexical_path)
+            if not set(self.lexical_index.doc_ids.tolist()) <= set(self.vectorstore.index_to_docstore_id.values()):
+                # Saved with metadata ids instead of docstore ids
+                logger.warning("Lexical index ids do not match the docstore, rebuilding it")
+                self._rebuild_lexical_index()
+        else:
+            # Index saved before hybrid search existed
+            self._rebuild_lexical_index()
+
+        self._index_changed()
+        annotate(docs=self.vectorstore.index.ntotal)
         logger.info("Vectorstore loaded successfully")
         return self.vectorstore
 
@@ -117,28 +430,419 @@ class VectorStoreManager:
         self,
         query: str,
         k: int = 5,
-        filter_type: Optional[str] = None
+        filter_type: TypeFilter = None
     ) -> List[Document]:
         """
         Unified search interface used by:
         - RetrievalAgent
         - DeepResearchAgent
         """
+        return [doc for doc, _ in self.search_with_scores(query, k=k, filter_type=filter_type)]
+
+    @traced("search")
+    def search_with_scores(
+        self,
+        query: str,
+        k: int = 5,
+        filter_type: TypeFilter = None
+    ) -> List[Tuple[Document, Optional[float]]]:
+        """
+        Best k hits for one query with their L2 distance to it.
 
+        With HYBRID_SEARCH, dense and BM25 hits are fused by reciprocal rank.
+        If the query cannot be embedded in time, BM25 hits are returned alone,
+        with no distance, and are not cached.
+        """
         if not self.vectorstore:
             raise RuntimeError("Vectorstore not loaded")
 
-        if filter_type:
-            return self.vectorstore.similarity_search(
-                query,
-                k=k,
-                filter={"type": filter_type}
+        types = normalize_type_filter(filter_type)
+        key = self._result_key(query, k, types)
+        hits = self.search_result_cache.get(key)
+        cache_lookups("search_result", hits=int(hits is not None), misses=int(hits is None))
+        if hits is not None:
+            return hits
+
+        embedding = self._embed_query_in_time(query)
+        if embedding is None:
+            return [(doc, None) for doc in self.lexical_search(query, k=k, filter_type=types)]
+
+        hits = self._hits_for_embedding(query, embedding, k, types)
+        self.search_result_cache.put(key, hits)
+        return hits
+
+    @traced("search")
+    async def asearch_with_scores(
+        self,
+        query: str,
+        k: int = 5,
+        filter_type: TypeFilter = None
+    ) -> List[Tuple[Document, Optional[float]]]:
+        """search_with_scores for the event loop: async embedding, FAISS on a worker thread."""
+        if not self.vectorstore:
+            raise RuntimeError("Vectorstore not loaded")
+
+        types = normalize_type_filter(filter_type)
+        key = self._result_key(query, k, types)
+        hits = self.search_result_cache.get(key)
+        cache_lookups("search_result", hits=int(hits is not None), misses=int(hits is None))
+        if hits is not None:
+            return hits
+
+        try:
+            embedding = await asyncio.wait_for(self.aembed_query(query), settings.QUERY_EMBEDDING_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Query embedding unavailable ({e!r}), using lexical search only")
+            docs = await asyncio.to_thread(self.lexical_search, query, k, types)
+            return [(doc, None) for doc in docs]
+
+        hits = await asyncio.to_thread(self._hits_for_embedding, query, embedding, k, types)
+        self.search_result_cache.put(key, hits)
+        return hits
+
+    @traced("search.batch")
+    async def asearch_batch(
+        self,
+        queries: List[str],
+        k: int = 5,
+        filter_type: TypeFilter = None
+    ) -> List[List[Tuple[Document, Optional[float]]]]:
+        """
+        asearch_with_scores for many queries at once: cache misses are embedded
+        in one request and searched with one FAISS call (see QueryBatcher).
+        """
+        if not self.vectorstore:
+            raise RuntimeError("Vectorstore not loaded")
+
+        types = normalize_type_filter(filter_type)
+        keys = [self._result_key(query, k, types) for query in queries]
+        results = [self.search_result_cache.get(key) for key in keys]
+        missing = [i for i, hits in enumerate(results) if hits is None]
+        annotate(queries=len(queries))
+        cache_lookups("search_result", hits=len(queries) - len(missing), misses=len(missing))
+        if not missing:
+            return results
+
+        missing_queries = [queries[i] for i in missing]
+        try:
+            embeddings = await asyncio.wait_for(
+                self.aembed_queries(missing_queries), settings.QUERY_EMBEDDING_TIMEOUT
+            )
+        except Exception as e:
+            logger.warning(f"Query embeddings unavailable ({e!r}), using lexical search only")
+            lexical = await asyncio.to_thread(
+                lambda: [self.lexical_search(queries[i], k=k, filter_type=types) for i in missing]
+            )
+            for i, docs in zip(missing, lexical):
+                results[i] = [(doc, None) for doc in docs]
+            return results
+
+        batch_hits = await asyncio.to_thread(self._hits_for_embeddings, missing_queries, embeddings, k, types)
+        for i, hits in zip(missing, batch_hits):
+            self.search_result_cache.put(keys[i], hits)
+            results[i] = hits
+        return results
+
+    def _result_key(self, query: str, k: int, types: Optional[Tuple[str, ...]]) -> Tuple:
+        return (self.index_version, normalize_query(query), k, types, settings.HYBRID_SEARCH)
+
+    def _hits_for_embedding(
+        self,
+        query: str,
+        embedding: List[float],
+        k: int,
+        types: Optional[Tuple[str, ...]]
+    ) -> List[Tuple[Document, Optional[float]]]:
+        return self._hits_for_embeddings([query], [embedding], k, types)[0]
+
+    def _hits_for_embeddings(
+        self,
+        queries: List[str],
+        embeddings: List[List[float]],
+        k: int,
+        types: Optional[Tuple[str, ...]]
+    ) -> List[List[Tuple[Document, Optional[float]]]]:
+        """Dense (or hybrid) hits for already-embedded queries, one FAISS call in total."""
+        if not settings.HYBRID_SEARCH or self.lexical_index is None:
+            return self.search_by_vectors(embeddings, k=k, filter_type=types)
+
+        fetch_k = max(k, settings.HYBRID_FETCH_K)
+        results = []
+        for query, embedding, dense in zip(
+            queries, embeddings, self.search_by_vectors(embeddings, k=fetch_k, filter_type=types)
+        ):
+            lexical = self.lexical_search(query, k=fetch_k, filter_type=types)
+            fused = reciprocal_rank_fusion([[doc for doc, _ in dense], lexical], limit=k)
+            results.append(
+                self._with_distances(fused, embedding, {doc.metadata.get("id"): d for doc, d in dense})
+            )
+        return results
+
+    @traced("bm25.search")
+    def lexical_search(self, query: str, k: int = 5, filter_type: TypeFilter = None) -> List[Document]:
+        """BM25 hits only; local, no API call."""
+        if self.lexical_index is None:
+            return []
+        hits = [
+            self.vectorstore.docstore.search(doc_id)
+            for doc_id, _ in self.lexical_index.search(query, k, normalize_type_filter(filter_type))
+        ]
+        # docstore.search returns an error string for unknown ids
+        return [doc for doc in hits if isinstance(doc, Document)]
+
+    def _embed_query_in_time(self, query: str) -> Optional[List[float]]:
+        """Query embedding, or None if the API fails or exceeds QUERY_EMBEDDING_TIMEOUT."""
+        return self._in_time(self.embed_query, query)
+
+    def _embed_queries_in_time(self, queries: List[str]) -> Optional[List[List[float]]]:
+        """Like _embed_query_in_time for a batch of queries."""
+        return self._in_time(self.embed_queries, queries)
+
+    def _in_time(self, embed, queries):
+        if settings.QUERY_EMBEDDING_TIMEOUT is None:
+            return embed(queries)
+
+        # Copied context: the embedding span stays part of this query's trace
+        future = self._query_pool.submit(contextvars.copy_context().run, embed, queries)
+        try:
+            return future.result(timeout=settings.QUERY_EMBEDDING_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Query embedding unavailable ({e!r}), using lexical search only")
+            return None
+
+    def _with_distances(
+        self,
+        documents: List[Document],
+        embedding: List[float],
+        known: Dict[str, float]
+    ) -> List[Tuple[Document, Optional[float]]]:
+        """Attach L2 distances, computing them from stored vectors for lexical-only hits."""
+        missing = [doc for doc in documents if doc.metadata.get("id") not in known]
+        if missing:
+            vectors = self.get_document_vectors(missing)
+            if vectors is not None:
+                query = np.asarray(embedding, dtype=np.float32)
+                for doc, vector in zip(missing, vectors):
+                    known[doc.metadata.get("id")] = float(((vector - query) ** 2).sum())
+
+        return [(doc, known.get(doc.metadata.get("id"))) for doc in documents]
+
+    def search_many(
+        self,
+        queries: List[str],
+        k: int = 5,
+        filter_type: TypeFilter = None
+    ) -> Tuple[List[List[Tuple[Document, Optional[float]]]], Optional[np.ndarray]]:
+        """
+        Search several queries with one embedding request and one FAISS call.
+        Returns (document, L2 distance) hits per query, plus the query vectors
+        so callers can reuse them. If the queries cannot be embedded in time,
+        every query gets BM25 hits with no distance and the vectors are None.
+        """
+        if not self.vectorstore:
+            raise RuntimeError("Vectorstore not loaded")
+
+        embeddings = self._embed_queries_in_time(queries)
+        if embeddings is None:
+            return self._lexical_hits(queries, k, filter_type), None
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        return self.search_by_vectors(vectors, k=k, filter_type=filter_type), vectors
+
+    async def asearch_many(
+        self,
+        queries: List[str],
+        k: int = 5,
+        filter_type: TypeFilter = None
+    ) -> Tuple[List[List[Tuple[Document, Optional[float]]]], Optional[np.ndarray]]:
+        if not self.vectorstore:
+            raise RuntimeError("Vectorstore not loaded")
+
+        try:
+            embeddings = await asyncio.wait_for(self.aembed_queries(queries), settings.QUERY_EMBEDDING_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Query embeddings unavailable ({e!r}), using lexical search only")
+            return await asyncio.to_thread(self._lexical_hits, queries, k, filter_type), None
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        return await asyncio.to_thread(self.search_by_vectors, vectors, k, filter_type), vectors
+
+    def _lexical_hits(
+        self,
+        queries: List[str],
+        k: int,
+        filter_type: TypeFilter
+    ) -> List[List[Tuple[Document, None]]]:
+        types = normalize_type_filter(filter_type)
+        return [[(doc, None) for doc in self.lexical_search(query, k=k, filter_type=types)] for query in queries]
+
+    @traced("faiss.search")
+    def search_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 5,
+        filter_type: TypeFilter = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        One FAISS call for all `embeddings`. A type filter (one type or
+        several) is applied inside FAISS, so only matching vectors are
+        scored and every query gets up to k hits ranked by distance.
+        """
+        queries = np.asarray(embeddings, dtype=np.float32)
+        types = normalize_type_filter(filter_type)
+        annotate(queries=len(queries), k=k, filtered=types is not None)
+
+        if types is None:
+            distances, positions = self.vectorstore.index.search(queries, k)
+        else:
+            allowed = self.positions_of_types(types)
+            if not len(allowed):
+                return [[] for _ in embeddings]
+            distances, positions = self.vectorstore.index.search(
+                queries, k, params=selector_params(self.vectorstore.index, allowed)
             )
+            # IVF / HNSW may not reach k matches of a rare type: score the
+            # whole (small) subset exactly for those queries
+            short = np.flatnonzero((positions != -1).sum(axis=1) < min(k, len(allowed)))
+            if len(short):
+                distances[short], positions[short] = self._exact_subset_search(queries[short], allowed, k)
+
+        results = []
+        for row_distances, row_positions in zip(distances, positions):
+            results.append([
+                (self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[int(position)]), float(distance))
+                for distance, position in zip(row_distances, row_positions)
+                if position != -1
+            ])
+        return results
+
+    def _exact_subset_search(self, queries: np.ndarray, allowed: np.ndarray, k: int):
+        vectors = self.vectorstore.index.reconstruct_batch(allowed)
+        distances = (
+            (queries ** 2).sum(axis=1, keepdims=True)
+            - 2 * queries @ vectors.T
+            + (vectors ** 2).sum(axis=1)
+        )
+        order = np.argsort(distances, axis=1)[:, :k]
+        top = np.take_along_axis(distances, order, axis=1)
+
+        # Pad to k columns like FAISS does
+        padded_distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        padded_positions = np.full((len(queries), k), -1, dtype=np.int64)
+        padded_distances[:, :order.shape[1]] = top
+        padded_positions[:, :order.shape[1]] = allowed[order]
+        return padded_distances, padded_positions
+
+    def positions_of_types(self, types: Sequence[str]) -> np.ndarray:
+        """FAISS positions of every document of the given chunk types."""
+        if self._type_positions is None:
+            by_type: Dict[str, List[int]] = {}
+            for position, faiss_id in self.vectorstore.index_to_docstore_id.items():
+                chunk_type = self.vectorstore.docstore.search(faiss_id).metadata.get("type")
+                by_type.setdefault(chunk_type, []).append(position)
+            self._type_positions = {
+                chunk_type: np.asarray(sorted(found), dtype=np.int64)
+                for chunk_type, found in by_type.items()
+            }
 
-        return self.vectorstore.similarity_search(query, k=k)
+        found = [self._type_positions[t] for t in types if t in self._type_positions]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    @traced("embed.queries")
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Like embed_query for many queries; all misses go out in one request."""
+        normalized = [normalize_query(query) for query in queries]
+        cached = [self.query_embedding_cache.get(query) for query in normalized]
+
+        # normalized key -> first original text; the original is what gets embedded
+        missing: Dict[str, str] = {}
+        for query, key, embedding in zip(queries, normalized, cached):
+            if embedding is None:
+                missing.setdefault(key, query)
+        cache_lookups("query_embedding", hits=sum(e is not None for e in cached), misses=len(missing))
+        # Past the persistent document cache: queries only use query_embedding_cache
+        vectors = self.embeddings.underlying.embed_documents(list(missing.values())) if missing else []
+        fresh = dict(zip(missing, vectors))
+        for query, embedding in fresh.items():
+            self.query_embedding_cache.put(query, embedding)
+
+        return [embedding if embedding is not None else fresh[q] for q, embedding in zip(normalized, cached)]
+
+    @traced("embed.queries")
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        normalized = [normalize_query(query) for query in queries]
+        cached = [self.query_embedding_cache.get(query) for query in normalized]
+
+        missing: Dict[str, str] = {}
+        for query, key, embedding in zip(queries, normalized, cached):
+            if embedding is None:
+                missing.setdefault(key, query)
+        cache_lookups("query_embedding", hits=sum(e is not None for e in cached), misses=len(missing))
+        vectors = await self.embeddings.underlying.aembed_documents(list(missing.values())) if missing else []
+        fresh = dict(zip(missing, vectors))
+        for query, embedding in fresh.items():
+            self.query_embedding_cache.put(query, embedding)
+
+        return [embedding if embedding is not None else fresh[q] for q, embedding in zip(normalized, cached)]
+
+    def get_document_vectors(self, documents: List[Document]) -> Optional[np.ndarray]:
+        """
+        Stored vectors of `documents`, read back from the index.
+        None when a document cannot be located in the index.
+        """
+        if self._positions is None:
+            # Keyed by metadata["id"], which legacy indexes do not use as docstore id
+            self._positions = {
+                self.vectorstore.docstore.search(faiss_id).metadata.get("id"): pos
+                for pos, faiss_id in self.vectorstore.index_to_docstore_id.items()
+            }
+
+        positions = [self._positions.get(doc.metadata.get("id")) for doc in documents]
+        if any(pos is None for pos in positions):
+            return None
+
+        try:
+            return np.vstack([self.vectorstore.index.reconstruct(pos) for pos in positions])
+        except RuntimeError:
+            # Index type without reconstruction support
+            return None
+
+    @traced("embed.query")
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query, reusing the embedding of any equivalent earlier query."""
+        normalized = normalize_query(query)
+
+        embedding = self.query_embedding_cache.get(normalized)
+        cache_lookups("query_embedding", hits=int(embedding is not None), misses=int(embedding is None))
+        if embedding is None:
+            # Normalized text is only the cache key: case matters to the
+            # embedding (gene names, acronyms) and documents are indexed as is
+            embedding = self.embeddings.embed_query(query)
+            self.query_embedding_cache.put(normalized, embedding)
+
+        return embedding
+
+    @traced("embed.query")
+    async def aembed_query(self, query: str) -> List[float]:
+        normalized = normalize_query(query)
+
+        embedding = self.query_embedding_cache.get(normalized)
+        cache_lookups("query_embedding", hits=int(embedding is not None), misses=int(embedding is None))
+        if embedding is None:
+            embedding = await self.embeddings.aembed_query(query)
+            self.query_embedding_cache.put(normalized, embedding)
+
+        return embedding
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Hit rates of the query path caches, for capacity tuning."""
+        return {
+            "query_embeddings": self.query_embedding_cache.stats(),
+            "search_results": self.search_result_cache.stats(),
+        }
 
     def get_full_content(self, doc_id: str) -> Optional[Dict]:
-        """Retrieve full original content from doc_store."""
+        """Read one document's full original content from the doc store."""
         return self.doc_store.get(doc_id)
 
 # --------------------------------------------------
@@ -158,11 +862,23 @@ def main():
         summaries = json.load(f)
 
     manager = VectorStoreManager()
+    manifest = DocumentManifest()
+
+    if settings.INCREMENTAL_INGEST and (settings.FAISS_INDEX_DIR / "index.faiss").exists():
+        stale = set(manifest.stale("indexed"))
+        manager.load_vectorstore()
+        manager.update_vectorstore(summaries, stale)
+    else:
+        stale = set(manifest.entries)
+        documents = manager.create_documents(summaries)
+        manager.build_vectorstore(documents)
 
-    documents = manager.create_documents(summaries)
-    manager.build_vectorstore(documents)
     manager.save_vectorstore()
 
+    for source in stale:
+        manifest.mark(source, "indexed")
+    manifest.save()
+
     logger.info("Embeddings pipeline completed successfully")
 
 
@@ -0,0 +1,144 @@
+"""
+FAISS index construction for the vector store.
+- flat: exact L2 search (LangChain's default)
+- ivf_flat / ivf_pq: inverted lists trained on a sample, searched with nprobe
+- hnsw: graph index searched with efSearch, no training needed
+- selector_params: restrict a search to a subset of positions (type filters)
+"""
+
+from typing import Optional
+
+import faiss
+import numpy as np
+from loguru import logger
+
+from config.settings import settings
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# FAISS warns below this many training points per IVF cell
+MIN_POINTS_PER_CELL = 39
+# 8-bit PQ codebooks need 2**8 training points
+MIN_PQ_TRAINING_POINTS = 256
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """
+    Whether LangChain's FAISS.delete works on this index.
+
+    delete() renumbers the remaining vectors 0..n-1, which only matches what
+    the index does for flat storage; IVF keeps its labels and HNSW cannot
+    remove at all, so those are rebuilt instead.
+    """
+    return isinstance(faiss.downcast_index(index), faiss.IndexFlat)
+
+
+def factory_string(
+    index_type: str,
+    dimension: int,
+    num_vectors: int,
+    nlist: int = settings.FAISS_NLIST,
+    pq_m: int = settings.FAISS_PQ_M,
+    hnsw_m: int = settings.FAISS_HNSW_M,
+) -> str:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type {index_type!r}, expected one of {INDEX_TYPES}")
+
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+
+    # Small corpora cannot train many cells
+    cells = max(1, min(nlist, num_vectors // MIN_POINTS_PER_CELL))
+    if cells < nlist:
+        logger.warning(f"Only {num_vectors} vectors: using {cells} IVF cells instead of {nlist}")
+
+    if index_type == "ivf_pq":
+        if num_vectors < MIN_PQ_TRAINING_POINTS:
+            logger.warning(f"Only {num_vectors} vectors: too few to train PQ, using ivf_flat")
+            return f"IVF{cells},Flat"
+        if dimension % pq_m:
+            raise ValueError(f"FAISS_PQ_M={pq_m} must divide the embedding dimension {dimension}")
+        return f"IVF{cells},PQ{pq_m}"
+
+    return f"IVF{cells},Flat"
+
+
+def build_index(
+    vectors: np.ndarray,
+    index_type: str = settings.FAISS_INDEX_TYPE,
+    nlist: int = settings.FAISS_NLIST,
+    pq_m: int = settings.FAISS_PQ_M,
+    hnsw_m: int = settings.FAISS_HNSW_M,
+    train_sample: int = settings.FAISS_TRAIN_SAMPLE,
+    seed: int = 0,
+) -> faiss.Index:
+    """
+    Empty, trained index for `vectors` (vectors are not added).
+    Training uses a random sample of at most `train_sample` vectors.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    num_vectors, dimension = vectors.shape
+
+    description = factory_string(index_type, dimension, num_vectors, nlist, pq_m, hnsw_m)
+    index = faiss.index_factory(dimension, description, faiss.METRIC_L2)
+
+    if not index.is_trained:
+        if num_vectors > train_sample:
+            rows = np.random.default_rng(seed).choice(num_vectors, train_sample, replace=False)
+            sample = vectors[np.sort(rows)]
+        else:
+            sample = vectors
+        logger.info(f"Training {description} index on {len(sample)} vectors")
+        index.train(sample)
+
+    enable_reconstruction(index)
+    set_search_params(index)
+    return index
+
+
+def enable_reconstruction(index: faiss.Index):
+    """IVF indexes need a direct map before reconstruct() (used by MMR) works."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+
+
+def set_search_params(
+    index: faiss.Index,
+    nprobe: int = settings.FAISS_NPROBE,
+    ef_search: int = settings.FAISS_EF_SEARCH,
+):
+    """Apply query-time knobs; a no-op for flat indexes."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+
+    hnsw: Optional[faiss.Index] = faiss.downcast_index(index)
+    if isinstance(hnsw, faiss.IndexHNSW):
+        hnsw.hnsw.efSearch = ef_search
+
+
+def selector_params(index: faiss.Index, positions: np.ndarray) -> faiss.SearchParameters:
+    """
+    Search parameters restricting `index` to `positions`, so filtered queries
+    only score matching vectors. Keeps the index's own nprobe / efSearch,
+    which generic parameters would reset.
+    """
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(positions, dtype=np.int64))
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+
+    hnsw = faiss.downcast_index(index)
+    if isinstance(hnsw, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=hnsw.hnsw.efSearch)
+
+    return faiss.SearchParameters(sel=selector)
+
+
+def index_bytes(index: faiss.Index) -> int:
+    """Serialized size, a close proxy for resident memory."""
+    return int(faiss.serialize_index(index).nbytes)
@@ -0,0 +1,86 @@
+"""
+Merging several ranked result lists into one.
+- reciprocal_rank_fusion: dedup by doc id, score = sum of 1 / (c + rank)
+- mmr_select: vectorized maximal marginal relevance over candidate vectors
+"""
+
+from typing import Callable, Hashable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+def doc_key(doc: Document) -> Hashable:
+    return doc.metadata.get("id") or doc.page_content
+
+
+def dedupe(docs: List[Document], key: Callable[[Document], Hashable] = doc_key) -> List[Document]:
+    """Keep the first occurrence of every document."""
+    seen = set()
+    unique = []
+    for doc in docs:
+        if key(doc) not in seen:
+            seen.add(key(doc))
+            unique.append(doc)
+    return unique
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[List[Document]],
+    limit: Optional[int] = None,
+    c: int = 60,
+    key: Callable[[Document], Hashable] = doc_key,
+) -> List[Document]:
+    """Documents found by several lists, or ranked high in one, come first."""
+    scores = {}
+    docs = {}
+
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked, start=1):
+            doc_id = key(doc)
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (c + rank)
+            docs.setdefault(doc_id, doc)
+
+    # sorted() is stable, so ties keep first-seen order
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return [docs[doc_id] for doc_id in fused[:limit]]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def mmr_select(
+    query_vectors: np.ndarray,
+    candidate_vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    Pick `k` candidate indices balancing relevance and diversity.
+
+    Relevance is the best cosine similarity to any of the query vectors, so
+    several sub-queries can share one selection.
+    """
+    if len(candidate_vectors) == 0:
+        return []
+
+    queries = _normalize(np.atleast_2d(np.asarray(query_vectors, dtype=np.float32)))
+    candidates = _normalize(np.asarray(candidate_vectors, dtype=np.float32))
+
+    relevance = (candidates @ queries.T).max(axis=1)
+    pairwise = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of every candidate to anything already selected
+    redundancy = pairwise[selected[0]].copy()
+
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, pairwise[best])
+
+    return selected
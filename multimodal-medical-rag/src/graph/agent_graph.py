@@ -1,35 +1,135 @@
+import asyncio
 from loguru import logger
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+
+from config.settings import settings
 
 from src.embeddings import VectorStoreManager
 from src.agents.retrieval_agent import RetrievalAgent
 from src.agents.deep_research_agent import DeepResearchAgent
 from src.agents.qa_agent import QAAgent
+from src.graph.router import AdaptiveRouter, route_by_length
+from src.tracing import annotate, count, span, traced_stream
 
 
 class MultiAgentGraph:
-    def __init__(self, vectorstore_manager: VectorStoreManager):
+    def __init__(self, vectorstore_manager: VectorStoreManager, llm: Optional[BaseChatModel] = None):
+        # One chat model may be injected for every agent (e.g. benchmark fakes)
         self.retrieval_agent = RetrievalAgent(vectorstore_manager)
-        self.deep_agent = DeepResearchAgent(vectorstore_manager)
-        self.qa_agent = QAAgent()
+        self.deep_agent = DeepResearchAgent(vectorstore_manager, llm=llm)
+        self.qa_agent = QAAgent(llm=llm)
+        self.router = AdaptiveRouter()
 
     def route(self, query: str) -> str:
+        """Up-front mode from the query alone (ROUTER_MODE="length")."""
+        return route_by_length(query)
+
+    @property
+    def adaptive(self) -> bool:
+        return settings.ROUTER_MODE == "adaptive"
+
+    def _record_route(self, mode: str):
+        logger.info(f"Query routed to {mode} mode")
+        annotate(mode=mode)
+        count("queries_total", mode=mode)
+
+    def resolve(self, query: str, quick_docs: List[Document]) -> Tuple[str, List[Document]]:
         """
-        Simple router:
-        - short factual → quick
-        - long analytical → deep
+        Adaptive routing after a quick retrieval: keep `quick_docs` when they
+        look confident, otherwise escalate to deep research seeded with them.
         """
-        return "deep" if len(query.split()) > 12 else "quick"
+        decision = self.router.decide(query, quick_docs)
+        self.router.record(query, decision)
+        if decision.mode == "quick":
+            return "quick", quick_docs
+        # A failed deep run still leaves the quick hits
+        return "deep", self.deep_agent.research(query, seed_docs=quick_docs) or quick_docs
 
-    def run(self, query: str) -> str:
-        mode = self.route(query)
-        logger.info(f"Query routed to {mode} mode")
+    def _retrieve(self, query: str) -> List[Document]:
+        if self.adaptive:
+            return self.resolve(query, self.retrieval_agent.retrieve(query))[1]
 
+        mode = self.route(query)
+        self._record_route(mode)
         if mode == "quick":
-            docs = self.retrieval_agent.retrieve(query)
-        else:
-            docs = self.deep_agent.research(query)
+            return self.retrieval_agent.retrieve(query)
+        return self.deep_agent.research(query)
+
+    def run(self, query: str) -> str:
+        with span("query"):
+            docs = self._retrieve(query)
+            return self.qa_agent.answer(query, docs)
+
+    @traced_stream("query.stream")
+    def stream(self, query: str) -> Iterator[str]:
+        """Like run(), but yields answer tokens as they are generated."""
+        docs = self._retrieve(query)
+        yield from self.qa_agent.stream_answer(query, docs)
+
+    # --------------------------------------------------
+    # ASYNC PATH (many concurrent queries on one event loop)
+    # --------------------------------------------------
+
+    async def aresolve(self, query: str, quick_docs: List[Document]) -> Tuple[str, List[Document]]:
+        """Async resolve()."""
+        decision = self.router.decide(query, quick_docs)
+        await self.router.arecord(query, decision)
+        if decision.mode == "quick":
+            return "quick", quick_docs
+        return "deep", await self.deep_agent.aresearch(query, seed_docs=quick_docs) or quick_docs
+
+    async def _aretrieve(self, query: str) -> List[Document]:
+        if self.adaptive:
+            return (await self.aresolve(query, await self.retrieval_agent.aretrieve(query)))[1]
 
-        return self.qa_agent.answer(query, docs)
+        mode = self.route(query)
+        self._record_route(mode)
+        if mode == "quick":
+            return await self.retrieval_agent.aretrieve(query)
+        return await self.deep_agent.aresearch(query)
+
+    async def _arun(self, query: str, docs: Optional[List[Document]]) -> str:
+        if docs is None:
+            docs = await self._aretrieve(query)
+        return await self.qa_agent.aanswer(query, docs)
+
+    async def arun(
+        self,
+        query: str,
+        timeout: Optional[float] = settings.REQUEST_TIMEOUT,
+        docs: Optional[List[Document]] = None
+    ) -> str:
+        """
+        Async run(); raises asyncio.TimeoutError after `timeout` seconds.
+        Scored `docs` retrieved elsewhere (e.g. by a QueryBatcher) skip retrieval.
+        """
+        with span("query"):
+            return await asyncio.wait_for(self._arun(query, docs), timeout)
+
+    @traced_stream("query.stream")
+    async def astream(
+        self,
+        query: str,
+        timeout: Optional[float] = settings.REQUEST_TIMEOUT,
+        docs: Optional[List[Document]] = None
+    ) -> AsyncIterator[str]:
+        """Async stream(); `timeout` bounds retrieval and the wait for each token."""
+        if docs is None:
+            docs = await asyncio.wait_for(self._aretrieve(query), timeout)
+
+        tokens = self.qa_agent.astream_answer(query, docs)
+        try:
+            while True:
+                try:
+                    token = await asyncio.wait_for(tokens.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                yield token
+        finally:
+            await tokens.aclose()
 
 
 # --------------------------------------------------
@@ -49,8 +149,10 @@ def main():
         if query.lower() in {"exit", "quit"}:
             break
 
-        answer = graph.run(query)
-        print("\nAnswer:\n", answer)
+        print("\nAnswer:\n", end=" ", flush=True)
+        for token in graph.stream(query):
+            print(token, end="", flush=True)
+        print()
         print("\n" + "=" * 80 + "\n")
 
 
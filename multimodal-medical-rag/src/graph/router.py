@@ -0,0 +1,131 @@
+"""
+Retrieval-confidence routing for MultiAgentGraph.
+- Quick retrieval always runs first; its similarity scores decide the mode
+- Escalates to deep research when the best hit scores below ROUTER_MIN_SCORE,
+  or, unless it reaches ROUTER_CONFIDENT_SCORE, when it barely stands out
+  from the weakest quick hit (ROUTER_MIN_MARGIN)
+- Without scores (lexical-only fallback) the query-length rule decides
+- Every decision is counted in the metrics and, if ROUTER_LOG_FILE is set,
+  appended to it
+"""
+
+import asyncio
+import json
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from loguru import logger
+from langchain_core.documents import Document
+
+from config.settings import settings
+from src.tracing import annotate, count
+
+# Word count above which the length rule picks deep mode
+LONG_QUERY_WORDS = 12
+
+
+def route_by_length(query: str) -> str:
+    """
+    Simple router:
+    - short factual → quick
+    - long analytical → deep
+    """
+    return "deep" if len(query.split()) > LONG_QUERY_WORDS else "quick"
+
+
+@dataclass
+class RoutingDecision:
+    mode: str  # "quick" | "deep"
+    reason: str  # "confident" | "low_score" | "low_margin" | "no_hits" | "unscored"
+    top_score: Optional[float] = None
+    margin: Optional[float] = None
+    hits: int = 0
+
+
+class AdaptiveRouter:
+    """Chooses quick or deep mode from the scores of the quick retrieval."""
+
+    def __init__(
+        self,
+        min_score: float = settings.ROUTER_MIN_SCORE,
+        min_margin: float = settings.ROUTER_MIN_MARGIN,
+        confident_score: float = settings.ROUTER_CONFIDENT_SCORE,
+        log_path: Optional[Path] = settings.ROUTER_LOG_FILE,
+    ):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.confident_score = confident_score
+        self.log_path = Path(log_path) if log_path else None
+        self._lock = threading.Lock()
+
+    def decide(self, query: str, documents: List[Document]) -> RoutingDecision:
+        """`documents` are quick-retrieval hits with their similarity in metadata["score"]."""
+        if not documents:
+            return RoutingDecision(mode="deep", reason="no_hits")
+
+        scores = [doc.metadata["score"] for doc in documents if doc.metadata.get("score") is not None]
+        if not scores:
+            # Embedding timed out and BM25 answered alone: no similarity to judge
+            return RoutingDecision(mode=route_by_length(query), reason="unscored", hits=len(documents))
+
+        # Hybrid hits are in fused-rank order, not score order
+        top_score = max(scores)
+        margin = top_score - min(scores) if len(scores) > 1 else None
+
+        if top_score < self.min_score:
+            mode, reason = "deep", "low_score"
+        elif margin is not None and margin < self.min_margin and top_score < self.confident_score:
+            # Every hit is about equally (un)related: no chunk clearly answers it.
+            # Above confident_score a flat top-k means near-duplicate relevant chunks.
+            mode, reason = "deep", "low_margin"
+        else:
+            mode, reason = "quick", "confident"
+
+        return RoutingDecision(
+            mode=mode,
+            reason=reason,
+            top_score=round(top_score, 4),
+            margin=None if margin is None else round(margin, 4),
+            hits=len(documents),
+        )
+
+    def record(self, query: str, decision: RoutingDecision):
+        """Log, count and (if configured) persist one decision for threshold tuning."""
+        self._observe(decision)
+        self._persist(query, decision)
+
+    async def arecord(self, query: str, decision: RoutingDecision):
+        """record() for the event loop: the log file is written on a worker thread."""
+        self._observe(decision)
+        if self.log_path is not None:
+            await asyncio.to_thread(self._persist, query, decision)
+
+    def _observe(self, decision: RoutingDecision):
+        logger.info(
+            f"Query routed to {decision.mode} mode ({decision.reason}, "
+            f"top score {decision.top_score}, margin {decision.margin})"
+        )
+        annotate(mode=decision.mode, route_reason=decision.reason, top_score=decision.top_score)
+        count("queries_total", mode=decision.mode)
+        count("router_decisions_total", mode=decision.mode, reason=decision.reason)
+
+    def _persist(self, query: str, decision: RoutingDecision):
+        if self.log_path is None:
+            return
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "query": query,
+            "words": len(query.split()),
+            "length_rule": route_by_length(query),
+            **asdict(decision),
+        }
+        try:
+            with self._lock:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write routing decision to {self.log_path}: {e}")
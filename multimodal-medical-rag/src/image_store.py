@@ -0,0 +1,101 @@
+"""
+Content-addressed store for images extracted from PDFs.
+- Each unique image is saved once, named by the SHA-256 of its encoded bytes
+- JPEG/PNG/GIF/WebP in RGB or grayscale are written through untouched
+- Anything else (CMYK, JPX, JBIG2, ...) is converted to PNG once
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Tuple
+
+from PIL import Image
+
+from config.settings import settings
+
+# Formats the vision model accepts as-is
+PASSTHROUGH_FORMATS = {"png", "jpeg", "jpg", "gif", "webp"}
+# PyMuPDF colorspace component counts: 1 = gray, 3 = RGB (4 = CMYK)
+PASSTHROUGH_COLORSPACES = {1, 3}
+# Modes PIL can write as PNG without conversion
+PNG_MODES = {"1", "L", "LA", "I", "P", "RGB", "RGBA"}
+
+
+@dataclass
+class ImageStoreStats:
+    """Dedup accounting for one PDF."""
+    images: int = 0         # image references seen on pages
+    xref_hits: int = 0      # repeated xrefs reused without extracting them
+    content_hits: int = 0   # new xrefs whose bytes were already in the store
+    stored: int = 0         # new blobs written
+    passthrough: int = 0    # ...of which written without re-encoding
+    converted: int = 0      # ...of which decoded and re-encoded as PNG
+    bytes_written: int = 0
+    bytes_saved: int = 0    # bytes not written thanks to dedup
+
+    @property
+    def deduped(self) -> int:
+        return self.xref_hits + self.content_hits
+
+    def report(self) -> str:
+        return (
+            f"{self.images} image refs -> {self.stored} new blobs "
+            f"({self.passthrough} passthrough, {self.converted} converted), "
+            f"{self.xref_hits} repeated xrefs, {self.content_hits} known blobs, "
+            f"{self.bytes_written / 1024:.1f} KiB written, "
+            f"{self.bytes_saved / 1024:.1f} KiB saved by dedup"
+        )
+
+
+class ImageStore:
+    """Saves image bytes under their content hash, at most once."""
+
+    def __init__(self, root: Path = settings.IMAGE_DIR):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.stats = ImageStoreStats()
+
+    def put(self, image_bytes: bytes, ext: str, colorspace: int = 3) -> Tuple[Path, str]:
+        """Store an encoded image and return (blob path, content hash)."""
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        ext = ext.lower()
+        passthrough = ext in PASSTHROUGH_FORMATS and colorspace in PASSTHROUGH_COLORSPACES
+        path = self.root / f"{digest}.{ext if passthrough else 'png'}"
+
+        if path.exists():
+            self.stats.content_hits += 1
+            self.stats.bytes_saved += path.stat().st_size
+            return path, digest
+
+        if passthrough:
+            data = image_bytes
+            self.stats.passthrough += 1
+        else:
+            image = Image.open(io.BytesIO(image_bytes))
+            if image.mode not in PNG_MODES:
+                image = image.convert("RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            data = buffer.getvalue()
+            self.stats.converted += 1
+
+        self._write_atomic(path, data)
+        self.stats.stored += 1
+        self.stats.bytes_written += len(data)
+        return path, digest
+
+    def _write_atomic(self, path: Path, data: bytes):
+        # Pool workers may race on the same blob; the content is identical,
+        # so whoever renames last wins and readers never see a partial file.
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
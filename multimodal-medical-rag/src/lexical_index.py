@@ -0,0 +1,159 @@
+"""
+Local BM25 inverted index over the indexed documents.
+- Postings in CSR form: one int64 offsets array, int32 doc rows, uint16 term counts
+- Saved as a single .npz next to the FAISS index, no pickle involved
+- Query time is pure numpy: no network call, so it also serves as the fallback
+  when the embedding API is slow
+"""
+
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config.settings import settings
+
+# Keeps gene symbols and hyphenated terms whole: brca1, il-6, t-cell
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "their there these this to was were what when which who with how does do".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    """BM25 scores of documents (by FAISS docstore id) for a query."""
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        counts: np.ndarray,
+        lengths: np.ndarray,
+        doc_ids: Sequence[str],
+        doc_types: Sequence[str],
+        k1: float = settings.LEXICAL_K1,
+        b: float = settings.LEXICAL_B,
+    ):
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.counts = counts
+        self.lengths = lengths
+        self.doc_ids = np.asarray(doc_ids)
+        self.doc_types = np.asarray(doc_types)
+        self.k1 = k1
+        self.b = b
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, documents: List[Document], doc_ids: Optional[Sequence[str]] = None) -> "LexicalIndex":
+        """
+        `doc_ids` are the ids search() returns, normally the FAISS docstore
+        ids; they default to metadata["id"], which legacy indexes do not use
+        as docstore ids.
+        """
+        vocabulary: Dict[str, int] = {}
+        term_ids, rows, counts = [], [], []
+        lengths = np.zeros(len(documents), dtype=np.int32)
+
+        for row, doc in enumerate(documents):
+            tokens = tokenize(doc.page_content)
+            lengths[row] = len(tokens)
+            for term, count in Counter(tokens).items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                counts.append(min(count, np.iinfo(np.uint16).max))
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        # Stable sort keeps each term's postings in row order
+        order = np.argsort(term_ids, kind="stable")
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=offsets[1:])
+
+        return cls(
+            terms=list(vocabulary),
+            offsets=offsets,
+            postings=np.asarray(rows, dtype=np.int32)[order],
+            counts=np.asarray(counts, dtype=np.uint16)[order],
+            lengths=lengths,
+            doc_ids=list(doc_ids) if doc_ids is not None else [doc.metadata["id"] for doc in documents],
+            doc_types=[doc.metadata.get("type") or "" for doc in documents],
+        )
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        types: Optional[Sequence[str]] = None,
+    ) -> List[Tuple[str, float]]:
+        """Top-k (doc id, BM25 score), optionally restricted to chunk types."""
+        if not len(self.doc_ids):
+            return []
+
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        num_docs = len(self.doc_ids)
+
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            rows = self.postings[start:end]
+            tf = self.counts[start:end].astype(np.float32)
+
+            idf = np.log1p((num_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[rows] / max(self.average_length, 1e-9))
+            # A term's postings hold each row once, so plain fancy-index add is safe
+            scores[rows] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if types is not None:
+            scores[~np.isin(self.doc_types, list(types))] = 0.0
+
+        matched = np.flatnonzero(scores > 0)
+        if not len(matched):
+            return []
+        top = matched[np.argsort(-scores[matched], kind="stable")[:k]]
+        return [(str(self.doc_ids[row]), float(scores[row])) for row in top]
+
+    # --------------------------------------------------
+    # PERSISTENCE
+    # --------------------------------------------------
+
+    def save(self, path: Path):
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez(
+            path,
+            terms=np.asarray(terms, dtype=str),
+            offsets=self.offsets,
+            postings=self.postings,
+            counts=self.counts,
+            lengths=self.lengths,
+            doc_ids=self.doc_ids.astype(str),
+            doc_types=self.doc_types.astype(str),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "LexicalIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                terms=data["terms"].tolist(),
+                offsets=data["offsets"],
+                postings=data["postings"],
+                counts=data["counts"],
+                lengths=data["lengths"],
+                doc_ids=data["doc_ids"],
+                doc_types=data["doc_types"],
+            )
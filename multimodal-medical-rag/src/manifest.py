@@ -0,0 +1,126 @@
+"""
+Document manifest for incremental ingestion.
+- Records the content hash of every PDF in the corpus
+- Records which version of each PDF every stage has processed
+  (chunked -> summarized -> indexed)
+- A stage only redoes sources whose recorded version is out of date
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from config.settings import settings
+
+STAGES = ("chunked", "summarized", "indexed")
+
+
+@dataclass
+class ManifestDiff:
+    """How the corpus on disk differs from the last scan."""
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    def report(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.modified)} modified, "
+            f"{len(self.removed)} removed, {len(self.unchanged)} unchanged"
+        )
+
+
+class DocumentManifest:
+    """
+    JSON manifest keyed by source name (the PDF stem, as in chunk metadata).
+
+    Removed PDFs are kept as tombstones (sha256 = None) until every stage has
+    dropped their data, so later stages still know what to delete.
+    """
+
+    def __init__(self, path: Path = settings.MANIFEST_PATH):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+
+    @staticmethod
+    def file_hash(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def scan(self, pdf_files: List[Path]) -> ManifestDiff:
+        """Hash the current PDFs and record their versions."""
+        diff = ManifestDiff()
+        current = {p.stem: p for p in pdf_files}
+
+        for source, pdf_path in current.items():
+            sha256 = self.file_hash(pdf_path)
+            entry = self.entries.setdefault(source, {"sha256": None, "stages": {}})
+
+            if entry["sha256"] is None:
+                diff.added.append(source)
+            elif entry["sha256"] != sha256:
+                diff.modified.append(source)
+            else:
+                diff.unchanged.append(source)
+
+            entry["sha256"] = sha256
+            entry["file"] = pdf_path.name
+
+        for source, entry in self.entries.items():
+            if source not in current and entry["sha256"] is not None:
+                entry["sha256"] = None
+                diff.removed.append(source)
+
+        return diff
+
+    def is_current(self, source: str, stage: str) -> bool:
+        entry = self.entries.get(source)
+        return entry is not None and entry["stages"].get(stage) == entry["sha256"]
+
+    def is_removed(self, source: str) -> bool:
+        entry = self.entries.get(source)
+        return entry is None or entry["sha256"] is None
+
+    def stale(self, stage: str) -> List[str]:
+        """Sources whose current version (or removal) `stage` has not handled."""
+        return [source for source in self.entries if not self.is_current(source, stage)]
+
+    def mark(self, source: str, stage: str) -> bool:
+        """
+        Record that `stage` has processed the current version of `source`.
+
+        Refused while the previous stage is out of date (e.g. a PDF that failed
+        to chunk must not be marked summarized), so it is retried next run.
+        """
+        previous: Optional[str] = STAGES[STAGES.index(stage) - 1] if stage != STAGES[0] else None
+        if source not in self.entries or (previous and not self.is_current(source, previous)):
+            return False
+
+        entry = self.entries[source]
+        entry["stages"][stage] = entry["sha256"]
+        return True
+
+    def save(self):
+        # Drop tombstones every stage has caught up with
+        self.entries = {
+            source: entry
+            for source, entry in self.entries.items()
+            if entry["sha256"] is not None or any(entry["stages"].get(s) for s in STAGES)
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.entries, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        logger.debug(f"Manifest saved to {self.path}")
@@ -5,18 +5,26 @@ Fast PDF preprocessing using PyMuPDF.
 - Stores tables as separate files
 - Stores images as separate files
 - Saves all chunks as a pickle file for later use
+- Optionally spreads PDFs across a process pool
+- Optionally streams chunks to an append-only JSONL file
 """
 
 import fitz  # PyMuPDF
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
-from PIL import Image
-import io
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Tuple, Set, Callable
+from dataclasses import dataclass, field, asdict
+from collections import Counter
+import json
 import pickle
 from loguru import logger
 
 from config.settings import settings
+from src.image_store import ImageStore, ImageStoreStats
+from src.manifest import DocumentManifest
+from src.tracing import annotate, count, traced
 
 # -----------------------------
 # Data Model
@@ -31,6 +39,140 @@ class DocumentChunk:
     file_path: Optional[str] = None
 
 
+@dataclass
+class PDFResult:
+    """Chunks extracted from one PDF (returned by pool workers)."""
+    doc_name: str
+    chunks: List[DocumentChunk]
+    pages: int
+    image_stats: ImageStoreStats = field(default_factory=ImageStoreStats)
+
+
+@dataclass
+class IngestStats:
+    """Throughput of a process_directory run, used to size the worker pool."""
+    workers: int = 1
+    pdfs: int = 0
+    pages: int = 0
+    chunks: int = 0
+    images_deduped: int = 0
+    image_bytes_saved: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.elapsed if self.elapsed else 0.0
+
+    def add_images(self, image_stats: ImageStoreStats):
+        self.images_deduped += image_stats.deduped
+        self.image_bytes_saved += image_stats.bytes_saved
+
+    def report(self) -> str:
+        return (
+            f"{self.pdfs} PDFs / {self.pages} pages / {self.chunks} chunks "
+            f"in {self.elapsed:.2f}s with {self.workers} worker(s): "
+            f"{self.pages_per_sec:.1f} pages/sec, {self.chunks_per_sec:.1f} chunks/sec, "
+            f"{self.images_deduped} duplicate images skipped "
+            f"({self.image_bytes_saved / 1024:.1f} KiB saved)"
+        )
+
+
+def format_text_record(chunk: DocumentChunk) -> str:
+    """Render a text chunk as a record of all_text_chunks.txt."""
+    return (
+        "\n" + "=" * 80 + "\n"
+        f"CHUNK_ID   : {chunk.chunk_id}\n"
+        f"SOURCE     : {chunk.metadata['source']}\n"
+        f"PAGE       : {chunk.page_number}\n"
+        f"CHAR_COUNT : {len(chunk.content)}\n"
+        + "-" * 80 + "\n"
+        + chunk.content + "\n"
+    )
+
+
+# -----------------------------
+# Streaming Chunk Sink
+# -----------------------------
+class ChunkWriter:
+    """
+    Append-only, buffered sink for chunks.
+
+    Every chunk becomes one JSON line in `records_path`; text chunks are also
+    rendered to `text_path`. Both files are opened once and flushed every
+    `flush_every` chunks, so a crash loses at most the last unflushed batch
+    and never corrupts earlier records.
+    """
+
+    def __init__(
+        self,
+        records_path: Path,
+        text_path: Path,
+        flush_every: int = 256,
+        append: bool = False,
+    ):
+        records_path.parent.mkdir(parents=True, exist_ok=True)
+        self.records_path = records_path
+        self.flush_every = flush_every
+        self.counts: Counter = Counter()
+        self._pending = 0
+        self._records = records_path.open("a" if append else "w", encoding="utf-8", buffering=1 << 20)
+        self._text = text_path.open("a", encoding="utf-8", buffering=1 << 20)
+
+    def write(self, chunk: DocumentChunk):
+        self._records.write(json.dumps(asdict(chunk), ensure_ascii=False) + "\n")
+        if chunk.chunk_type == "text":
+            self._text.write(format_text_record(chunk))
+
+        self.counts[chunk.chunk_type] += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def write_many(self, chunks: Iterable[DocumentChunk]):
+        for chunk in chunks:
+            self.write(chunk)
+
+    def flush(self):
+        self._records.flush()
+        self._text.flush()
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._records.close()
+        self._text.close()
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_chunks(path: Path) -> Iterator[DocumentChunk]:
+    """Lazily read chunks back from a JSONL file written by ChunkWriter."""
+    with path.open("r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            try:
+                yield DocumentChunk(**json.loads(line))
+            except (json.JSONDecodeError, TypeError):
+                # A torn last line is expected after a crash
+                logger.warning(f"Skipping unreadable record {path.name}:{line_number}")
+
+
+def load_chunks(path: Path) -> List[DocumentChunk]:
+    """Load chunks saved either by save_chunks (.pkl) or ChunkWriter (.jsonl)."""
+    if path.suffix == ".jsonl":
+        return list(iter_chunks(path))
+
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
 # -----------------------------
 # PDF Processor
 # -----------------------------
@@ -49,6 +191,10 @@ class FastPDFProcessor:
         self.extract_images = extract_images
         self.extract_tables = extract_tables
         self.image_counter = 0
+        self.stats = IngestStats()
+        self.image_store = ImageStore(settings.IMAGE_DIR)
+        # xref -> (blob path, content hash, format) of images already stored
+        self._xref_blobs: Dict[int, Tuple[str, str, str]] = {}
 
         # Single text output file
         self.text_output_file = settings.TEXT_DIR / "all_text_chunks.txt"
@@ -56,51 +202,218 @@ class FastPDFProcessor:
         self.text_output_file.write_text("", encoding="utf-8")
 
         # Make sure directories exist
-        settings.IMAGE_DIR.mkdir(parents=True, exist_ok=True)
         settings.TABLE_DIR.mkdir(parents=True, exist_ok=True)
 
     # -----------------------------
     # Public API
     # -----------------------------
-    def process_directory(self, directory: Path = settings.PDF_DIR) -> List[DocumentChunk]:
+    @traced("preprocess.directory")
+    def process_directory(
+        self,
+        directory: Path = settings.PDF_DIR,
+        workers: Optional[int] = None,
+        pdf_files: Optional[List[Path]] = None,
+        on_pdf_done: Optional[Callable[[str], None]] = None,
+    ) -> List[DocumentChunk]:
+        """
+        Extract every PDF in `directory` (or just `pdf_files`).
+
+        `on_pdf_done` is called with the source name of each PDF that was
+        processed successfully.
+        """
         logger.info(f"Scanning PDF directory: {directory}")
         all_chunks: List[DocumentChunk] = []
 
-        pdf_files = list(directory.glob("*.pdf"))
+        # Sorted so chunk order and the text file are identical across runs
+        pdf_files = sorted(directory.glob("*.pdf") if pdf_files is None else pdf_files)
         logger.info(f"Found {len(pdf_files)} PDF files")
 
-        for pdf_path in pdf_files:
-            try:
-                all_chunks.extend(self.process_pdf(pdf_path))
-            except Exception as e:
-                logger.exception(f"Failed processing {pdf_path.name}: {e}")
+        workers = max(1, min(workers or settings.PREPROCESS_WORKERS, len(pdf_files) or 1))
+        self.stats = IngestStats(workers=workers)
+        start = time.perf_counter()
+
+        for result in self._iter_results(pdf_files, workers):
+            self.write_text_chunks(result.chunks)
+            all_chunks.extend(result.chunks)
+            self._record(result)
+            if on_pdf_done:
+                on_pdf_done(result.doc_name)
 
+        self.stats.elapsed = time.perf_counter() - start
+        self._record_metrics()
         logger.info(f"Total chunks extracted: {len(all_chunks)}")
+        logger.info(f"Throughput: {self.stats.report()}")
         return all_chunks
 
+    @traced("preprocess.stream_directory")
+    def stream_directory(
+        self,
+        directory: Path = settings.PDF_DIR,
+        output_path: Path = settings.DATA_DIR / "chunks.jsonl",
+        workers: Optional[int] = None,
+        pdf_files: Optional[List[Path]] = None,
+        append: bool = False,
+        on_pdf_done: Optional[Callable[[str], None]] = None,
+    ) -> ChunkWriter:
+        """
+        Stream every chunk straight to `output_path` instead of building a list.
+
+        Serially, chunks are written page by page; with a pool, one PDF at a
+        time. Either way memory stays flat regardless of corpus size.
+        `on_pdf_done` is called once a PDF's records have been flushed.
+        """
+        logger.info(f"Streaming PDF directory: {directory} -> {output_path}")
+
+        pdf_files = sorted(directory.glob("*.pdf") if pdf_files is None else pdf_files)
+        logger.info(f"Found {len(pdf_files)} PDF files")
+
+        workers = max(1, min(workers or settings.PREPROCESS_WORKERS, len(pdf_files) or 1))
+        self.stats = IngestStats(workers=workers)
+        start = time.perf_counter()
+
+        with ChunkWriter(output_path, self.text_output_file, append=append) as writer:
+            if workers == 1:
+                for pdf_path in pdf_files:
+                    try:
+                        for _, page_chunks in self._iter_pages(pdf_path):
+                            writer.write_many(page_chunks)
+                            self.stats.pages += 1
+                            self.stats.chunks += len(page_chunks)
+                        self.stats.pdfs += 1
+                        self.stats.add_images(self.image_store.stats)
+                    except Exception as e:
+                        logger.exception(f"Failed processing {pdf_path.name}: {e}")
+                        writer.flush()
+                        continue
+
+                    writer.flush()
+                    if on_pdf_done:
+                        on_pdf_done(pdf_path.stem)
+            else:
+                for result in self._iter_results(pdf_files, workers):
+                    writer.write_many(result.chunks)
+                    writer.flush()
+                    self._record(result)
+                    if on_pdf_done:
+                        on_pdf_done(result.doc_name)
+
+        self.stats.elapsed = time.perf_counter() - start
+        self._record_metrics()
+        logger.info(f"Total chunks streamed: {self.stats.chunks}")
+        logger.info(f"Throughput: {self.stats.report()}")
+        return writer
+
+    def _record_metrics(self):
+        stats = self.stats
+        annotate(workers=stats.workers, pdfs=stats.pdfs, pages=stats.pages, chunks=stats.chunks)
+        count("pdfs_total", stats.pdfs)
+        count("pages_total", stats.pages)
+        count("chunks_total", stats.chunks)
+        count("images_deduped_total", stats.images_deduped)
+
+    def rewrite_chunks(self, path: Path, drop_sources: Set[str]) -> Counter:
+        """
+        Drop the records of `drop_sources` from a chunks.jsonl in place.
+
+        Kept text chunks are re-rendered into the (freshly truncated) text
+        file. Returns the per-type counts of the kept records.
+        """
+        tmp_path = path.with_suffix(".tmp")
+        with ChunkWriter(tmp_path, self.text_output_file) as writer:
+            writer.write_many(c for c in iter_chunks(path) if c.metadata["source"] not in drop_sources)
+        os.replace(tmp_path, path)
+        return writer.counts
+
     def process_pdf(self, pdf_path: Path) -> List[DocumentChunk]:
-        logger.info(f"Processing PDF: {pdf_path.name}")
+        result = self._extract_pdf(pdf_path)
+        self.write_text_chunks(result.chunks)
+        return result.chunks
+
+    def _record(self, result: PDFResult):
+        self.stats.pdfs += 1
+        self.stats.pages += result.pages
+        self.stats.chunks += len(result.chunks)
+        self.stats.add_images(result.image_stats)
+
+    def _iter_results(self, pdf_files: List[Path], workers: int) -> Iterator[PDFResult]:
+        """Yield one result per PDF, in input order, serially or from a pool."""
+        if workers == 1:
+            for pdf_path in pdf_files:
+                try:
+                    yield self._extract_pdf(pdf_path)
+                except Exception as e:
+                    logger.exception(f"Failed processing {pdf_path.name}: {e}")
+            return
+
+        # Workers get a pickled copy of this processor (so __init__ does not
+        # truncate the text file again) and only extract. Results are consumed
+        # in submission order, so the text file is written by this process
+        # alone, one whole PDF at a time.
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(pdf_path, pool.submit(self._extract_pdf, pdf_path)) for pdf_path in pdf_files]
+            for pdf_path, future in futures:
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.exception(f"Failed processing {pdf_path.name}: {e}")
+
+    def _extract_pdf(self, pdf_path: Path) -> PDFResult:
         chunks: List[DocumentChunk] = []
+        pages = 0
+
+        for _, page_chunks in self._iter_pages(pdf_path):
+            chunks.extend(page_chunks)
+            pages += 1
+
+        return PDFResult(
+            doc_name=pdf_path.stem,
+            chunks=chunks,
+            pages=pages,
+            image_stats=self.image_store.stats,
+        )
+
+    def _iter_pages(self, pdf_path: Path) -> Iterator[Tuple[int, List[DocumentChunk]]]:
+        """Lazily yield (page_number, chunks) for each page of a PDF."""
+        logger.info(f"Processing PDF: {pdf_path.name}")
+
+        # Image numbering restarts per document, so ids never depend on
+        # which PDFs were processed before this one or by which worker
+        self.image_counter = 0
+        self._xref_blobs = {}
+        self.image_store.stats = ImageStoreStats()
 
         doc = fitz.open(pdf_path)
 
-        for page_number, page in enumerate(doc, start=1):
-            chunks.extend(self._extract_text(page, page_number, pdf_path.stem))
+        try:
+            for page_number, page in enumerate(doc, start=1):
+                yield page_number, self._extract_page(page, page_number, pdf_path.stem)
+        finally:
+            doc.close()
+
+        if self.image_store.stats.images:
+            logger.info(f"Images in {pdf_path.name}: {self.image_store.stats.report()}")
+
+    def _extract_page(self, page, page_number: int, doc_name: str) -> List[DocumentChunk]:
+        # Parse the page layout once; text and table extraction share it.
+        # Block tuples are (x0, y0, x1, y1, text, block_no, block_type).
+        blocks = page.get_text("blocks")
+        text = "\n".join(b[4] for b in blocks if b[6] == 0)
 
-            if self.extract_images:
-                chunks.extend(self._extract_images(page, page_number, pdf_path.stem))
+        chunks = self._extract_text(text, page_number, doc_name)
 
-            if self.extract_tables:
-                chunks.extend(self._extract_tables(page, page_number, pdf_path.stem))
+        if self.extract_images:
+            chunks.extend(self._extract_images(page, page_number, doc_name))
+
+        if self.extract_tables:
+            chunks.extend(self._extract_tables(blocks, page_number, doc_name))
 
-        doc.close()
         return chunks
 
     # -----------------------------
     # Text Extraction (ONE FILE)
     # -----------------------------
-    def _extract_text(self, page, page_number: int, doc_name: str) -> List[DocumentChunk]:
-        text = page.get_text("text").strip()
+    def _extract_text(self, text: str, page_number: int, doc_name: str) -> List[DocumentChunk]:
+        text = text.strip()
         if not text:
             return []
 
@@ -117,7 +430,7 @@ class FastPDFProcessor:
             if current_length + word_len > self.chunk_size and current_words:
                 chunk_text = " ".join(current_words)
                 chunks.append(
-                    self._append_text_chunk(chunk_text, doc_name, page_number, chunk_index)
+                    self._make_text_chunk(chunk_text, doc_name, page_number, chunk_index)
                 )
 
                 overlap_count = int(len(current_words) * (self.chunk_overlap / self.chunk_size))
@@ -131,25 +444,16 @@ class FastPDFProcessor:
         if current_words:
             chunk_text = " ".join(current_words)
             chunks.append(
-                self._append_text_chunk(chunk_text, doc_name, page_number, chunk_index)
+                self._make_text_chunk(chunk_text, doc_name, page_number, chunk_index)
             )
 
         return chunks
 
-    def _append_text_chunk(
+    def _make_text_chunk(
         self, text: str, doc_name: str, page_number: int, chunk_index: int
     ) -> DocumentChunk:
         chunk_id = f"{doc_name}_page{page_number}_text{chunk_index}"
 
-        with self.text_output_file.open("a", encoding="utf-8") as f:
-            f.write("\n" + "=" * 80 + "\n")
-            f.write(f"CHUNK_ID   : {chunk_id}\n")
-            f.write(f"SOURCE     : {doc_name}\n")
-            f.write(f"PAGE       : {page_number}\n")
-            f.write(f"CHAR_COUNT : {len(text)}\n")
-            f.write("-" * 80 + "\n")
-            f.write(text + "\n")
-
         return DocumentChunk(
             content=text,
             chunk_type="text",
@@ -163,6 +467,15 @@ class FastPDFProcessor:
             file_path=str(self.text_output_file),
         )
 
+    def write_text_chunks(self, chunks: List[DocumentChunk]):
+        """Append a document's text chunks to the single text file."""
+        text_chunks = [c for c in chunks if c.chunk_type == "text"]
+        if not text_chunks:
+            return
+
+        with self.text_output_file.open("a", encoding="utf-8") as f:
+            f.writelines(format_text_record(chunk) for chunk in text_chunks)
+
     # -----------------------------
     # Image Extraction
     # -----------------------------
@@ -170,18 +483,32 @@ class FastPDFProcessor:
         chunks: List[DocumentChunk] = []
         images = page.get_images(full=True)
 
+        stats = self.image_store.stats
+
         for img in images:
             try:
                 xref = img[0]
-                base_image = page.parent.extract_image(xref)
-                image_bytes = base_image["image"]
+                stats.images += 1
+
+                # Logos and repeated figures reuse one xref on every page:
+                # skip extraction, but still emit a chunk pointing at the
+                # shared blob (its summary comes from the hash-keyed cache)
+                if xref in self._xref_blobs:
+                    image_path, image_hash, image_format = self._xref_blobs[xref]
+                    stats.xref_hits += 1
+                    stats.bytes_saved += Path(image_path).stat().st_size
+                else:
+                    base_image = page.parent.extract_image(xref)
+                    image_path, image_hash = self.image_store.put(
+                        base_image["image"],
+                        base_image.get("ext", "png"),
+                        base_image.get("colorspace", 3),
+                    )
+                    image_format = base_image.get("ext", "unknown")
+                    self._xref_blobs[xref] = (str(image_path), image_hash, image_format)
 
                 self.image_counter += 1
                 chunk_id = f"{doc_name}_page{page_number}_img{self.image_counter}"
-                image_path = settings.IMAGE_DIR / f"{chunk_id}.png"
-
-                image = Image.open(io.BytesIO(image_bytes))
-                image.save(image_path)
 
                 chunks.append(
                     DocumentChunk(
@@ -191,7 +518,8 @@ class FastPDFProcessor:
                         metadata={
                             "source": doc_name,
                             "page": page_number,
-                            "format": base_image.get("ext", "unknown"),
+                            "format": image_format,
+                            "image_hash": image_hash,
                         },
                         chunk_id=chunk_id,
                         file_path=str(image_path),
@@ -206,9 +534,8 @@ class FastPDFProcessor:
     # -----------------------------
     # Table Extraction
     # -----------------------------
-    def _extract_tables(self, page, page_number: int, doc_name: str) -> List[DocumentChunk]:
+    def _extract_tables(self, blocks, page_number: int, doc_name: str) -> List[DocumentChunk]:
         chunks: List[DocumentChunk] = []
-        blocks = page.get_text("blocks")
         table_index = 1
 
         for block in blocks:
@@ -258,19 +585,61 @@ def main():
     logger.info("Starting PDF preprocessing")
 
     processor = FastPDFProcessor()
-    chunks = processor.process_directory()
+    output_path = settings.DATA_DIR / ("chunks.jsonl" if settings.PREPROCESS_STREAMING else "chunks.pkl")
+
+    manifest = DocumentManifest()
+    pdf_files = sorted(settings.PDF_DIR.glob("*.pdf"))
+    logger.info(f"Corpus changes: {manifest.scan(pdf_files).report()}")
+
+    # New, modified, removed and previously failed PDFs; everything on a full run
+    incremental = settings.INCREMENTAL_INGEST and output_path.exists()
+    stale = set(manifest.stale("chunked")) if incremental else set(manifest.entries)
+    todo = [p for p in pdf_files if p.stem in stale]
+    logger.info(f"{len(todo)} PDFs to process, {len(pdf_files) - len(todo)} unchanged")
+
+    def mark_chunked(source: str):
+        manifest.mark(source, "chunked")
+        manifest.save()
+
+    if settings.PREPROCESS_STREAMING:
+        counts = processor.rewrite_chunks(output_path, stale) if incremental else Counter()
+        writer = processor.stream_directory(
+            output_path=output_path,
+            pdf_files=todo,
+            append=incremental,
+            on_pdf_done=mark_chunked,
+        )
+        counts += writer.counts
+    else:
+        kept = [c for c in load_chunks(output_path) if c.metadata["source"] not in stale] if incremental else []
+        processor.write_text_chunks(kept)
+
+        done: List[str] = []
+        chunks = kept + processor.process_directory(pdf_files=todo, on_pdf_done=done.append)
+        processor.save_chunks(chunks, output_path)
+        counts = Counter(c.chunk_type for c in chunks)
+
+        for source in done:
+            manifest.mark(source, "chunked")
 
-    processor.save_chunks(chunks)
+    # Removed PDFs: their chunks are gone now
+    for source in stale:
+        if manifest.is_removed(source):
+            manifest.mark(source, "chunked")
+    manifest.save()
 
     print("\n" + "=" * 60)
     print("PREPROCESSING RESULTS")
     print("=" * 60)
-    print(f"Total chunks : {len(chunks)}")
-    print(f"Text chunks  : {len([c for c in chunks if c.chunk_type == 'text'])}")
-    print(f"Image chunks : {len([c for c in chunks if c.chunk_type == 'image'])}")
-    print(f"Table chunks : {len([c for c in chunks if c.chunk_type == 'table'])}")
+    print(f"Total chunks : {sum(counts.values())}")
+    print(f"Text chunks  : {counts['text']}")
+    print(f"Image chunks : {counts['image']}")
+    print(f"Table chunks : {counts['table']}")
+    print(f"Throughput   : {processor.stats.pages_per_sec:.1f} pages/sec, "
+          f"{processor.stats.chunks_per_sec:.1f} chunks/sec "
+          f"({processor.stats.workers} worker(s))")
     print(f"\nText output file: {processor.text_output_file}")
-    print(f"All chunks saved to: data/chunks.pkl")
+    print(f"All chunks saved to: {output_path}")
     print("=" * 60)
 
 
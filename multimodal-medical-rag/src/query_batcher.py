@@ -0,0 +1,148 @@
+"""
+Micro-batching of quick-mode searches from concurrent requests.
+- Requests arriving within BATCH_MAX_WAIT_MS of the first one (up to
+  BATCH_MAX_SIZE) share one embedding request and one FAISS search
+- A lone request waits at most BATCH_MAX_WAIT_MS extra
+- Must be created and used on a single event loop (the server's)
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+from langchain_core.documents import Document
+
+from config.settings import settings
+from src.embeddings import TypeFilter, VectorStoreManager, normalize_type_filter
+from src.tracing import detach, observe
+
+Hits = List[Tuple[Document, Optional[float]]]
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def _fail_closed(batch: list):
+    """Fail the waiting callers of `batch` requests when the batcher shuts down."""
+    for *_, future in batch:
+        if not future.done():
+            future.set_exception(RuntimeError("Query batcher closed"))
+
+
+class QueryBatcher:
+    """Collects search() calls and answers them with VectorStoreManager.asearch_batch."""
+
+    def __init__(
+        self,
+        vectorstore_manager: VectorStoreManager,
+        max_batch: int = settings.BATCH_MAX_SIZE,
+        max_wait_ms: float = settings.BATCH_MAX_WAIT_MS,
+    ):
+        self.vs = vectorstore_manager
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.queries = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def search(self, query: str, k: int = 5, filter_type: TypeFilter = None) -> Hits:
+        """(document, L2 distance) hits for one query, searched together with its neighbours."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, k, normalize_type_filter(filter_type), future))
+        return await future
+
+    async def close(self):
+        """Stop the worker; queued and in-flight searches fail instead of hanging."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._in_flight:
+            in_flight = list(self._in_flight)
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+        while self._queue is not None and not self._queue.empty():
+            _fail_closed([self._queue.get_nowait()])
+
+    @property
+    def average_batch_size(self) -> float:
+        return self.queries / self.batches if self.batches else 0.0
+
+    # --------------------------------------------------
+    # WORKER
+    # --------------------------------------------------
+
+    async def _collect(self) -> list:
+        """Block for one request, then take whatever else arrives before the deadline."""
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+
+        try:
+            while len(batch) < self.max_batch:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Already taken off the queue, so close() cannot drain these
+            _fail_closed(batch)
+            raise
+        return batch
+
+    async def _run(self):
+        # Created from whichever request came first; batches are not part of its trace
+        detach()
+        while True:
+            batch = await self._collect()
+            self.batches += 1
+            self.queries += len(batch)
+            observe("query_batch_size", len(batch), buckets=BATCH_SIZE_BUCKETS)
+            # Searched in the background so the next batch collects meanwhile
+            task = asyncio.create_task(self._search(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _search(self, batch: list):
+        # One asearch_batch per distinct (k, filter); normally there is just one
+        groups: Dict[tuple, list] = defaultdict(list)
+        for query, k, types, future in batch:
+            groups[(k, types)].append((query, future))
+
+        try:
+            await asyncio.gather(*(
+                self._search_group(k, types, items) for (k, types), items in groups.items()
+            ))
+        except asyncio.CancelledError:
+            # close() during the search: callers get an error, not a hang
+            _fail_closed(batch)
+            raise
+
+    async def _search_group(self, k: int, types, items: list):
+        try:
+            results = await self.vs.asearch_batch([query for query, _ in items], k=k, filter_type=types)
+        except Exception as e:
+            logger.error(f"Batched search of {len(items)} queries failed: {e}")
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), hits in zip(items, results):
+            # The caller may have timed out and cancelled its wait
+            if not future.done():
+                future.set_result(hits)
@@ -0,0 +1,88 @@
+"""
+Async rate limiting and retries for model API calls.
+- TokenBucket / RateLimiter: requests-per-minute and tokens-per-minute budgets
+- retry_with_backoff: exponential backoff with full jitter on 429 / 5xx
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute; acquire() waits for capacity."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.available = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0):
+        # A single request larger than the bucket would never fit
+        amount = min(amount, self.capacity)
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+
+                await asyncio.sleep((amount - self.available) / self.rate)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits (either may be off)."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    async def acquire(self, tokens: int = 0):
+        if self.requests:
+            await self.requests.acquire(1)
+        if self.tokens and tokens:
+            await self.tokens.acquire(tokens)
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Rate limits, server errors, timeouts and dropped connections."""
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+
+    try:
+        import openai
+        return isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError))
+    except ImportError:
+        return False
+
+
+async def retry_with_backoff(
+    call: Callable[[], Awaitable[T]],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    retryable: Callable[[Exception], bool] = is_retryable,
+) -> T:
+    """Await `call()`, retrying retryable errors with jittered exponential backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == max_retries or not retryable(e):
+                raise
+
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            logger.warning(f"Retryable error ({e}); attempt {attempt + 1}/{max_retries}, sleeping {delay:.1f}s")
+            await asyncio.sleep(delay)
@@ -1,78 +1,123 @@
 import asyncio
 import base64
 import json
+import mimetypes
 from pathlib import Path
-from typing import List, Dict
-import pickle
-from openai import OpenAI
-from src.preprocessing import DocumentChunk
+from typing import List, Dict, Optional
+from openai import AsyncOpenAI
+from loguru import logger
+from src.preprocessing import DocumentChunk, load_chunks
+from src.manifest import DocumentManifest
+from src.rate_limit import RateLimiter, retry_with_backoff
+from src.summary_cache import SummaryCache
+from src.tracing import annotate, cache_lookups, count, span, traced
 from config.settings import settings
 
+SYSTEM_PROMPT = "You are a medical image analyst. Describe key clinical features."
+USER_PROMPT = "Describe this medical image in detail, focus on key features and relevance."
+
 class MultimodalSummarizer:
     """Summarize image chunks using Vision model, store text chunks as-is."""
 
-    def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(
+        self,
+        client=None,
+        concurrency: int = settings.SUMMARY_CONCURRENCY,
+        requests_per_minute: Optional[float] = settings.SUMMARY_REQUESTS_PER_MINUTE,
+        tokens_per_minute: Optional[float] = settings.SUMMARY_TOKENS_PER_MINUTE,
+        max_retries: int = settings.SUMMARY_MAX_RETRIES,
+        cache: Optional[SummaryCache] = None,
+    ):
+        # Any object with an async `chat.completions.create` works (e.g. a local stub)
+        self.client = client or AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.vision_model = "gpt-4o-mini"
+        self.max_tokens = 200
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.cache = cache or SummaryCache()
+        # Everything that changes the model's answer is part of the cache key
+        self.prompt_key = f"{SYSTEM_PROMPT}\n{USER_PROMPT}\nmax_tokens={self.max_tokens}"
 
     def encode_image(self, image_path: str) -> str:
         with open(image_path, "rb") as f:
             return base64.b64encode(f.read()).decode("utf-8")
 
-    async def summarize_image(self, chunk: DocumentChunk, delay: float = 0.5) -> Dict:
-        """Summarize a single image chunk with throttling and logging."""
-        try:
-            b64_image = self.encode_image(chunk.content)
+    @traced("summarize.image")
+    async def summarize_image(self, chunk: DocumentChunk) -> Dict:
+        """Summarize a single image chunk under the concurrency and rate limits."""
+        result = {
+            "chunk_id": chunk.chunk_id,
+            "chunk_type": "image",
+            "original_content": getattr(chunk, "text_content", ""),  # any extracted text
+            "summary": None,
+            "page_number": chunk.page_number,
+            "metadata": chunk.metadata
+        }
 
-            def sync_call():
-                return self.client.chat.completions.create(
+        try:
+            image_bytes = Path(chunk.content).read_bytes()
+            cache_key = SummaryCache.make_key(image_bytes, self.vision_model, self.prompt_key)
+
+            cached = self.cache.get(cache_key)
+            cache_lookups("summary", hits=int(cached is not None), misses=int(cached is None))
+            if cached is not None:
+                print(f"[Page {chunk.page_number}] Image chunk summary from cache: {cached[:100]}...")
+                result["summary"] = cached
+                return result
+
+            b64_image = base64.b64encode(image_bytes).decode("utf-8")
+            mime_type = mimetypes.guess_type(chunk.content)[0] or "image/png"
+
+            async def call():
+                await self.limiter.acquire(settings.SUMMARY_TOKENS_PER_REQUEST)
+                return await self.client.chat.completions.create(
                     model=self.vision_model,
                     messages=[
                         {
                             "role": "system",
-                            "content": "You are a medical image analyst. Describe key clinical features."
+                            "content": SYSTEM_PROMPT
                         },
                         {
                             "role": "user",
                             "content": [
-                                {"type": "text", "text": "Describe this medical image in detail, focus on key features and relevance."},
-                                {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{b64_image}"}}
+                                {"type": "text", "text": USER_PROMPT},
+                                {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{b64_image}"}}
                             ]
                         }
                     ],
-                    max_tokens=200
+                    max_tokens=self.max_tokens
                 )
 
-            response = await asyncio.to_thread(sync_call)
-            summary = response.choices[0].message.content.strip()
+            async with self.semaphore:
+                with span("summarize.llm"):
+                    response = await retry_with_backoff(call, max_retries=self.max_retries)
 
-            # Print log
-            print(f"[Page {chunk.page_number}] Image chunk summarized: {summary[:100]}...")
+            # Stub clients may not report usage
+            usage = getattr(response, "usage", None)
+            input_tokens = getattr(usage, "prompt_tokens", None) or 0
+            output_tokens = getattr(usage, "completion_tokens", None) or 0
+            annotate(input_tokens=input_tokens, output_tokens=output_tokens)
+            count("llm_tokens_total", input_tokens, stage="summarize", kind="input")
+            count("llm_tokens_total", output_tokens, stage="summarize", kind="output")
 
-            await asyncio.sleep(delay)  # Throttle
+            result["summary"] = response.choices[0].message.content.strip()
+            self.cache.put(cache_key, result["summary"])
 
-            return {
-                "chunk_id": chunk.chunk_id,
-                "chunk_type": "image",
-                "original_content": getattr(chunk, "text_content", ""),  # any extracted text
-                "summary": summary,
-                "page_number": chunk.page_number,
-                "metadata": chunk.metadata
-            }
+            # Print log
+            print(f"[Page {chunk.page_number}] Image chunk summarized: {result['summary'][:100]}...")
 
         except Exception as e:
+            # Recorded as a failure (never as summary text, which would get embedded)
             print(f"Error summarizing image {chunk.content}: {e}")
-            return {
-                "chunk_id": chunk.chunk_id,
-                "chunk_type": "image",
-                "original_content": getattr(chunk, "text_content", ""),
-                "summary": f"Error: {e}",
-                "page_number": chunk.page_number,
-                "metadata": chunk.metadata
-            }
-
-    async def process_chunks(self, chunks: List[DocumentChunk], delay: float = 0.5) -> List[Dict]:
-        """Process all chunks: store text as-is, summarize images."""
+            result["error"] = str(e)
+            count("summary_failures_total")
+
+        return result
+
+    @traced("summarize.chunks")
+    async def process_chunks(self, chunks: List[DocumentChunk]) -> List[Dict]:
+        """Process all chunks: store text as-is, summarize images concurrently."""
         results = []
         for chunk in chunks:
             if chunk.chunk_type == "text":
@@ -86,25 +131,47 @@ class MultimodalSummarizer:
                     "metadata": chunk.metadata
                 })
             elif chunk.chunk_type == "image":
-                result = await self.summarize_image(chunk, delay)
-                results.append(result)
+                # Scheduled now, awaited below, so output keeps input order
+                results.append(asyncio.ensure_future(self.summarize_image(chunk)))
+
+        results = [await r if asyncio.isfuture(r) else r for r in results]
+        annotate(chunks=len(chunks), images=sum(c.chunk_type == "image" for c in chunks))
+        logger.info(self.cache.report())
         return results
 
 
 async def main():
     # Load chunks
-    chunks_file = settings.DATA_DIR / "chunks.pkl"
-    with open(chunks_file, "rb") as f:
-        chunks: List[DocumentChunk] = pickle.load(f)
+    chunks_file = settings.DATA_DIR / ("chunks.jsonl" if settings.PREPROCESS_STREAMING else "chunks.pkl")
+    chunks: List[DocumentChunk] = load_chunks(chunks_file)
+    output_file = settings.DATA_DIR / "processed_chunks.json"
+
+    # Only re-summarize sources whose current version has not been summarized
+    manifest = DocumentManifest()
+    incremental = settings.INCREMENTAL_INGEST and output_file.exists()
+    stale = set(manifest.stale("summarized")) if incremental else set(manifest.entries)
+    previous = json.loads(output_file.read_text(encoding="utf-8")) if incremental else []
+    kept = [item for item in previous if item.get("metadata", {}).get("source") not in stale]
+    todo = [c for c in chunks if c.metadata["source"] in stale or c.metadata["source"] not in manifest.entries]
+    logger.info(f"Summarizing {len(todo)} chunks, reusing {len(kept)} from the previous run")
 
     summarizer = MultimodalSummarizer()
-    processed_chunks = await summarizer.process_chunks(chunks, delay=0.5)
+    processed_chunks = kept + await summarizer.process_chunks(todo)
 
     # Save all chunks (text as-is + summarized images)
-    output_file = settings.DATA_DIR / "processed_chunks.json"
     output_file.write_text(json.dumps(processed_chunks, indent=2), encoding="utf-8")
     print(f"\nAll chunks saved to {output_file}")
 
+    # Sources with failed summaries stay stale and are retried next run
+    failed = [item for item in processed_chunks if item.get("error")]
+    failed_sources = {item["metadata"].get("source") for item in failed}
+    if failed:
+        logger.warning(f"{len(failed)} image summaries failed in: {', '.join(sorted(failed_sources))}")
+
+    for source in stale - failed_sources:
+        manifest.mark(source, "summarized")
+    manifest.save()
+
 
 if __name__ == "__main__":
     asyncio.run(main())
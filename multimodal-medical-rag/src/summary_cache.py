@@ -0,0 +1,98 @@
+"""
+Persistent cache of vision summaries.
+- Keyed by SHA-256 of (image bytes, model name, prompt text)
+- Stored in SQLite, evicted least-recently-used once over a byte budget
+- Tracks hit / miss / eviction counts
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+from config.settings import settings
+
+
+class SummaryCache:
+    """On-disk summary cache; a re-run over an unchanged corpus makes no API calls."""
+
+    def __init__(
+        self,
+        path: Path = settings.SUMMARY_CACHE_PATH,
+        max_bytes: int = settings.SUMMARY_CACHE_MAX_BYTES,
+    ):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY,"
+            " summary TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+
+    @staticmethod
+    def make_key(image_bytes: bytes, model: str, prompt: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(hashlib.sha256(image_bytes).digest())
+        digest.update(model.encode("utf-8") + b"\0" + prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        return row[0]
+
+    def put(self, key: str, summary: str):
+        size = len(summary.encode("utf-8"))
+        old = self.conn.execute("SELECT size FROM summaries WHERE key = ?", (key,)).fetchone()
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO summaries (key, summary, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, summary, size, time.time()),
+        )
+        self.total_bytes += size - (old[0] if old else 0)
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            row = self.conn.execute(
+                "SELECT key, size FROM summaries ORDER BY last_used LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self.conn.execute("DELETE FROM summaries WHERE key = ?", (row[0],))
+            self.total_bytes -= row[1]
+            self.evictions += 1
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self) -> str:
+        return (
+            f"summary cache: {self.hits} hits / {self.misses} misses "
+            f"({self.hit_rate:.0%}), {self.evictions} evicted, "
+            f"{self.total_bytes / 1024:.1f} KiB of {self.max_bytes / 1024:.0f} KiB used"
+        )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,23 @@
+"""
+Token counting for prompt budgets and throughput reports.
+Uses tiktoken (installed with langchain-openai) when its encoding can be
+loaded, otherwise a ~4 characters per token estimate.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
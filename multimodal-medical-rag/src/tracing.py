@@ -0,0 +1,407 @@
+"""
+Lightweight per-stage tracing and metrics.
+- span(name, **attributes) / @traced(name): time a stage; spans opened inside
+  another span become its children, and each top-level span is written as one
+  JSON trace line to TRACE_FILE
+- @traced_stream(name): the same for generators; the span is current only while
+  the generator runs, not in the consumer between items
+- annotate(**attributes): add token / cache / document counts to the current span
+- count / observe / cache_lookups: Prometheus-style counters and histograms;
+  every finished span also observes medrag_stage_duration_seconds{stage=...}
+- prometheus_text(): the metric registry in Prometheus text format
+- With TRACING_ENABLED and METRICS_ENABLED off, span() returns a shared no-op
+  object and count / observe return immediately
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from config.settings import settings
+
+PREFIX = "medrag"
+# Seconds; wide enough for a FAISS lookup and a slow LLM call alike
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_tracing = settings.TRACING_ENABLED
+_metrics = settings.METRICS_ENABLED
+_trace_file: Optional[Path] = settings.TRACE_FILE
+_trace_lock = threading.Lock()
+_current: ContextVar[Optional["Span"]] = ContextVar("medrag_span", default=None)
+
+# Last finished traces, for inspection without reading the file (e.g. /traces)
+recent_traces: deque = deque(maxlen=100)
+
+
+def configure(
+    tracing: Optional[bool] = None,
+    metrics: Optional[bool] = None,
+    trace_file: Optional[Path] = None,
+):
+    """Override the settings at runtime (the server always collects metrics)."""
+    global _tracing, _metrics, _trace_file
+    if tracing is not None:
+        _tracing = tracing
+    if metrics is not None:
+        _metrics = metrics
+    if trace_file is not None:
+        _trace_file = Path(trace_file)
+
+
+def enabled() -> bool:
+    return _tracing or _metrics
+
+
+# --------------------------------------------------
+# SPANS
+# --------------------------------------------------
+
+class Span:
+    __slots__ = ("name", "attributes", "start", "duration", "children", "parent", "_token")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+        self.duration = 0.0
+        self.children: List["Span"] = []
+        self.parent: Optional["Span"] = None
+        self._token = None
+
+    def set(self, **attributes) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def __enter__(self) -> "Span":
+        self._begin()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited from another context, which never had this span set:
+            # leave that context's current span alone
+            pass
+        self._end(exc_type)
+        return False
+
+    def _begin(self):
+        self.parent = _current.get()
+        self.start = time.perf_counter()
+
+    def _end(self, exc_type=None):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        _finish(self)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            **({"attributes": self.attributes} if self.attributes else {}),
+            **({"children": [c.to_dict(origin) for c in self.children]} if self.children else {}),
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attributes) -> "_NoopSpan":
+        return self
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Context manager timing one stage; `with span("faiss.search", k=5) as s: ...`."""
+    if not (_tracing or _metrics):
+        return NOOP_SPAN
+    return Span(name, attributes)
+
+
+def traced(name: str):
+    """Decorator form of span() for plain and async functions (not generators)."""
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def traced_stream(name: str):
+    """
+    Decorator form of span() for generators and async generators.
+
+    A span entered inside a generator would stay current in the consumer
+    between items, adopting whatever spans the consumer opens meanwhile.
+    Here the span is set only while the generator body runs and is reset
+    before each item is handed out.
+    """
+    def decorate(func):
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                s = span(name)
+                if s is NOOP_SPAN:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                    return
+
+                s._begin()
+                generator = func(*args, **kwargs)
+                exc_type = None
+                try:
+                    while True:
+                        token = _current.set(s)
+                        try:
+                            item = await generator.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        finally:
+                            _current.reset(token)
+                        yield item
+                except GeneratorExit:
+                    # Consumer stopped early; not an error
+                    raise
+                except BaseException as e:
+                    exc_type = type(e)
+                    raise
+                finally:
+                    token = _current.set(s)
+                    try:
+                        await generator.aclose()
+                    finally:
+                        _current.reset(token)
+                        s._end(exc_type)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            s = span(name)
+            if s is NOOP_SPAN:
+                yield from func(*args, **kwargs)
+                return
+
+            s._begin()
+            generator = func(*args, **kwargs)
+            exc_type = None
+            try:
+                while True:
+                    token = _current.set(s)
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        break
+                    finally:
+                        _current.reset(token)
+                    yield item
+            except GeneratorExit:
+                raise
+            except BaseException as e:
+                exc_type = type(e)
+                raise
+            finally:
+                token = _current.set(s)
+                try:
+                    generator.close()
+                finally:
+                    _current.reset(token)
+                    s._end(exc_type)
+        return wrapper
+    return decorate
+
+
+def annotate(**attributes):
+    """Attach attributes to the innermost open span, if any."""
+    current = _current.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def detach():
+    """Start new traces from here on in this task / thread (long-lived background workers)."""
+    _current.set(None)
+
+
+def _finish(finished: Span):
+    if _metrics:
+        metrics.observe("stage_duration_seconds", finished.duration, stage=finished.name)
+    if not _tracing:
+        return
+
+    if finished.parent is not None:
+        # list.append is atomic, so spans finishing on worker threads are safe
+        finished.parent.children.append(finished)
+        return
+
+    trace = {
+        "trace_id": uuid.uuid4().hex,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        **finished.to_dict(finished.start),
+    }
+    recent_traces.append(trace)
+    if _trace_file is None:
+        return
+    try:
+        line = json.dumps(trace, default=str)
+        with _trace_lock:
+            _trace_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(_trace_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        logger.warning(f"Could not write trace to {_trace_file}: {e}")
+
+
+# --------------------------------------------------
+# METRICS
+# --------------------------------------------------
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: LabelKey, extra: str = "") -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricRegistry:
+    """In-process counters and cumulative histograms, keyed by name and labels."""
+
+    def __init__(self, prefix: str = PREFIX):
+        self.prefix = prefix
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        # name -> (buckets, labels -> [count per bucket..., +Inf count, sum])
+        self._histograms: Dict[str, Tuple[Sequence[float], Dict[LabelKey, List[float]]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels):
+        key = self._key(labels)
+        with self._lock:
+            bounds, series = self._histograms.setdefault(name, (tuple(buckets), {}))
+            values = series.get(key)
+            if values is None:
+                values = series[key] = [0.0] * (len(bounds) + 2)
+            # Stored per bucket; made cumulative when rendered
+            values[bisect_left(bounds, value)] += 1
+            values[-1] += value
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and histogram count / sum as plain JSON."""
+        with self._lock:
+            return {
+                "counters": {
+                    name: {_format_labels(k) or "total": v for k, v in series.items()}
+                    for name, series in self._counters.items()
+                },
+                "histograms": {
+                    name: {
+                        _format_labels(k) or "total": {"count": sum(v[:-1]), "sum": round(v[-1], 6)}
+                        for k, v in series.items()
+                    }
+                    for name, (_, series) in self._histograms.items()
+                },
+            }
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(labels)} {value:g}")
+
+            for name, (bounds, series) in sorted(self._histograms.items()):
+                full = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full} histogram")
+                for labels, values in sorted(series.items()):
+                    cumulative = 0.0
+                    for bound, bucket_count in zip([*bounds, "+Inf"], values[:-1]):
+                        cumulative += bucket_count
+                        le = bound if bound == "+Inf" else f"{bound:g}"
+                        bucket_labels = _format_labels(labels, 'le="' + le + '"')
+                        lines.append(f"{full}_bucket{bucket_labels} {cumulative:g}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {values[-1]:g}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {cumulative:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricRegistry()
+
+
+def count(name: str, value: float = 1.0, **labels):
+    if _metrics:
+        metrics.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels):
+    if _metrics:
+        metrics.observe(name, value, buckets, **labels)
+
+
+def cache_lookups(cache: str, hits: int = 0, misses: int = 0):
+    """Count lookups of one cache and note them on the current span."""
+    if _metrics:
+        if hits:
+            metrics.inc("cache_lookups_total", hits, cache=cache, result="hit")
+        if misses:
+            metrics.inc("cache_lookups_total", misses, cache=cache, result="miss")
+    if _tracing:
+        annotate(**{f"{cache}_cache_hits": hits, f"{cache}_cache_misses": misses})
+
+
+def prometheus_text() -> str:
+    return metrics.render()
@@ -0,0 +1,16 @@
+"""
+Tests run offline against a scratch data directory.
+use_scratch_dirs() must run before config.settings is imported, so it
+happens here, before any test module is collected.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.fakes import use_scratch_dirs  # noqa: E402
+
+use_scratch_dirs(Path(tempfile.mkdtemp(prefix="medical-rag-tests-")))
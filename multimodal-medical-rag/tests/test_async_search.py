@@ -0,0 +1,56 @@
+"""The async query path keeps BM25 and merging off the event loop."""
+
+import asyncio
+import threading
+
+import pytest
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, synthetic_summaries
+from src.agents.deep_research_agent import DeepResearchAgent
+from src.embeddings import VectorStoreManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = VectorStoreManager(embeddings=FakeEmbeddings(size=64))
+    manager.build_vectorstore(manager.create_documents(synthetic_summaries(300)))
+
+    threads = []
+    lexical_search = manager.lexical_search
+
+    def recording_lexical_search(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return lexical_search(*args, **kwargs)
+
+    monkeypatch.setattr(manager, "lexical_search", recording_lexical_search)
+    manager.lexical_threads = threads
+    yield manager
+    manager.doc_store.close()
+
+
+def unavailable(*args, **kwargs):
+    raise RuntimeError("embedding API down")
+
+
+def test_lexical_fallbacks_run_in_worker_threads(manager, monkeypatch):
+    monkeypatch.setattr(manager, "aembed_query", unavailable)
+    monkeypatch.setattr(manager, "aembed_queries", unavailable)
+
+    async def search():
+        single = await manager.asearch_with_scores("melanoma biopsy", k=3)
+        batch = await manager.asearch_batch(["eczema rash", "nevus margin"], k=3)
+        return single, batch
+
+    single, batch = asyncio.run(search())
+    assert single and all(distance is None for _, distance in single)
+    assert all(hits for hits in batch)
+    assert manager.lexical_threads
+    assert threading.main_thread() not in manager.lexical_threads
+
+
+def test_deep_research_merges_in_a_worker_thread(manager):
+    agent = DeepResearchAgent(manager, llm=FakeChatModel())
+    docs = asyncio.run(agent.aresearch("melanoma excision margins and recurrence"))
+    assert docs
+    assert manager.lexical_threads
+    assert threading.main_thread() not in manager.lexical_threads
@@ -0,0 +1,65 @@
+"""QA context packing: score threshold, dedupe, overlap trimming, token budget."""
+
+from langchain_core.documents import Document
+
+from src.context_builder import ContextBuilder, distance_to_similarity
+from src.tokens import count_tokens
+
+
+def doc(text, score=None, id=None):
+    return Document(page_content=text, metadata={"id": id or text[:20], "score": score})
+
+
+def words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def test_distance_to_similarity():
+    assert distance_to_similarity(0.0) == 1.0
+    assert distance_to_similarity(2.0) == 0.0
+    assert distance_to_similarity(None) is None
+
+
+def test_low_scores_are_dropped_but_unscored_hits_kept():
+    builder = ContextBuilder(min_score=0.5)
+    docs = [doc("melanoma margin", 0.9), doc("eczema rash", 0.2), doc("nevus biopsy", None)]
+    assert builder.build("q", docs).documents == [docs[0], docs[2]]
+
+
+def test_best_hit_is_kept_when_nothing_clears_the_threshold():
+    builder = ContextBuilder(min_score=0.5)
+    docs = [doc("melanoma margin", 0.3), doc("eczema rash", 0.2)]
+    assert builder.build("q", docs).documents == [docs[0]]
+
+
+def test_near_duplicates_are_skipped():
+    builder = ContextBuilder(min_score=None, redundancy_threshold=0.8)
+    docs = [doc(words("a", 20), id="1"), doc(words("a", 20) + " extra", id="2"), doc(words("b", 20), id="3")]
+    assert [d.metadata["id"] for d in builder.build("q", docs).documents] == ["1", "3"]
+
+
+def test_shared_overlap_window_is_trimmed():
+    builder = ContextBuilder(min_score=None, min_overlap_words=3)
+    first = words("a", 10)
+    second = " ".join(first.split()[-4:] + words("b", 6).split())
+    context = builder.build("q", [doc(first, id="1"), doc(second, id="2")])
+    assert context.text == first + "\n\n" + words("b", 6)
+
+
+def test_chunks_are_packed_into_the_token_budget():
+    big, small = words("a", 60), words("b", 5)
+    budget = count_tokens(big) + 5
+    builder = ContextBuilder(max_tokens=budget, min_score=None)
+
+    # The second large chunk does not fit; the small one after it does
+    context = builder.build("q", [doc(big, id="1"), doc(words("c", 60), id="2"), doc(small, id="3")])
+    assert [d.metadata["id"] for d in context.documents] == ["1", "3"]
+    assert context.tokens <= budget
+    assert context.tokens_saved > 0
+
+
+def test_oversized_best_chunk_is_truncated():
+    builder = ContextBuilder(max_tokens=10, min_score=None)
+    context = builder.build("q", [doc(words("a", 100))])
+    assert len(context.documents) == 1
+    assert 0 < context.tokens <= 10
@@ -0,0 +1,57 @@
+"""Deep research: one embedding request per question, lexical fallback."""
+
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, synthetic_summaries
+from config.settings import settings
+from src.agents.deep_research_agent import DeepResearchAgent
+from src.embeddings import VectorStoreManager
+from src.query_cache import TTLCache
+
+
+@pytest.fixture
+def manager():
+    manager = VectorStoreManager(embeddings=FakeEmbeddings(size=32))
+    manager.build_vectorstore(manager.create_documents(synthetic_summaries(200)))
+    yield manager
+    manager.doc_store.close()
+
+
+def unavailable(*args, **kwargs):
+    raise RuntimeError("embedding API down")
+
+
+@pytest.mark.parametrize("merge", ["rrf", "mmr"])
+def test_sub_queries_are_embedded_once(manager, monkeypatch, merge):
+    monkeypatch.setattr(settings, "DEEP_RESEARCH_MERGE", merge)
+    # QUERY_CACHE_SIZE=0: nothing can be served from the query cache
+    manager.query_embedding_cache = TTLCache(0)
+    agent = DeepResearchAgent(manager, llm=FakeChatModel())
+
+    fake = manager.embeddings.underlying
+    fake.calls = 0
+    docs = agent.research("melanoma excision margins")
+    assert len(docs) == settings.DEEP_RESEARCH_MAX_DOCS
+    assert fake.calls == 1
+
+    fake.calls = 0
+    docs = asyncio.run(agent.aresearch("melanoma excision margins"))
+    assert len(docs) == settings.DEEP_RESEARCH_MAX_DOCS
+    assert fake.calls == 1
+
+
+@pytest.mark.parametrize("merge", ["rrf", "mmr"])
+def test_search_many_falls_back_to_lexical_search(manager, monkeypatch, merge):
+    monkeypatch.setattr(settings, "DEEP_RESEARCH_MERGE", merge)
+    monkeypatch.setattr(manager, "embed_queries", unavailable)
+    monkeypatch.setattr(manager, "aembed_queries", unavailable)
+
+    results, vectors = manager.search_many(["eczema rash", "nevus margin"], k=3)
+    assert vectors is None
+    assert all(hits and all(distance is None for _, distance in hits) for hits in results)
+
+    agent = DeepResearchAgent(manager, llm=FakeChatModel(answer="- eczema rash\n- nevus margin"))
+    assert agent.research("melanoma excision margins")
+    assert asyncio.run(agent.aresearch("melanoma excision margins"))
@@ -0,0 +1,45 @@
+"""Builds only replace the doc store the app reads when the index is saved."""
+
+from benchmarks.fakes import FakeEmbeddings, synthetic_summaries
+from src.doc_store import DocStore
+from src.embeddings import DOC_STORE_FILE, VectorStoreManager
+
+
+def test_unsaved_update_leaves_live_store_untouched(tmp_path):
+    index_dir = tmp_path / "faiss_index"
+    summaries = synthetic_summaries(300)
+
+    builder = VectorStoreManager(embeddings=FakeEmbeddings(size=32))
+    builder.build_vectorstore(builder.create_documents(summaries[:200]))
+    builder.save_vectorstore(index_dir)
+    builder.doc_store.close()
+
+    live = DocStore(index_dir / DOC_STORE_FILE)
+    assert len(live) == 200
+
+    manager = VectorStoreManager(embeddings=FakeEmbeddings(size=32))
+    manager.load_vectorstore(index_dir)
+    manager.update_vectorstore(summaries, {"synthetic_1.pdf"})
+    # The update is visible to this manager, not to readers of the saved index
+    assert len(manager.doc_store) == 300
+    assert len(live) == 200
+
+    manager.save_vectorstore(index_dir)
+    live.close()
+    assert len(DocStore(index_dir / DOC_STORE_FILE)) == 300
+    assert not list(index_dir.glob("*.staging"))
+    manager.doc_store.close()
+
+
+def test_full_build_starts_from_an_empty_store(tmp_path):
+    index_dir = tmp_path / "faiss_index"
+    manager = VectorStoreManager(embeddings=FakeEmbeddings(size=32))
+    manager.build_vectorstore(manager.create_documents(synthetic_summaries(50)))
+    manager.save_vectorstore(index_dir)
+    manager.doc_store.close()
+
+    rebuild = VectorStoreManager(embeddings=FakeEmbeddings(size=32))
+    rebuild.build_vectorstore(rebuild.create_documents(synthetic_summaries(20)))
+    rebuild.save_vectorstore(index_dir)
+    assert len(rebuild.doc_store) == 20
+    rebuild.doc_store.close()
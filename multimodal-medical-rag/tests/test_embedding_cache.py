@@ -0,0 +1,59 @@
+"""Persistent embedding cache: hits, eviction and reload."""
+
+import asyncio
+
+import numpy as np
+
+from benchmarks.fakes import FakeEmbeddings
+from src.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+def test_only_misses_are_embedded(tmp_path):
+    fake = FakeEmbeddings(size=8)
+    cached = CachedEmbeddings(fake, EmbeddingCache(tmp_path, "fake"))
+
+    first = cached.embed_documents(["a", "b", "a"])
+    assert cached.embedded == 2
+    assert first[0] == first[2]
+
+    second = cached.embed_documents(["b", "c"])
+    assert cached.embedded == 3
+    np.testing.assert_allclose(second[0], first[1], rtol=1e-6)
+    assert cached.cache.hits == 1
+
+
+def test_async_path_shares_the_cache(tmp_path):
+    cached = CachedEmbeddings(FakeEmbeddings(size=8), EmbeddingCache(tmp_path, "fake"))
+    cached.embed_documents(["a"])
+    asyncio.run(cached.aembed_documents(["a", "b"]))
+    assert cached.embedded == 2
+
+
+def test_saved_cache_is_reloaded(tmp_path):
+    cached = CachedEmbeddings(FakeEmbeddings(size=8), EmbeddingCache(tmp_path, "fake"))
+    vectors = cached.embed_documents(["a", "b"])
+    cached.save()
+
+    fake = FakeEmbeddings(size=8)
+    reloaded = CachedEmbeddings(fake, EmbeddingCache(tmp_path, "fake"))
+    np.testing.assert_allclose(reloaded.embed_documents(["a", "b"]), vectors, rtol=1e-6)
+    assert fake.calls == 0
+
+    # Another model id never sees these vectors
+    other = EmbeddingCache(tmp_path, "other")
+    assert other.get_many(["a"]) == [None]
+
+
+def test_least_recently_used_rows_are_evicted(tmp_path):
+    # Room for two 8-dim float32 rows
+    cache = EmbeddingCache(tmp_path, "fake", max_bytes=2 * 8 * 4)
+    cache.put_many(["a", "b", "c"], np.eye(3, 8).tolist())
+    cache._last_used = [1.0, 3.0, 2.0]
+    cache.save()
+
+    reloaded = EmbeddingCache(tmp_path, "fake", max_bytes=2 * 8 * 4)
+    assert len(reloaded) == 2
+    a, b, c = reloaded.get_many(["a", "b", "c"])
+    assert a is None
+    np.testing.assert_array_equal(b, np.eye(3, 8)[1])
+    np.testing.assert_array_equal(c, np.eye(3, 8)[2])
@@ -0,0 +1,50 @@
+"""Merging per-sub-query hits: dedupe, reciprocal rank fusion and MMR."""
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.fusion import dedupe, mmr_select, reciprocal_rank_fusion
+
+
+def docs(*ids):
+    return [Document(page_content=f"text {i}", metadata={"id": i}) for i in ids]
+
+
+def ids(documents):
+    return [doc.metadata["id"] for doc in documents]
+
+
+def test_dedupe_keeps_first_occurrence():
+    merged = dedupe(docs("a", "b") + docs("b", "c"))
+    assert ids(merged) == ["a", "b", "c"]
+
+
+def test_documents_found_by_several_lists_rank_first():
+    fused = reciprocal_rank_fusion([docs("a", "b", "c"), docs("c", "d"), docs("e", "c")])
+    assert ids(fused)[0] == "c"
+    assert sorted(ids(fused)) == ["a", "b", "c", "d", "e"]
+
+
+def test_ties_keep_first_seen_order_and_limit_applies():
+    fused = reciprocal_rank_fusion([docs("a", "b"), docs("c", "d")], limit=3)
+    assert ids(fused) == ["a", "c", "b"]
+
+
+def test_mmr_skips_near_duplicates():
+    query = np.array([1.0, 0.0, 0.0])
+    candidates = np.array([
+        [1.0, 0.0, 0.0],
+        [0.99, 0.01, 0.0],  # near duplicate of the first
+        [0.7, 0.7, 0.0],
+    ])
+    assert mmr_select(query, candidates, k=2, lambda_mult=0.3) == [0, 2]
+    # Pure relevance keeps the duplicate
+    assert mmr_select(query, candidates, k=2, lambda_mult=1.0) == [0, 1]
+
+
+def test_mmr_relevance_is_the_best_match_to_any_query():
+    queries = np.array([[1.0, 0.0], [0.0, 1.0]])
+    candidates = np.array([[0.0, 1.0], [0.6, 0.8], [1.0, 0.0]])
+    assert sorted(mmr_select(queries, candidates, k=2)) == [0, 2]
+    assert mmr_select(queries, candidates, k=10) == [0, 2, 1]
+    assert mmr_select(queries, np.empty((0, 2)), k=2) == []
@@ -0,0 +1,45 @@
+"""Incremental updates on index types that are rebuilt rather than edited."""
+
+from benchmarks.fakes import FakeEmbeddings, synthetic_summaries
+from config.settings import settings
+from src.embedding_cache import EmbeddingCache
+from src.embeddings import VectorStoreManager
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    def __init__(self, size: int = 64):
+        super().__init__(size=size)
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return super().embed_documents(texts)
+
+
+def test_rebuild_reuses_stored_vectors(tmp_path, monkeypatch):
+    embeddings = CountingEmbeddings()
+    manager = VectorStoreManager(embeddings=embeddings)
+    summaries = synthetic_summaries(400)
+    manager.build_vectorstore(manager.create_documents(summaries))
+    kept_doc = next(
+        manager.vectorstore.docstore.search(faiss_id)
+        for faiss_id in manager.vectorstore.index_to_docstore_id.values()
+    )
+    kept_vector = manager.get_document_vectors([kept_doc])
+
+    # Unchanged documents must not depend on the (LRU-bounded) embedding cache
+    manager.embeddings.cache = EmbeddingCache(tmp_path / "empty", settings.EMBEDDING_MODEL)
+    monkeypatch.setattr(settings, "FAISS_INDEX_TYPE", "hnsw")
+    embeddings.texts = 0
+
+    changed = [
+        {**item, "summary": item["summary"] + " revised"} if item["metadata"]["source"] == "synthetic_1.pdf" else item
+        for item in summaries
+    ]
+    manager.update_vectorstore(changed, {"synthetic_1.pdf"})
+
+    assert embeddings.texts == 200
+    assert len(manager.vectorstore.index_to_docstore_id) == 400
+    assert manager.vectorstore.index.ntotal == 400
+    assert (manager.get_document_vectors([kept_doc]) == kept_vector).all()
+    manager.doc_store.close()
@@ -0,0 +1,55 @@
+"""The index shipped in data/faiss_index predates stable document ids."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings
+from src.agents.retrieval_agent import RetrievalAgent
+from src.embeddings import VectorStoreManager
+
+SHIPPED_INDEX = Path(__file__).resolve().parent.parent / "data" / "faiss_index"
+
+
+@pytest.fixture
+def manager(tmp_path):
+    if not (SHIPPED_INDEX / "index.faiss").exists():
+        pytest.skip("shipped index not present")
+    index_dir = tmp_path / "faiss_index"
+    shutil.copytree(SHIPPED_INDEX, index_dir)
+
+    manager = VectorStoreManager(embeddings=FakeEmbeddings(size=1536))
+    manager.load_vectorstore(index_dir)
+    yield manager
+    manager.doc_store.close()
+
+
+def test_docstore_ids_differ_from_metadata_ids(manager):
+    faiss_id = manager.vectorstore.index_to_docstore_id[0]
+    assert manager.vectorstore.docstore.search(faiss_id).metadata["id"] != faiss_id
+
+
+def test_lexical_search_resolves_documents(manager):
+    hits = manager.lexical_search("melanoma treatment", k=5)
+    assert hits
+    assert all(isinstance(doc, Document) for doc in hits)
+
+
+def test_hybrid_search_returns_documents(manager):
+    hits = manager.search_with_scores("melanoma treatment", k=5)
+    assert hits
+    assert all(isinstance(doc, Document) for doc, _ in hits)
+
+
+def test_quick_retrieval_has_context(manager):
+    docs = RetrievalAgent(manager).retrieve("melanoma treatment", k=5)
+    assert docs
+    assert all(doc.metadata.get("score") is not None for doc in docs)
+
+
+def test_stored_vectors_are_found(manager):
+    docs = manager.lexical_search("melanoma", k=3)
+    vectors = manager.get_document_vectors(docs)
+    assert vectors is not None and vectors.shape == (len(docs), 1536)
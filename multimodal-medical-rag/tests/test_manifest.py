@@ -0,0 +1,78 @@
+"""Per-stage gating of incremental ingestion."""
+
+from src.manifest import DocumentManifest
+
+
+def write_pdfs(directory, **contents):
+    directory.mkdir(exist_ok=True)
+    for name, content in contents.items():
+        (directory / f"{name}.pdf").write_bytes(content.encode())
+    return sorted(directory.glob("*.pdf"))
+
+
+def mark_all(manifest, source):
+    for stage in ("chunked", "summarized", "indexed"):
+        assert manifest.mark(source, stage)
+
+
+def test_scan_reports_changes(tmp_path):
+    pdfs = tmp_path / "pdfs"
+    manifest = DocumentManifest(tmp_path / "manifest.json")
+    diff = manifest.scan(write_pdfs(pdfs, a="one", b="two"))
+    assert sorted(diff.added) == ["a", "b"]
+
+    (pdfs / "b.pdf").unlink()
+    diff = manifest.scan(write_pdfs(pdfs, a="one changed", c="three"))
+    assert (diff.added, diff.modified, diff.removed) == (["c"], ["a"], ["b"])
+
+
+def test_stage_cannot_run_ahead_of_the_previous_one(tmp_path):
+    manifest = DocumentManifest(tmp_path / "manifest.json")
+    manifest.scan(write_pdfs(tmp_path / "pdfs", a="one"))
+
+    # A PDF that failed to chunk must not be marked summarized
+    assert not manifest.mark("a", "summarized")
+    assert manifest.stale("summarized") == ["a"]
+
+    assert manifest.mark("a", "chunked")
+    assert manifest.mark("a", "summarized")
+    assert manifest.stale("summarized") == []
+    assert manifest.stale("indexed") == ["a"]
+
+
+def test_modified_pdf_is_stale_for_every_stage(tmp_path):
+    pdfs = tmp_path / "pdfs"
+    manifest = DocumentManifest(tmp_path / "manifest.json")
+    manifest.scan(write_pdfs(pdfs, a="one", b="two"))
+    mark_all(manifest, "a")
+    mark_all(manifest, "b")
+
+    manifest.scan(write_pdfs(pdfs, a="one changed"))
+    for stage in ("chunked", "summarized", "indexed"):
+        assert manifest.stale(stage) == ["a"]
+
+
+def test_removed_pdf_is_kept_until_every_stage_dropped_it(tmp_path):
+    pdfs = tmp_path / "pdfs"
+    path = tmp_path / "manifest.json"
+    manifest = DocumentManifest(path)
+    manifest.scan(write_pdfs(pdfs, a="one", b="two"))
+    mark_all(manifest, "a")
+    mark_all(manifest, "b")
+    manifest.save()
+
+    (pdfs / "b.pdf").unlink()
+    manifest = DocumentManifest(path)
+    manifest.scan(sorted(pdfs.glob("*.pdf")))
+    assert manifest.is_removed("b")
+    assert manifest.stale("indexed") == ["b"]
+
+    manifest.mark("b", "chunked")
+    manifest.save()
+    # The later stages still have to delete b's data
+    assert "b" in DocumentManifest(path).entries
+
+    manifest.mark("b", "summarized")
+    manifest.mark("b", "indexed")
+    manifest.save()
+    assert "b" not in DocumentManifest(path).entries
@@ -0,0 +1,38 @@
+"""Image chunks of PDFs that repeat a figure across pages."""
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from src.preprocessing import FastPDFProcessor
+
+
+def write_repeated_figure_pdf(path, pages: int = 3):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, size=32 * 32 * 3, dtype=np.uint8).tobytes()
+    doc = fitz.open()
+    xref = 0
+    for page_number in range(pages):
+        page = doc.new_page()
+        page.insert_text((50, 50), f"Page {page_number + 1} about melanoma margins.")
+        rect = fitz.Rect(50, 100, 178, 228)
+        if xref:
+            page.insert_image(rect, xref=xref)
+        else:
+            xref = page.insert_image(rect, pixmap=fitz.Pixmap(fitz.csRGB, 32, 32, pixels, False))
+    doc.save(str(path))
+    doc.close()
+
+
+def test_repeated_xref_still_emits_chunks(tmp_path):
+    pdf_path = tmp_path / "repeated.pdf"
+    write_repeated_figure_pdf(pdf_path)
+
+    processor = FastPDFProcessor(extract_tables=False)
+    images = [c for c in processor.process_pdf(pdf_path) if c.chunk_type == "image"]
+
+    assert [c.page_number for c in images] == [1, 2, 3]
+    # One blob, referenced from every page
+    assert len({c.file_path for c in images}) == 1
+    assert len({c.metadata["image_hash"] for c in images}) == 1
+    assert processor.image_store.stats.stored == 1
+    assert processor.image_store.stats.xref_hits == 2
@@ -0,0 +1,44 @@
+"""QueryBatcher shutdown must not leave callers waiting."""
+
+import asyncio
+
+import pytest
+
+from src.query_batcher import QueryBatcher
+
+
+class SlowManager:
+    """Stands in for VectorStoreManager; every batch search takes `delay` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def asearch_batch(self, queries, k=5, filter_type=None):
+        await asyncio.sleep(self.delay)
+        return [[] for _ in queries]
+
+
+def test_search_returns_batched_hits():
+    async def run():
+        batcher = QueryBatcher(SlowManager(0.0), max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.search(f"query {i}") for i in range(5)))
+        await batcher.close()
+        return results, batcher
+
+    results, batcher = asyncio.run(run())
+    assert results == [[]] * 5
+    assert batcher.batches == 1 and batcher.queries == 5
+
+
+@pytest.mark.parametrize("delay, max_wait_ms", [(10.0, 1.0), (0.0, 10_000.0)])
+def test_close_fails_pending_searches(delay, max_wait_ms):
+    """In-flight (slow search) and still-collecting (long wait) requests alike."""
+    async def run():
+        batcher = QueryBatcher(SlowManager(delay), max_wait_ms=max_wait_ms)
+        pending = [asyncio.create_task(batcher.search(f"query {i}")) for i in range(3)]
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(batcher.close(), 1)
+        return await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), 1)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
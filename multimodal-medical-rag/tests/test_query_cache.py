@@ -0,0 +1,66 @@
+"""In-process LRU/TTL cache used for query embeddings and search results."""
+
+from benchmarks.fakes import FakeEmbeddings, synthetic_summaries
+from src import query_cache
+from src.embeddings import VectorStoreManager
+from src.query_cache import TTLCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  Melanoma\tMARGINS \n") == "melanoma margins"
+
+
+def test_least_recently_used_entry_is_dropped():
+    cache = TTLCache(capacity=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), len(cache)) == (1, 3, 2)
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+
+    cache = TTLCache(capacity=4, ttl=10)
+    cache.put("a", 1)
+    now[0] = 109.0
+    assert cache.get("a") == 1
+
+    now[0] = 111.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_zero_capacity_disables_the_cache():
+    cache = TTLCache(capacity=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_stats():
+    cache = TTLCache(capacity=4)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    assert cache.stats() == {"size": 1, "capacity": 4, "hits": 2, "misses": 1, "hit_rate": 0.6667}
+
+
+def test_search_results_are_cached_until_the_index_changes():
+    embeddings = FakeEmbeddings(size=16)
+    manager = VectorStoreManager(embeddings=embeddings)
+    manager.build_vectorstore(manager.create_documents(synthetic_summaries(50)))
+
+    first = manager.search_with_scores("Melanoma margins", k=3)
+    calls = embeddings.calls
+    assert manager.search_with_scores("  melanoma MARGINS", k=3) is first
+    assert embeddings.calls == calls
+
+    manager.build_vectorstore(manager.create_documents(synthetic_summaries(50, seed=2)))
+    assert manager.search_with_scores("melanoma margins", k=3) is not first
+    manager.doc_store.close()
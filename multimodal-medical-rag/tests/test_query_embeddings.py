@@ -0,0 +1,43 @@
+"""Query embeddings stay out of the persistent document embedding cache."""
+
+import asyncio
+
+from benchmarks.fakes import FakeEmbeddings
+from config.settings import settings
+from src.embedding_cache import EmbeddingCache
+from src.embeddings import VectorStoreManager
+
+
+def test_embed_queries_bypass_document_cache(tmp_path):
+    manager = VectorStoreManager(embeddings=FakeEmbeddings(size=8))
+    cache = manager.embeddings.cache = EmbeddingCache(tmp_path, settings.EMBEDDING_MODEL)
+
+    first = manager.embed_queries(["Melanoma margins", "psoriasis treatment"])
+    second = asyncio.run(manager.aembed_queries(["melanoma  margins", "eczema"]))
+
+    assert (cache.hits, cache.misses, len(cache)) == (0, 0, 0)
+    assert second[0] == first[0]
+    manager.doc_store.close()
+
+
+def test_original_query_is_embedded():
+    embeddings = FakeEmbeddings(size=8)
+    manager = VectorStoreManager(embeddings=embeddings)
+
+    # Case matters to the embedding; the normalized form is only the cache key
+    assert manager.embed_query("BRCA1  status") == embeddings.embed_query("BRCA1  status")
+    assert manager.embed_query("brca1 status") == manager.embed_query("BRCA1  status")
+    assert manager.embed_queries(["HER2 positive"]) == [embeddings.embed_query("HER2 positive")]
+    assert asyncio.run(manager.aembed_query("PD-L1 expression")) == embeddings.embed_query("PD-L1 expression")
+    manager.doc_store.close()
+
+
+def test_injected_embeddings_get_their_own_cache():
+    small = VectorStoreManager(embeddings=FakeEmbeddings(size=8))
+    large = VectorStoreManager(embeddings=FakeEmbeddings(size=16))
+
+    default_dir = EmbeddingCache(settings.EMBEDDING_CACHE_DIR, settings.EMBEDDING_MODEL).dir
+    assert small.embeddings.cache.dir != default_dir
+    assert small.embeddings.cache.dir != large.embeddings.cache.dir
+    small.doc_store.close()
+    large.doc_store.close()
@@ -0,0 +1,43 @@
+"""Retrieval-confidence routing decisions."""
+
+import asyncio
+import json
+
+from langchain_core.documents import Document
+
+from src.graph.router import AdaptiveRouter
+
+
+def hits(*scores):
+    return [Document(page_content=f"chunk {i}", metadata={"score": s}) for i, s in enumerate(scores)]
+
+
+def test_strong_near_duplicates_stay_quick():
+    router = AdaptiveRouter(log_path=None)
+    decision = router.decide("melanoma margins", hits(0.91, 0.90, 0.90, 0.89))
+    assert (decision.mode, decision.reason) == ("quick", "confident")
+
+
+def test_flat_mediocre_hits_escalate():
+    router = AdaptiveRouter(log_path=None)
+    decision = router.decide("melanoma margins", hits(0.55, 0.54, 0.54))
+    assert (decision.mode, decision.reason) == ("deep", "low_margin")
+
+
+def test_low_score_and_no_hits_escalate():
+    router = AdaptiveRouter(log_path=None)
+    assert router.decide("melanoma margins", hits(0.3, 0.1)).reason == "low_score"
+    assert router.decide("melanoma margins", []).reason == "no_hits"
+
+
+def test_decisions_are_logged_only_when_configured(tmp_path):
+    log_path = tmp_path / "routing_decisions.jsonl"
+    router = AdaptiveRouter(log_path=log_path)
+    decision = router.decide("melanoma margins", hits(0.9, 0.5))
+
+    router.record("melanoma margins", decision)
+    asyncio.run(router.arecord("melanoma margins", decision))
+
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["mode"] for line in lines] == ["quick", "quick"]
+    assert AdaptiveRouter().log_path is None
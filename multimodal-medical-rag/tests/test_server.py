@@ -0,0 +1,42 @@
+"""server.py --fake end to end, through the batched quick-mode path."""
+
+import pytest
+
+fastapi = pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient  # noqa: E402
+
+from server import create_app  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(create_app(fake=True, fake_docs=300)) as client:
+        yield client
+
+
+def test_query(client):
+    response = client.post("/query", json={"query": "melanoma excision margin"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["answer"] and body["mode"] in ("quick", "deep")
+
+
+def test_query_stream(client):
+    response = client.post("/query/stream", json={"query": "psoriasis treatment"})
+    assert response.status_code == 200
+    assert response.headers["x-route-mode"] in ("quick", "deep")
+    assert response.text
+
+
+def test_health_reports_batching(client):
+    client.post("/query", json={"query": "eczema rash"})
+    health = client.get("/health").json()
+    assert health["status"] == "ok"
+    assert health["documents"] == 300
+    assert health["batches"] >= 1 and health["batched_queries"] >= health["batches"]
+    assert health["average_batch_size"] >= 1
+
+
+def test_traces_limit_must_be_positive(client):
+    assert client.get("/traces", params={"limit": 5}).status_code == 200
+    assert client.get("/traces", params={"limit": -1}).status_code == 422
@@ -0,0 +1,18 @@
+"""Modules each pipeline ships its own copy of must stay identical."""
+
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parent.parent.parent
+
+SHARED = [
+    ("multimodal-medical-rag/src/embedding_cache.py", "multimodal-rag-groq/embedding_cache.py"),
+]
+
+
+@pytest.mark.parametrize("medical, groq", SHARED)
+def test_copies_match(medical, groq):
+    if not (REPO / groq).exists():
+        pytest.skip("Groq pipeline not checked out")
+    assert (REPO / medical).read_bytes() == (REPO / groq).read_bytes(), f"{medical} and {groq} differ"
@@ -0,0 +1,123 @@
+"""MultimodalSummarizer against a stubbed AsyncOpenAI client."""
+
+import asyncio
+import base64
+from types import SimpleNamespace
+
+import pytest
+
+from src import rate_limit
+from src.preprocessing import DocumentChunk
+from src.summarizer import MultimodalSummarizer
+from src.summary_cache import SummaryCache
+
+
+class APIError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class FakeAsyncOpenAI:
+    """
+    chat.completions.create answers "summary of <image text>", after failing
+    with the statuses scripted for that image; tracks requests in flight.
+    """
+
+    def __init__(self, failures=None):
+        self.failures = {image: list(statuses) for image, statuses in (failures or {}).items()}
+        self.calls = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, max_tokens):
+        url = messages[1]["content"][1]["image_url"]["url"]
+        # Image files hold b"image <name>"
+        image = base64.b64decode(url.split(",", 1)[1]).decode().split()[-1]
+        self.calls[image] = self.calls.get(image, 0) + 1
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Later images finish first, so completion order differs from input order
+            await asyncio.sleep(0.01 * (6 - "abcdef".index(image)))
+            if self.failures.get(image):
+                raise APIError(self.failures[image].pop(0))
+        finally:
+            self.in_flight -= 1
+
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f" summary of {image} "))],
+            usage=None,
+        )
+
+
+@pytest.fixture
+def chunks(tmp_path):
+    chunks = []
+    for page, name in enumerate("abcdef", start=1):
+        path = tmp_path / f"{name}.png"
+        path.write_bytes(f"image {name}".encode())
+        chunks.append(DocumentChunk(
+            content=f"text on page {page}", chunk_type="text", page_number=page,
+            metadata={"source": "doc.pdf"}, chunk_id=f"text{page}",
+        ))
+        chunks.append(DocumentChunk(
+            content=str(path), chunk_type="image", page_number=page,
+            metadata={"source": "doc.pdf"}, chunk_id=f"img_{name}",
+        ))
+    return chunks
+
+
+@pytest.fixture(autouse=True)
+def no_backoff_delay(monkeypatch):
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: 0.0)
+
+
+def summarize(client, chunks, tmp_path, **kwargs):
+    summarizer = MultimodalSummarizer(
+        client=client,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        cache=SummaryCache(tmp_path / "summaries.sqlite"),
+        **kwargs,
+    )
+    return asyncio.run(summarizer.process_chunks(chunks))
+
+
+def test_results_keep_input_order_under_bounded_concurrency(chunks, tmp_path):
+    client = FakeAsyncOpenAI()
+    results = summarize(client, chunks, tmp_path, concurrency=2)
+
+    assert [r["chunk_id"] for r in results] == [c.chunk_id for c in chunks]
+    assert [r["summary"] for r in results if r["chunk_type"] == "image"] == [
+        f"summary of {name}" for name in "abcdef"
+    ]
+    assert client.max_in_flight == 2
+
+
+def test_rate_limits_and_server_errors_are_retried(chunks, tmp_path):
+    client = FakeAsyncOpenAI(failures={"a": [429, 429], "c": [503]})
+    results = {r["chunk_id"]: r for r in summarize(client, chunks, tmp_path, max_retries=3)}
+
+    assert results["img_a"]["summary"] == "summary of a"
+    assert results["img_c"]["summary"] == "summary of c"
+    assert client.calls["a"] == 3 and client.calls["c"] == 2 and client.calls["b"] == 1
+    assert not any("error" in r for r in results.values())
+
+
+def test_failed_items_stay_marked_failed(chunks, tmp_path):
+    # 400 is not retryable; "d" runs out of retries
+    client = FakeAsyncOpenAI(failures={"b": [400], "d": [429, 429, 429]})
+    results = {r["chunk_id"]: r for r in summarize(client, chunks, tmp_path, max_retries=2)}
+
+    for chunk_id in ("img_b", "img_d"):
+        assert results[chunk_id]["summary"] is None
+        assert results[chunk_id]["error"]
+    assert client.calls["b"] == 1 and client.calls["d"] == 3
+    assert results["img_e"]["summary"] == "summary of e"
+
+    # Failures are not cached: the next run asks again and succeeds
+    retry = {r["chunk_id"]: r for r in summarize(FakeAsyncOpenAI(), chunks, tmp_path)}
+    assert retry["img_b"]["summary"] == "summary of b"
@@ -0,0 +1,61 @@
+"""Spans of streaming generators stay out of the consumer's context."""
+
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, synthetic_summaries
+from src import tracing
+from src.embeddings import VectorStoreManager
+from src.graph.agent_graph import MultiAgentGraph
+
+
+@pytest.fixture
+def graph(tmp_path):
+    tracing.configure(tracing=True, trace_file=tmp_path / "traces.jsonl")
+    tracing.recent_traces.clear()
+    manager = VectorStoreManager(embeddings=FakeEmbeddings(size=64))
+    manager.build_vectorstore(manager.create_documents(synthetic_summaries(200)))
+    tracing.recent_traces.clear()
+    yield MultiAgentGraph(manager, llm=FakeChatModel())
+    manager.doc_store.close()
+    tracing.configure(tracing=False)
+
+
+def names(trace):
+    return [child["name"] for child in trace.get("children", [])]
+
+
+def test_consumer_spans_are_not_children_of_the_stream(graph):
+    for _ in graph.stream("melanoma excision margin"):
+        with tracing.span("consumer"):
+            pass
+        assert tracing._current.get() is None
+
+    stream_trace = next(t for t in tracing.recent_traces if t["name"] == "query.stream")
+    assert "consumer" not in names(stream_trace)
+    assert "qa.llm_stream" in names(stream_trace)
+    assert any(t["name"] == "consumer" for t in tracing.recent_traces)
+
+
+def test_async_stream_spans(graph):
+    async def consume():
+        async for _ in graph.astream("psoriasis treatment", timeout=5):
+            with tracing.span("consumer"):
+                pass
+            assert tracing._current.get() is None
+
+    asyncio.run(consume())
+    stream_trace = next(t for t in tracing.recent_traces if t["name"] == "query.stream")
+    assert "consumer" not in names(stream_trace)
+    llm_stream = next(c for c in stream_trace["children"] if c["name"] == "qa.llm_stream")
+    assert "time_to_first_token_ms" in llm_stream["attributes"]
+
+
+def test_early_close_finishes_the_span(graph):
+    tokens = graph.stream("eczema rash")
+    next(tokens)
+    tokens.close()
+    assert tracing._current.get() is None
+    stream_trace = next(t for t in tracing.recent_traces if t["name"] == "query.stream")
+    assert "error" not in stream_trace.get("attributes", {})
@@ -1,5 +1,6 @@
+import itertools
 import streamlit as st
-from rag import answer  # The function from rag.py
+from rag import stream_answer, is_ready, warm_up_in_background  # from rag.py
 from PIL import Image
 import io
 
@@ -7,6 +8,12 @@ st.set_page_config(page_title="📄 Multimodal RAG (CPU-Safe)", layout="wide")
 
 st.title("📄 Multimodal RAG (Text + Image)")
 
+# Load embeddings, FAISS and the LLM in the background (once per process)
+# so the page renders immediately
+warm_up_in_background()
+if not is_ready():
+    st.caption("⏳ Loading models in the background...")
+
 st.markdown(
     """
 This app allows you to ask questions about your medical PDFs and optionally provide an image.
@@ -31,17 +38,20 @@ if uploaded_file is not None:
 
 # Submit button
 if st.button("Get Answer") and question:
-    with st.spinner("Generating answer..."):
-        try:
-            # Call your rag.py function
-            result = answer(question, image_path=image_path)
-        except Exception as e:
-            st.error(f"Error: {e}")
-            result = None
-
-    if result:
-        st.success("✅ Answer:")
-        st.write(result)
+    try:
+        tokens = stream_answer(question, image_path=image_path)
+        # Spinner only until the first token; the streamed text shows progress after that
+        with st.spinner("Generating answer..."):
+            first_token = next((token for token in tokens if token), None)
+
+        if first_token is None:
+            st.warning("⚠️ No answer was generated.")
+        else:
+            st.success("✅ Answer:")
+            # Tokens are rendered as Groq streams them
+            st.write_stream(itertools.chain([first_token], tokens))
+    except Exception as e:
+        st.error(f"Error: {e}")
 
 # Clean up temp file if exists
 import os
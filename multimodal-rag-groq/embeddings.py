@@ -1,6 +1,10 @@
 import pickle
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+CACHE_DIR = "data/embedding_cache"
 
 with open("data/summarized_docs.pkl", "rb") as f:
     text_docs = pickle.load(f)
@@ -10,11 +14,15 @@ with open("data/image_docs.pkl", "rb") as f:
 
 docs = text_docs + image_docs
 
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
+# Only texts not embedded by a previous build go through MiniLM
+embeddings = CachedEmbeddings(
+    HuggingFaceEmbeddings(model_name=MODEL_NAME),
+    EmbeddingCache(CACHE_DIR, MODEL_NAME),
 )
 
 db = FAISS.from_documents(docs, embeddings)
 db.save_local("data/faiss_index")
+embeddings.save()
 
+print(f"✅ {embeddings.report()}")
 print("✅ FAISS index saved")
@@ -1,32 +1,105 @@
-
 import os
+import time
 import base64
+import threading
+import traceback
+from collections import deque
+from functools import lru_cache, wraps
 from dotenv import load_dotenv
-from langchain_classic.chains import LLMChain
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_groq import ChatGroq
+from langchain_core.output_parsers import StrOutputParser
 
 # Load environment variables
 load_dotenv()
 
 FAISS_DIR = "data/faiss_index"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+LLM_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
 
-# Load embeddings (CPU-safe)
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2",
-    model_kwargs={"device": "cpu"}
+PROMPT = ChatPromptTemplate.from_template(
+    "You are a medical assistant specialized in skin diseases.\n\n"
+    "Context:\n{text}\n\n"
+    "Question: {question}\n"
+    "Answer accurately. If unsure, say 'I don't know'."
 )
 
-# Load FAISS vectorstore
-vectorstore = FAISS.load_local(FAISS_DIR, embeddings, allow_dangerous_deserialization=True)
+# Models, index and chain are built on first use rather than at import, so
+# importing this module (and rendering the Streamlit UI) is fast.
+def lazy(factory):
+    """Call `factory` once, even with concurrent first callers, and reuse the result."""
+    lock = threading.Lock()
+    instance = []
 
-# Initialize LLM with GROQ API key
-llm = ChatGroq(
-    model_name="meta-llama/llama-4-scout-17b-16e-instruct",
-    api_key=os.getenv("GROQ_API_KEY")
-)
+    @wraps(factory)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    get.is_loaded = lambda: bool(instance)
+    return get
+
+@lazy
+def get_embeddings():
+    # CPU-safe
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, model_kwargs={"device": "cpu"})
+
+@lazy
+def get_vectorstore():
+    from langchain_community.vectorstores import FAISS
+    return FAISS.load_local(FAISS_DIR, get_embeddings(), allow_dangerous_deserialization=True)
+
+@lazy
+def get_llm():
+    from langchain_groq import ChatGroq
+    return ChatGroq(model_name=LLM_MODEL, api_key=os.getenv("GROQ_API_KEY"))
+
+@lazy
+def get_chain():
+    return PROMPT | get_llm() | StrOutputParser()
+
+def is_ready() -> bool:
+    return all(f.is_loaded() for f in (get_embeddings, get_vectorstore, get_chain))
+
+def warm_up() -> dict:
+    """Load everything a query needs; returns seconds spent per step."""
+    timings = {}
+    for name, step in (
+        ("embeddings", get_embeddings),
+        ("vectorstore", get_vectorstore),
+        ("chain", get_chain),
+        # First forward pass is much slower than the rest
+        ("encoder_first_pass", lambda: get_embeddings().embed_query("warm up")),
+    ):
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+    return timings
+
+_warm_up_thread = None
+_warm_up_lock = threading.Lock()
+
+def _warm_up_logged():
+    # An uncaught error would end the thread silently; the first query then
+    # hits the same error, but the cause is reported here first
+    try:
+        timings = warm_up()
+        print(f"🔥 Warm-up finished in {sum(timings.values()):.1f}s")
+    except Exception as e:
+        print(f"⚠️ Background warm-up failed: {e}")
+        traceback.print_exc()
+
+def warm_up_in_background() -> threading.Thread:
+    """Start warm_up() once per process on a daemon thread."""
+    global _warm_up_thread
+    with _warm_up_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=_warm_up_logged, name="rag-warm-up", daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread
 
 def image_to_base64(path: str) -> str:
     if not path or not os.path.isfile(path):
@@ -34,34 +107,71 @@ def image_to_base64(path: str) -> str:
     with open(path, "rb") as f:
         return base64.b64encode(f.read()).decode()
 
-def answer(question: str, image_path: str = None) -> str:
+# Query path caches. The index is loaded once per process, so cached
+# results can only go stale if it is reloaded (see clear_query_caches).
+@lru_cache(maxsize=1024)
+def _embed_query(normalized_question: str) -> tuple:
+    return tuple(get_embeddings().embed_query(normalized_question))
+
+@lru_cache(maxsize=1024)
+def _search(query_embedding: tuple, k: int) -> tuple:
+    return tuple(get_vectorstore().similarity_search_by_vector(list(query_embedding), k=k))
+
+def retrieve(question: str, k: int = 3) -> list:
+    normalized = " ".join(question.lower().split())
+    return list(_search(_embed_query(normalized), k))
+
+def clear_query_caches():
+    _search.cache_clear()
+    _embed_query.cache_clear()
+
+def cache_stats() -> dict:
+    stats = {}
+    for name, fn in (("query_embeddings", _embed_query), ("search_results", _search)):
+        info = fn.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {**info._asdict(), "hit_rate": info.hits / lookups if lookups else 0.0}
+    return stats
+
+def build_context(question: str) -> str:
     # Retrieve top 3 relevant documents
-    docs = vectorstore.similarity_search(question, k=3)
+    docs = retrieve(question, k=3)
 
-    # Build context
     context = ""
     for d in docs:
         if d.metadata.get("type") == "text":
             context += d.metadata.get("original_content", "") + "\n"
+    return context
+
+def answer(question: str, image_path: str = None) -> str:
+    context = build_context(question)
 
     # Optional image (currently just converted to base64)
     image_base64 = image_to_base64(image_path)
 
-    # Prepare prompt
-    prompt = ChatPromptTemplate.from_template(
-        "You are a medical assistant specialized in skin diseases.\n\n"
-        "Context:\n{text}\n\n"
-        "Question: {question}\n"
-        "Answer accurately. If unsure, say 'I don't know'."
-    )
+    return get_chain().invoke({"text": context, "question": question})
+
+# Recent time-to-first-token samples (seconds) of streamed answers
+time_to_first_token = deque(maxlen=1000)
+
+def stream_answer(question: str, image_path: str = None):
+    """Yield the answer text as Groq generates it."""
+    start = time.perf_counter()
+    context = build_context(question)
 
-    # Run LLMChain
-    chain = LLMChain(llm=llm, prompt=prompt)
-    return chain.run(text=context, question=question)
+    first = True
+    for token in get_chain().stream({"text": context, "question": question}):
+        if first and token:
+            first = False
+            time_to_first_token.append(time.perf_counter() - start)
+            print(f"⏱️ First token after {time_to_first_token[-1]:.2f}s")
+        yield token
 
 # Example usage
 if __name__ == "__main__":
     q = "What is melanoma?"
     img = None  # Optional image path
-    answer_text = answer(q, image_path=img)
-    print("Answer:\n", answer_text)
+    print("Answer:")
+    for token in stream_answer(q, image_path=img):
+        print(token, end="", flush=True)
+    print()
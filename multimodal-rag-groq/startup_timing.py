@@ -0,0 +1,42 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Runs in a fresh interpreter so import cost is measured cold. Works against
+# older versions of rag.py too (no warm_up), which gives the "before" numbers.
+PROBE = r"""
+import json, time
+start = time.perf_counter()
+import rag
+timings = {"import": time.perf_counter() - start}
+if WARM_UP and hasattr(rag, "warm_up"):
+    for step, seconds in rag.warm_up().items():
+        timings[f"warm_up.{step}"] = seconds
+for i, question in enumerate(QUESTIONS):
+    start = time.perf_counter()
+    rag.answer(question)
+    timings[f"query_{i + 1}"] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure rag.py import time and first-query latency")
+    parser.add_argument("--no-warm-up", action="store_true", help="time the first query on a cold process")
+    parser.add_argument("questions", nargs="*", default=["What is melanoma?", "How is psoriasis treated?"])
+    args = parser.parse_args()
+
+    code = f"WARM_UP = {not args.no_warm_up}\nQUESTIONS = {args.questions!r}\n" + PROBE
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),  # rag.py uses relative data/ paths
+    )
+    if result.returncode != 0:
+        sys.exit(f"❌ Timing run failed:\n{result.stderr.strip()}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+    for name, seconds in timings.items():
+        print(f"⏱️ {name:>10}: {seconds * 1000:8.1f} ms")
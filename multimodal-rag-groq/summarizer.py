@@ -1,4 +1,5 @@
-import os, pickle
+import os, re, pickle, json, time, random, asyncio, hashlib
+import groq
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
@@ -11,6 +12,18 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("⚠️ GROQ_API_KEY not set in your .env file!")
 
+# Concurrency / rate limits (override in .env)
+CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+REQUESTS_PER_MINUTE = float(os.getenv("SUMMARY_REQUESTS_PER_MINUTE", "30"))
+MAX_RETRIES = int(os.getenv("SUMMARY_MAX_RETRIES", "5"))
+# Pack several small chunks into one request up to this many input tokens (0 = one chunk per request)
+PACK_TOKEN_BUDGET = int(os.getenv("SUMMARY_PACK_TOKEN_BUDGET", "3000"))
+
+INPUT_FILE = "data/raw_docs.pkl"
+OUTPUT_FILE = "data/summarized_docs.pkl"
+# One JSON line per finished chunk; a rerun skips everything already in it
+CHECKPOINT_FILE = "data/summaries_checkpoint.jsonl"
+
 # Initialize Groq LLM with API key
 llm = ChatGroq(
     model_name="meta-llama/llama-4-scout-17b-16e-instruct",
@@ -21,17 +34,221 @@ prompt = ChatPromptTemplate.from_template(
     "Summarize the following medical text clearly:\n{text}"
 )
 
-with open("data/raw_docs.pkl", "rb") as f:
-    docs = pickle.load(f)
+packed_prompt = ChatPromptTemplate.from_template(
+    "Summarize each of the following {count} medical text chunks clearly.\n"
+    "Answer with one section per chunk, in the same order. Start every section "
+    "with its header line exactly as given (for example ### CHUNK 1 ###) and "
+    "write nothing outside the sections.\n\n{chunks}"
+)
+
+CHUNK_HEADER = re.compile(r"^\s*#+\s*CHUNK\s+(\d+)\s*#+\s*$", re.MULTILINE | re.IGNORECASE)
+
+
+def chunk_key(text: str) -> str:
+    """Checkpoint key: stable across re-ingests, unlike the uuid4 doc ids."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def pack(docs, budget: int):
+    """Greedily group consecutive chunks while their estimated tokens fit the budget."""
+    groups, current, used = [], [], 0
+    for doc in docs:
+        tokens = estimate_tokens(doc.page_content)
+        if current and used + tokens > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(doc)
+        used += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def format_packed(docs) -> str:
+    return "\n\n".join(f"### CHUNK {i} ###\n{d.page_content}" for i, d in enumerate(docs, start=1))
+
+
+def parse_packed(response: str, count: int):
+    """Split a packed answer into `count` summaries, or None if it doesn't line up."""
+    parts = CHUNK_HEADER.split(response)
+    # parts = [preamble, "1", body1, "2", body2, ...]
+    numbers = [int(n) for n in parts[1::2]]
+    bodies = [b.strip() for b in parts[2::2]]
+    if numbers != list(range(1, count + 1)) or not all(bodies):
+        return None
+    return bodies
+
+
+def percentiles(values) -> str:
+    values = sorted(values)
+    p50 = values[len(values) // 2]
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    return f"p50 {p50:.2f}s / p95 {p95:.2f}s / max {values[-1]:.2f}s"
+
+
+def load_checkpoint() -> dict:
+    done = {}
+    if not os.path.exists(CHECKPOINT_FILE):
+        return done
+
+    with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                done[record["key"]] = record["summary"]
+            except (json.JSONDecodeError, KeyError):
+                pass  # torn last line after a crash
+    return done
+
+
+class RateLimiter:
+    """Spaces request starts at least 60 / requests_per_minute seconds apart."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, groq.APIConnectionError):  # includes timeouts
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+async def call_llm(message: str, limiter: RateLimiter) -> str:
+    """One request, retried with jittered exponential backoff."""
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.wait()
+        try:
+            response = await llm.ainvoke(message)
+            return response.content
+        except Exception as e:
+            if attempt == MAX_RETRIES or not is_retryable(e):
+                raise
+            delay = random.uniform(0, min(60, 2 ** attempt))
+            print(f"⚠️ Retrying after error ({e}), sleeping {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def summarize_all(docs) -> dict:
+    """Summarize every chunk not yet checkpointed; returns key -> summary."""
+    done = load_checkpoint()
+    todo = list({chunk_key(d.page_content): d for d in docs if chunk_key(d.page_content) not in done}.values())
+    print(f"📄 {len(docs)} chunks, {len(docs) - len(todo)} already summarized, {len(todo)} to go")
+
+    groups = pack(todo, PACK_TOKEN_BUDGET) if PACK_TOKEN_BUDGET > 0 else [[d] for d in todo]
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    limiter = RateLimiter(REQUESTS_PER_MINUTE)
+    latencies = []
+    # Request latency split over the chunks it carried, so packed and
+    # unpacked runs compare per chunk
+    chunk_latencies = []
+    requests = 0
+    parse_fallbacks = 0
+    failures = 0
+    start = time.perf_counter()
+
+    os.makedirs(os.path.dirname(CHECKPOINT_FILE), exist_ok=True)
+    with open(CHECKPOINT_FILE, "a", encoding="utf-8") as checkpoint:
+
+        async def request(message: str, chunks: int = 1) -> str:
+            nonlocal requests
+            async with semaphore:
+                t0 = time.perf_counter()
+                result = await call_llm(message, limiter)
+                latency = time.perf_counter() - t0
+                latencies.append(latency)
+                chunk_latencies.extend([latency / chunks] * chunks)
+                requests += 1
+                return result
+
+        def record(doc, summary: str):
+            key = chunk_key(doc.page_content)
+            done[key] = summary
+            checkpoint.write(json.dumps({"key": key, "summary": summary}) + "\n")
+            checkpoint.flush()
+
+        async def summarize_one(doc):
+            nonlocal failures
+            try:
+                record(doc, await request(prompt.format(text=doc.page_content)))
+            except Exception as e:
+                failures += 1
+                print(f"❌ Failed chunk {doc.metadata.get('id')}: {e}")
+
+        async def summarize_group(group):
+            nonlocal parse_fallbacks
+            if len(group) == 1:
+                await summarize_one(group[0])
+            else:
+                try:
+                    response = await request(
+                        packed_prompt.format(count=len(group), chunks=format_packed(group)), len(group)
+                    )
+                    summaries = parse_packed(response, len(group))
+                except Exception as e:
+                    print(f"⚠️ Packed request failed ({e})")
+                    summaries = None
+
+                if summaries is None:
+                    # Unparseable or failed: fall back to one request per chunk
+                    parse_fallbacks += 1
+                    await asyncio.gather(*(summarize_one(d) for d in group))
+                else:
+                    for doc, summary in zip(group, summaries):
+                        record(doc, summary)
+
+            print(f"✅ [{len(done)}/{len(docs)}] chunks summarized")
+
+        await asyncio.gather(*(summarize_group(g) for g in groups))
+
+    elapsed = time.perf_counter() - start
+    if latencies:
+        summarized = len(todo) - failures
+        print(
+            f"⏱️ {summarized} chunks in {requests} requests, {elapsed:.1f}s "
+            f"({summarized / elapsed:.2f} chunks/sec, {requests / elapsed:.2f} requests/sec)"
+        )
+        print(f"⏱️ latency per chunk {percentiles(chunk_latencies)}")
+        print(f"⏱️ latency per request {percentiles(latencies)}")
+    if parse_fallbacks:
+        print(f"⚠️ {parse_fallbacks} packed requests fell back to single-chunk requests")
+    if failures:
+        print(f"⚠️ {failures} chunks failed; rerun to resume from the checkpoint")
+
+    return done
+
+
+if __name__ == "__main__":
+    with open(INPUT_FILE, "rb") as f:
+        docs = pickle.load(f)
+
+    summaries_by_key = asyncio.run(summarize_all(docs))
 
-summaries = []
+    missing = [d for d in docs if chunk_key(d.page_content) not in summaries_by_key]
+    if missing:
+        raise SystemExit(f"⚠️ {len(missing)} chunks still unsummarized; {OUTPUT_FILE} not written")
 
-for d in docs:
-    summary = llm.invoke(prompt.format(text=d.page_content)).content
-    d.page_content = summary
-    summaries.append(d)
+    summaries = []
+    for d in docs:
+        d.page_content = summaries_by_key[chunk_key(d.page_content)]
+        summaries.append(d)
 
-with open("data/summarized_docs.pkl", "wb") as f:
-    pickle.dump(summaries, f)
+    with open(OUTPUT_FILE, "wb") as f:
+        pickle.dump(summaries, f)
 
-print("✅ Text summarized")
+    print("✅ Text summarized")
@@ -0,0 +1,9 @@
+"""Tests import the pipeline scripts directly; nothing reaches the Groq API."""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# summarizer.py refuses to import without a key
+os.environ.setdefault("GROQ_API_KEY", "test-key")
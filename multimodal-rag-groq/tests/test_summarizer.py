@@ -0,0 +1,110 @@
+"""Async summarizer against a fake LLM and a fake clock."""
+
+import asyncio
+import re
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+import summarizer
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeLLM:
+    """Every request takes one clock second; packed prompts get one section per chunk."""
+
+    def __init__(self, clock: Clock):
+        self.clock = clock
+        self.requests = 0
+
+    async def ainvoke(self, message: str):
+        self.requests += 1
+        self.clock.now += 1.0
+        numbers = re.findall(r"^### CHUNK (\d+) ###$", message, re.MULTILINE)
+        if not numbers:
+            return SimpleNamespace(content="summary")
+        return SimpleNamespace(content="\n".join(f"### CHUNK {n} ###\nsummary {n}" for n in numbers))
+
+
+@pytest.fixture
+def fake_llm(monkeypatch, tmp_path):
+    clock = Clock()
+    llm = FakeLLM(clock)
+    monkeypatch.setattr(summarizer, "llm", llm)
+    monkeypatch.setattr(summarizer, "time", SimpleNamespace(perf_counter=clock, monotonic=clock))
+    monkeypatch.setattr(summarizer, "CHECKPOINT_FILE", str(tmp_path / "checkpoint.jsonl"))
+    monkeypatch.setattr(summarizer, "REQUESTS_PER_MINUTE", 0)
+    return llm
+
+
+def chunks(count: int):
+    return [Document(page_content=f"chunk {i} " + "x" * 40, metadata={"id": i}) for i in range(count)]
+
+
+def test_packed_latency_is_reported_per_chunk(fake_llm, monkeypatch, capsys):
+    # Three chunks fit one request
+    monkeypatch.setattr(summarizer, "PACK_TOKEN_BUDGET", 40)
+    done = asyncio.run(summarizer.summarize_all(chunks(6)))
+
+    assert len(done) == 6
+    assert fake_llm.requests == 2
+    out = capsys.readouterr().out
+    assert "6 chunks in 2 requests" in out
+    assert "latency per chunk p50 0.33s" in out
+    assert "latency per request p50 1.00s" in out
+
+
+def test_unpacked_chunk_and_request_latency_match(fake_llm, monkeypatch, capsys):
+    monkeypatch.setattr(summarizer, "PACK_TOKEN_BUDGET", 0)
+    asyncio.run(summarizer.summarize_all(chunks(3)))
+
+    out = capsys.readouterr().out
+    assert "3 chunks in 3 requests" in out
+    assert "latency per chunk p50 1.00s" in out
+    assert "latency per request p50 1.00s" in out
+
+
+def test_pack_respects_the_token_budget():
+    docs = [Document(page_content="x" * 36) for _ in range(5)]  # 10 tokens each
+    assert [len(g) for g in summarizer.pack(docs, 25)] == [2, 2, 1]
+    # A chunk over budget still gets a request of its own
+    assert [len(g) for g in summarizer.pack(docs[:2], 5)] == [1, 1]
+
+
+def test_parse_packed_splits_sections_in_order():
+    response = "Sure, here you go.\n### CHUNK 1 ###\nfirst\n\n## Chunk 2 ##\nsecond\n"
+    assert summarizer.parse_packed(response, 2) == ["first", "second"]
+
+
+@pytest.mark.parametrize("response", [
+    "### CHUNK 1 ###\nfirst",  # a section missing
+    "### CHUNK 2 ###\nsecond\n### CHUNK 1 ###\nfirst",  # out of order
+    "### CHUNK 1 ###\n\n### CHUNK 2 ###\nsecond",  # empty section
+    "first and second together",
+])
+def test_parse_packed_rejects_misaligned_answers(response):
+    assert summarizer.parse_packed(response, 2) is None
+
+
+def test_unparseable_packed_answer_falls_back_to_single_requests(fake_llm, monkeypatch):
+    async def ainvoke(message):
+        fake_llm.requests += 1
+        fake_llm.clock.now += 1.0
+        return SimpleNamespace(content="summary")
+
+    monkeypatch.setattr(fake_llm, "ainvoke", ainvoke)
+    monkeypatch.setattr(summarizer, "PACK_TOKEN_BUDGET", 40)
+    done = asyncio.run(summarizer.summarize_all(chunks(3)))
+
+    assert set(done.values()) == {"summary"}
+    assert len(done) == 3
+    # One packed request, then one per chunk
+    assert fake_llm.requests == 4